@@ -4,10 +4,11 @@ author: dick mule
 purpose: Base Client interface that underpins REST and SOCKET implementations
 """
 from abc import abstractmethod, ABC
-from io import StringIO
+from contextlib import aclosing, asynccontextmanager
+from functools import lru_cache, partial
 from traceback import format_exc
 from types import MethodType
-from typing import Any, NamedTuple, Optional
+from typing import Any, AsyncIterator, Callable, NamedTuple, Optional
 
 import asyncio
 import logging
@@ -16,6 +17,7 @@ import json
 import time
 import weakref
 
+import numpy as np
 import pandas as pd
 import requests
 
@@ -25,13 +27,68 @@ from finx.base_classes.context_manager import ApiContextManager, CacheLookup
 from finx.base_classes.from_kwargs import BaseMethods
 from finx.base_classes.session_manager import SessionManager
 from finx.utils.concurrency import hybrid, Hybrid
+from finx.utils.output_writer import ResultWriter
+from finx.utils.payload_parsing import parse_csv, read_csv_file
 
+_FILE_KEY_PATTERN = r"""["']([^"']*)["']\s*,\s*["']([^"']*)["']\s*[\])]\s*$"""
 _BATCH_INPUTS = "batch_params=None, input_file=None, output_file=None, "
 _BATCH_PARAMS = (
     "batch_params=batch_params, input_file=input_file, output_file=output_file, "
 )
 
 
+@lru_cache(maxsize=None)
+def _compile_function_stubs(schema: str) -> dict[str, tuple[Callable, bool]]:
+    """
+    Compile the <name>, batch_<name> and stream_batch_<name> stubs of an API function.
+    Cached per schema, so every client (and every load_functions call) reuses them.
+
+    :param schema: JSON function schema (name, required, optional) in server order
+    :type schema: str
+    :return: Unbound stub functions and whether each is wrapped in hybrid, keyed by name
+    :rtype: dict[str, tuple[Callable, bool]]
+    """
+    name, required, optional = [
+        json.loads(schema)[k] for k in ["name", "required", "optional"]
+    ]
+    required_str = (", ".join(required) + ", ") if required else ""
+    required_zip = (
+        (", ".join([f"{x}={x}" for x in required]) + ", ") if required else ""
+    )
+    optional_str = (
+        (", ".join([f"{k}={v}" for k, v in optional.items()]) + ", ")
+        if optional is not None
+        else ""
+    )
+    optional_zip = (
+        (", ".join([f"{x}={x}" for x in optional.keys()]) + ", ")
+        if optional is not None
+        else ""
+    )
+    local_vals = {"pd": pd}
+    stubs = {}
+    for index, batch in enumerate(["batch_", ""]):
+        inputs = [_BATCH_INPUTS, f"{required_str}{optional_str}"][index]
+        params = [_BATCH_PARAMS, f"{required_zip}{optional_zip}"][index]
+        string_repr = (
+            f"async def {batch}{name}(self, {inputs}**kwargs):\n"
+            f'    result = await self._{batch}dispatch.run_async("{f"{name}"}", {params}**kwargs)\n'
+            f"    if not isinstance(result, (list, dict, pd.DataFrame)):\n"
+            f"        return await result\n"
+            f"    return result"
+        )
+        exec(string_repr, local_vals)  # pylint: disable=exec-used
+        stubs[f"{batch}{name}"] = (local_vals[f"{batch}{name}"], True)
+    string_repr = (
+        f"async def stream_batch_{name}(self, {_BATCH_INPUTS}**kwargs):\n"
+        f'    async for result in self._stream_batch_dispatch("{name}", {_BATCH_PARAMS}**kwargs):\n'
+        f"        yield result"
+    )
+    exec(string_repr, local_vals)  # pylint: disable=exec-used
+    stubs[f"stream_batch_{name}"] = (local_vals[f"stream_batch_{name}"], False)
+    return stubs
+
+
 # pylint: disable=no-member
 # pylint: disable=too-many-lines
 # pylint: disable=too-many-locals
@@ -61,6 +118,9 @@ class BaseFinXClient(BaseMethods, ABC):
     finalized: Optional[weakref.finalize] = None
     _payload_cache: Optional[PayloadCache] = PrivateAttr(None)
     _cleaned_up: bool = PrivateAttr(False)
+    _function_stubs: dict[str, tuple[Callable, bool]] = PrivateAttr(
+        default_factory=dict
+    )
 
     def model_post_init(self, __context: Any) -> None:
         """
@@ -137,65 +197,142 @@ class BaseFinXClient(BaseMethods, ABC):
         self.free()
 
     @staticmethod
-    def _parse_request_response(
-        response: requests.Response, is_json: bool = False
+    def _parse_file_content(
+        content: bytes, is_json: bool = False, csv_engine: str = "c"
     ) -> dict | pd.DataFrame:
         """
-        Parse the response from a request
+        Parse a downloaded file
 
-        :param response: Response from a request
-        :type response: requests.Response
-        :return: Parsed response
+        :param content: File contents
+        :type content: bytes
+        :param is_json: File is JSON (CSV otherwise)
+        :type is_json: bool
+        :param csv_engine: pandas read_csv engine (c or pyarrow)
+        :type csv_engine: str
+        :return: Parsed file
         :rtype: dict | pd.DataFrame
         """
-        response = response.content.decode("utf-8")
         if is_json:
-            response = json.loads(response)
-        else:
-            response = pd.read_csv(
-                StringIO(response), engine="python", converters={"security_id": str}
-            )
-        return response
+            return json.loads(content)
+        return parse_csv(content, csv_engine)
+
+    def _read_stored_file(
+        self, filename: str, bucket_name: Optional[str], is_json: bool = False
+    ) -> Optional[dict | pd.DataFrame]:
+        """
+        Parse a previously downloaded file from the local file store
+
+        :param filename: Name of the file
+        :type filename: str
+        :param bucket_name: Bucket the file was downloaded from
+        :type bucket_name: Optional[str]
+        :param is_json: File is JSON (CSV otherwise)
+        :type is_json: bool
+        :return: Parsed file or None if it is not stored locally
+        :rtype: Optional[dict | pd.DataFrame]
+        """
+        store = self.context.file_store
+        if store is None or (path := store.path(filename, bucket_name)) is None:
+            return None
+        try:
+            if is_json:
+                with open(path, "rb") as file:
+                    return json.load(file)
+            return read_csv_file(path, self.context.csv_engine)
+        except FileNotFoundError:
+            # Pruned by another process since it was looked up
+            return None
+
+    def _store_file(
+        self,
+        filename: str,
+        bucket_name: Optional[str],
+        content: bytes,
+        is_json: bool = False,
+    ) -> dict | pd.DataFrame:
+        """
+        Keep a downloaded file in the local file store (if configured) and parse it
+
+        :param filename: Name of the file
+        :type filename: str
+        :param bucket_name: Bucket the file was downloaded from
+        :type bucket_name: Optional[str]
+        :param content: File contents
+        :type content: bytes
+        :param is_json: File is JSON (CSV otherwise)
+        :type is_json: bool
+        :return: Parsed file
+        :rtype: dict | pd.DataFrame
+        """
+        if self.context.file_store is not None:
+            self.context.file_store.put(filename, bucket_name, content)
+        return self._parse_file_content(content, is_json, self.context.csv_engine)
 
     def _reload_function_definitions(
         self, all_functions: dict[str, Any] | list[Any]
     ) -> None:
+        """
+        Register the API functions as <name>, batch_<name> and stream_batch_<name> methods.
+        Stubs are compiled once per function schema for the whole process and bound to this
+        client on first access (see __getattr__).
+
+        :param all_functions: Function schemas (name, required, optional)
+        :type all_functions: dict[str, Any] | list[Any]
+        :return: None type
+        :rtype: None
+        """
         if isinstance(all_functions, dict):
             all_functions = all_functions["data"]
         for function in all_functions:
-            name, required, optional = [
-                function[k] for k in ["name", "required", "optional"]
-            ]
-            required_str = (", ".join(required) + ", ") if required else ""
-            required_zip = (
-                (", ".join([f"{x}={x}" for x in required]) + ", ") if required else ""
-            )
-            optional_str = (
-                (", ".join([f"{k}={v}" for k, v in optional.items()]) + ", ")
-                if optional is not None
-                else ""
-            )
-            optional_zip = (
-                (", ".join([f"{x}={x}" for x in optional.keys()]) + ", ")
-                if optional is not None
-                else ""
-            )
-            local_vals = locals() | {"hybrid": hybrid, "pd": pd}
-            for index, batch in enumerate(["batch_", ""]):
-                inputs = [_BATCH_INPUTS, f"{required_str}{optional_str}"][index]
-                params = [_BATCH_PARAMS, f"{required_zip}{optional_zip}"][index]
-                string_repr = (
-                    f"async def {batch}{name}(self, {inputs}**kwargs):\n"
-                    f'    result = await self._{batch}dispatch.run_async("{f"{name}"}", {params}**kwargs)\n'
-                    f"    if not isinstance(result, (list, dict, pd.DataFrame)):\n"
-                    f"        return await result\n"
-                    f"    return result"
-                )
-                exec(string_repr, local_vals)  # pylint: disable=exec-used
-                self.__dict__[f"{batch}{name}"] = hybrid(
-                    MethodType(local_vals[f"{batch}{name}"], self)
-                )
-                self.__dict__[f"{batch}{name}"].set_event_loop(self.context.event_loop)
+            # Keys keep the server's order, which is the order of the stub parameters
+            stubs = _compile_function_stubs(json.dumps(function, default=str))
+            self._function_stubs.update(stubs)
+            for attr_name in stubs:
+                self.__dict__.pop(attr_name, None)
+                if hasattr(type(self), attr_name):
+                    # Documented placeholders on the class would hide the stub from
+                    # __getattr__, so these are bound right away
+                    self._bind_function_stub(attr_name)
+
+    def _bind_function_stub(self, name: str) -> Any:
+        """
+        Bind a compiled API function stub to this client
+
+        :param name: Method name
+        :type name: str
+        :return: Bound method
+        :rtype: Any
+        """
+        function, is_hybrid = self._function_stubs[name]
+        method = MethodType(function, self)
+        if is_hybrid:
+            method = hybrid(method)
+            method.set_event_loop(self.context.event_loop)
+        self.__dict__[name] = method
+        return method
+
+    def __getattr__(self, item: str) -> Any:
+        """
+        Bind API function stubs on first access
+
+        :param item: Attribute name
+        :type item: str
+        :return: Attribute value
+        :rtype: Any
+        """
+        private = self.__pydantic_private__ or {}
+        if item in private.get("_function_stubs", {}):
+            return self._bind_function_stub(item)
+        return super().__getattr__(item)
+
+    def __dir__(self) -> list[str]:
+        """
+        List attributes including the API functions not bound yet
+
+        :return: Attribute names
+        :rtype: list[str]
+        """
+        return sorted(set(super().__dir__()) | set(self._function_stubs))
 
     @hybrid
     async def download_file(
@@ -219,28 +356,26 @@ class BaseFinXClient(BaseMethods, ABC):
         :return: File contents
         :rtype: dict | pd.DataFrame
         """
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            None, self._read_stored_file, filename, bucket_name, is_json_response
+        )
+        if stored is not None:
+            return stored
         if not use_async:
-            return self._parse_request_response(
-                requests.get(
-                    f"{self.context.api_url}batch-download/",
-                    params={"filename": filename, "bucket_name": bucket_name},
-                ),
-                is_json_response,
-            )
-        if not self.session:
-            async with SessionManager() as session:
-                result = await session.get(
+            content = requests.get(
+                f"{self.context.api_url}batch-download/",
+                params={"filename": filename, "bucket_name": bucket_name},
+            ).content
+        else:
+            async with self._download_session() as session:
+                content = await session.download(
                     f"{self.context.api_url}batch-download/",
-                    is_json_response=is_json_response,
                     filename=filename,
                     bucket_name=bucket_name,
                 )
-            return result
-        return await self.session.get(
-            f"{self.context.api_url}batch-download/",
-            is_json_response=is_json_response,
-            filename=filename,
-            bucket_name=bucket_name,
+        return await loop.run_in_executor(
+            None, self._store_file, filename, bucket_name, content, is_json_response
         )
 
     def upload_file(self, filename: str, remove_file: bool = False) -> dict:
@@ -294,7 +429,6 @@ class BaseFinXClient(BaseMethods, ABC):
         :return: File results
         :rtype: pd.DataFrame
         """
-        downloaded_files = {}
         files_to_download = [
             dict(s)
             for s in set(
@@ -306,11 +440,115 @@ class BaseFinXClient(BaseMethods, ABC):
             len(files_to_download),
             files_to_download,
         )
-        for file in files_to_download:
-            downloaded_files[file["filename"]] = await self.download_file.run_async(
-                file["filename"], file.get("bucket_name"), use_async=False
+        semaphore = asyncio.Semaphore(self.context.download_concurrency)
+        async with self._download_session() as session:
+            downloaded = await asyncio.gather(
+                *[
+                    self._fetch_result_file(
+                        session, semaphore, file["filename"], file.get("bucket_name")
+                    )
+                    for file in files_to_download
+                ]
             )
-        return downloaded_files
+        return {
+            file["filename"]: file_df
+            for file, file_df in zip(files_to_download, downloaded)
+        }
+
+    @asynccontextmanager
+    async def _download_session(self) -> AsyncIterator[SessionManager]:
+        """
+        Use the client session for downloads, or a temporary one if there is none
+
+        :return: Async context manager yielding a session
+        :rtype: AsyncIterator[SessionManager]
+        """
+        if self.session:
+            yield self.session
+            return
+        async with SessionManager() as session:
+            yield session
+
+    @staticmethod
+    def _batch_input_file(batch_params: Any, kwargs: dict) -> Optional[str]:
+        """
+        Path of the CSV file holding the batch input, given either as batch_params or as
+        input_file (which is then removed from kwargs)
+
+        :param batch_params: Batch parameters
+        :type batch_params: Any
+        :param kwargs: Keyword arguments of the batch request
+        :type kwargs: dict
+        :return: Input file path or None if the input is not a file
+        :rtype: Optional[str]
+        """
+        if isinstance(batch_params, str):
+            return batch_params
+        if batch_params is None and isinstance(kwargs.get("input_file"), str):
+            return kwargs.pop("input_file")
+        return None
+
+    async def _read_input_chunks(self, input_file: str) -> AsyncIterator[pd.DataFrame]:
+        """
+        Read a batch input file input_chunk_size rows at a time. The next chunk is read in
+        the background while the current one is processed.
+
+        :param input_file: CSV file path
+        :type input_file: str
+        :return: Async iterator of chunks
+        :rtype: AsyncIterator[pd.DataFrame]
+        """
+        loop = asyncio.get_running_loop()
+        reader = await loop.run_in_executor(
+            None,
+            partial(pd.read_csv, input_file, chunksize=self.context.input_chunk_size),
+        )
+        with reader:
+            next_chunk = loop.run_in_executor(None, next, reader, None)
+            try:
+                while (chunk := await next_chunk) is not None:
+                    next_chunk = loop.run_in_executor(None, next, reader, None)
+                    yield chunk
+            finally:
+                await asyncio.gather(next_chunk, return_exceptions=True)
+
+    async def _fetch_result_file(
+        self,
+        session: SessionManager,
+        semaphore: asyncio.Semaphore,
+        filename: str,
+        bucket_name: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Download a result file while holding the semaphore, then parse it in the default
+        executor so that the next transfer can start while this file is parsed
+
+        :param session: Session to download with
+        :type session: SessionManager
+        :param semaphore: Limits the number of concurrent transfers
+        :type semaphore: asyncio.Semaphore
+        :param filename: Name of the file to download
+        :type filename: str
+        :param bucket_name: Bucket name to download from
+        :type bucket_name: Optional[str]
+        :return: Parsed file
+        :rtype: pd.DataFrame
+        """
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            None, self._read_stored_file, filename, bucket_name
+        )
+        if stored is not None:
+            return stored
+        async with semaphore:
+            content = await session.download(
+                f"{self.context.api_url}batch-download/",
+                filename=filename,
+                bucket_name=bucket_name,
+            )
+        return await loop.run_in_executor(
+            None, self._store_file, filename, bucket_name, content
+        )
 
     @hybrid
     async def _wait_for_results(
@@ -324,74 +562,205 @@ class BaseFinXClient(BaseMethods, ABC):
         :return: tuple of results and file results
         :rtype: tuple[list[Any], list[tuple[int, dict]]]
         """
-        remaining_keys = cache_keys
-        while len(remaining_keys):
-            time.sleep(0.05)
-            remaining_results = [
-                self.context.cache.get(key[1], {}).get(key[2], None)
-                for key in remaining_keys
-            ]
-            remaining_keys = [
-                remaining_keys[i]
-                for i, value in enumerate(remaining_results)
-                if value is None
-            ]
+        # Values are handed over as they land - a bounded cache may evict them again
+        results: list[Any] = [key[0] for key in cache_keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        waiters = self.context.expect_results(
+            [(cache_keys[i][1], cache_keys[i][2]) for i in pending]
+        )
+        for i, result in zip(pending, await asyncio.gather(*waiters)):
+            results[i] = result
         file_results: list[tuple[int, dict]] = []
-        results: list[Any] = [
-            self.context.cache.get(key[1], {}).get(key[2], None) for key in cache_keys
-        ]
         for i, result in enumerate(results):
             if not isinstance(result, dict):
                 continue
             if result.get("filename"):
                 file_results.append((i, result))
+        self._end_flights(cache_keys, results, file_results)
         if not file_results:
             return results, file_results
         # print(f"Results found for {len(cache_keys)} keys => {file_results}")
         downloaded_files = await self._download_file_results.run_async(file_results)
-        n_results = len(file_results)
+        indices_by_file: dict[str, list[int]] = {}
         for index, file_result in file_results:
-            check_strings = [
-                json.dumps(list(cache_keys[index])),
-                f"{list(cache_keys[index])}",
-            ]
+            indices_by_file.setdefault(file_result["filename"], []).append(index)
+        n_files = len(indices_by_file)
+        for n_loaded, (filename, indices) in enumerate(indices_by_file.items(), 1):
             print(
-                f"\rLoading result[{index + 1} / {n_results}]",
-                end=["", "\n"][index == (n_results - 1)],
+                f"\rLoading result file[{n_loaded} / {n_files}]",
+                end=["", "\n"][n_loaded == n_files],
             )
-            file_df = downloaded_files[file_result["filename"]]
-            if "cache_key" not in file_df:
-                matched_result = file_df
-            else:
-                matched_result = None
-                for key_as_str in check_strings:
-                    try:
-                        matched_result = file_df.loc[
-                            file_df["cache_key"] == key_as_str
-                        ].to_dict(orient="records")[0]
-                    except IndexError:
-                        continue
-                if matched_result is None:
-                    logging.critical(
-                        "Failed to find result for %s in %s",
-                        cache_keys[index],
-                        file_result["filename"],
-                    )
-                    raise IndexError(
-                        f"Failed to find result[{index}] = {cache_keys[index]}"
+            matched = await self._match_file_results(
+                [cache_keys[i] for i in indices], filename, downloaded_files[filename]
+            )
+            for index, matched_result in zip(indices, matched):
+                results[index] = matched_result
+        return results, file_results
+
+    @staticmethod
+    def _index_result_file(file_df: pd.DataFrame) -> Optional[pd.Series]:
+        """
+        Index the rows of a result file by canonical (cache_key, params_key), parsed once from
+        the cache_key column however the server stringified it (JSON or python repr)
+
+        :param file_df: Downloaded file
+        :type file_df: pd.DataFrame
+        :return: Position of the first row of every key (None if the file is not keyed)
+        :rtype: Optional[pd.Series]
+        """
+        if "cache_key" not in file_df:
+            return None
+        keys = file_df["cache_key"].astype(str).str.extract(_FILE_KEY_PATTERN)
+        rows = pd.Series(np.arange(len(file_df)), index=pd.MultiIndex.from_frame(keys))
+        return rows[~rows.index.duplicated()]
+
+    async def _match_file_results(
+        self,
+        cache_keys: list[list[str]],
+        filename: str,
+        file_df: pd.DataFrame,
+        rows: Optional[pd.Series] = None,
+    ) -> list[Any]:
+        """
+        Resolve every cache key referencing one result file with a single join against the
+        file and cache the matched rows in bulk
+
+        :param cache_keys: Cache keys whose result is in the file
+        :type cache_keys: list[list[str]]
+        :param filename: Name of the file
+        :type filename: str
+        :param file_df: Downloaded file
+        :type file_df: pd.DataFrame
+        :param rows: File index from _index_result_file (built if not given)
+        :type rows: Optional[pd.Series]
+        :return: Matched results in cache key order
+        :rtype: list[Any]
+        """
+        if rows is None:
+            rows = self._index_result_file(file_df)
+        if rows is None:
+            matched = [file_df] * len(cache_keys)
+        else:
+            positions = rows.reindex(
+                pd.MultiIndex.from_tuples([(key[1], key[2]) for key in cache_keys])
+            )
+            if (missing := positions.isna().to_numpy()).any():
+                index = int(missing.argmax())
+                logging.critical(
+                    "Failed to find result for %s in %s", cache_keys[index], filename
+                )
+                raise IndexError(
+                    f"Failed to find result[{index}] = {cache_keys[index]}"
+                )
+            matched = file_df.iloc[positions.to_numpy(dtype=int)].to_dict(
+                orient="records"
+            )
+            if "filename" in file_df:
+                matched = await asyncio.gather(
+                    *[self._download_nested_result(result) for result in matched]
+                )
+        self.context.cache.set_many(
+            [(key[1], key[2], result) for key, result in zip(cache_keys, matched)]
+        )
+        for key, result in zip(cache_keys, matched):
+            self.context.end_flight(key[1], key[2], result)
+        return matched
+
+    async def _download_nested_result(self, matched_result: dict) -> dict:
+        """
+        Download the file a matched result row points to
+
+        :param matched_result: Result row referencing a file
+        :type matched_result: dict
+        :return: Result with the downloaded file
+        :rtype: dict
+        """
+        matched_result["result"] = await self.download_file.run_async(**matched_result)
+        return {k: matched_result[k] for k in ["security_id", "result", "cache_key"]}
+
+    async def _stream_results(
+        self, cache_keys: list[list[str]]
+    ) -> AsyncIterator[tuple[int, Any]]:
+        """
+        Yield results with their index in cache_keys in the order they land. Each result
+        file is downloaded once, as soon as the first result referencing it arrives.
+
+        :param cache_keys: List of cache keys
+        :type cache_keys: list[list[str]]
+        :return: Async iterator of (index, result) pairs
+        :rtype: AsyncIterator[tuple[int, Any]]
+        """
+        landed: asyncio.Queue = asyncio.Queue()
+
+        def on_landed(index: int, waiter: asyncio.Future) -> None:
+            if not waiter.cancelled():
+                landed.put_nowait((index, waiter.result()))
+
+        pending = [i for i, key in enumerate(cache_keys) if key[0] is None]
+        waiters = self.context.expect_results(
+            [(cache_keys[i][1], cache_keys[i][2]) for i in pending]
+        )
+        for i, waiter in zip(pending, waiters):
+            waiter.add_done_callback(partial(on_landed, i))
+        for i, key in enumerate(cache_keys):
+            if key[0] is not None:
+                landed.put_nowait((i, key[0]))
+        downloads: dict[str, asyncio.Future] = {}
+        file_rows: dict[str, Optional[pd.Series]] = {}
+        semaphore = asyncio.Semaphore(self.context.download_concurrency)
+        # Not _download_session: a context manager suspended in an async generator is only
+        # cleaned up if the generator is closed, so a temporary session is closed explicitly
+        session = self.session or SessionManager()
+        try:
+            for _ in range(len(cache_keys)):
+                index, result = await landed.get()
+                cache_key = cache_keys[index]
+                if not isinstance(result, dict) or not result.get("filename"):
+                    self.context.end_flight(cache_key[1], cache_key[2], result)
+                    yield index, result
+                    continue
+                filename = result["filename"]
+                if filename not in downloads:
+                    downloads[filename] = asyncio.ensure_future(
+                        self._fetch_result_file(
+                            session, semaphore, filename, result.get("bucket_name")
+                        )
                     )
-            if "filename" in matched_result:
-                matched_result["result"] = await self.download_file.run_async(
-                    **matched_result
+                file_df = await downloads[filename]
+                if filename not in file_rows:
+                    file_rows[filename] = self._index_result_file(file_df)
+                matched = await self._match_file_results(
+                    [cache_key], filename, file_df, file_rows[filename]
                 )
-                matched_result = {
-                    k: matched_result[k] for k in ["security_id", "result", "cache_key"]
-                }
-            self.context.cache[cache_keys[index][1]][
-                cache_keys[index][2]
-            ] = matched_result
-            results[index] = matched_result
-        return results, file_results
+                yield index, matched[0]
+        finally:
+            for future in waiters + list(downloads.values()):
+                future.cancel()
+            if session is not self.session:
+                await session.cleanup.run_async()
+
+    def _end_flights(
+        self,
+        cache_keys: list[list[str]],
+        results: list[Any],
+        file_results: list[tuple[int, dict]],
+    ) -> None:
+        """
+        Hand results that need no download to callers awaiting the same request
+
+        :param cache_keys: List of cache keys
+        :type cache_keys: list[list[str]]
+        :param results: Results in cache key order
+        :type results: list[Any]
+        :param file_results: Results that still reference a file to download
+        :type file_results: list[tuple[int, dict]]
+        :return: None type
+        :rtype: None
+        """
+        pending = {index for index, _ in file_results}
+        for i, (cache_key, result) in enumerate(zip(cache_keys, results)):
+            if i not in pending:
+                self.context.end_flight(cache_key[1], cache_key[2], result)
 
     @hybrid
     async def _listen_for_results(
@@ -410,14 +779,10 @@ class BaseFinXClient(BaseMethods, ABC):
         :rtype: Any
         """
         try:
-            results, _ = await self._wait_for_results.run_async(cache_keys)
-            if (
-                (output_file := kwargs.get("output_file")) is not None
-                and len(results) > 0
-                and type(results[0]) in [list, dict]
-            ):
-                logging.debug("Writing data to %s", output_file)
-                pd.DataFrame(results).to_csv(output_file, index=False)
+            if (output_file := kwargs.get("output_file")) is None:
+                results, _ = await self._wait_for_results.run_async(cache_keys)
+            else:
+                results = await self._write_results(cache_keys, output_file)
             if callable(callback):
                 return callback(results, **kwargs, cache_keys=cache_keys)
             return (
@@ -429,6 +794,130 @@ class BaseFinXClient(BaseMethods, ABC):
             logging.critical("Failed to find result/execute callback: %s", format_exc())
             logging.critical("Exception: %s", e)
 
+    async def _write_results(
+        self, cache_keys: list[list[str]], output_file: str
+    ) -> list[Any]:
+        """
+        Collect results in input order while writing each one to output_file as soon as it
+        lands (rows are written in completion order), so that the file fills up chunk by
+        chunk during the batch rather than once it is complete
+
+        :param cache_keys: List of cache keys
+        :type cache_keys: list[list[str]]
+        :param output_file: Output file path
+        :type output_file: str
+        :return: Results in input order
+        :rtype: list[Any]
+        """
+        logging.debug("Writing data to %s", output_file)
+        results: list[Any] = [None] * len(cache_keys)
+        with ResultWriter(output_file, self.context.output_chunk_size) as writer:
+            async with aclosing(self._stream_results(cache_keys)) as landed:
+                async for index, result in landed:
+                    results[index] = result
+                    writer.write(result)
+        return results
+
+    def _invalidate_registered_securities(
+        self, api_method: str, persistent: bool = True, **kwargs
+    ) -> int:
+        """
+        Drop cached results of securities whose terms are (re)registered, along with cached
+        registrations so that a repeated registration is sent rather than served from cache.
+        Called in memory only before the cache lookup, and once more (including the on-disk
+        or shared cache, which is scanned) after the registration is answered and cached.
+
+        :param api_method: API method that was called
+        :type api_method: str
+        :param persistent: Also remove matching results from the backend (if configured)
+        :type persistent: bool
+        :param kwargs: Keyword arguments of the request
+        :type kwargs: dict
+        :return: Number of cached results removed
+        :rtype: int
+        """
+        if api_method != "register_temporary_bond":
+            return 0
+        if (batch_input := kwargs.get("batch_input")) is None:
+            batch_input = []
+        elif isinstance(batch_input, pd.DataFrame):
+            batch_input = batch_input.to_dict("records")
+        reference_data = [kwargs.get("reference_data")] + [
+            params.get("reference_data")
+            for params in batch_input
+            if isinstance(params, dict)
+        ]
+        security_ids = {
+            data.get("SecurityID", data.get("security_id"))
+            for data in reference_data
+            if isinstance(data, dict)
+        }
+        return self.context.invalidate(
+            api_method=api_method, persistent=persistent
+        ) + sum(
+            self.context.invalidate(security_id=security_id, persistent=persistent)
+            for security_id in security_ids
+            if security_id
+        )
+
+    def _revalidate(self, cache_lookup: CacheLookup, api_method: str, **kwargs) -> None:
+        """
+        Schedule a background refresh of a stale cache hit on the context event loop
+
+        :param cache_lookup: Stale cache lookup object
+        :type cache_lookup: CacheLookup
+        :param api_method: API method to call
+        :type api_method: str
+        :param kwargs: Keyword arguments of the original request
+        :type kwargs: dict
+        :return: None type
+        :rtype: None
+        """
+        if not self.context.begin_refresh(cache_lookup):
+            return
+        logging.debug("Serving stale result, refreshing %s", cache_lookup.key)
+        asyncio.run_coroutine_threadsafe(
+            self._refresh(cache_lookup, api_method, **kwargs), self.context.event_loop
+        )
+
+    async def _refresh(
+        self, cache_lookup: CacheLookup, api_method: str, **kwargs
+    ) -> None:
+        """
+        Re-issue a request whose cached result is stale. If the refresh fails, the stale
+        value is held fresh for negative_cache_ttl seconds; its own ttl is kept for the next
+        result.
+
+        :param cache_lookup: Stale cache lookup object
+        :type cache_lookup: CacheLookup
+        :param api_method: API method to call
+        :type api_method: str
+        :param kwargs: Keyword arguments of the original request
+        :type kwargs: dict
+        :return: None type
+        :rtype: None
+        """
+        key, param_key = cache_lookup.key, cache_lookup.param_key
+        start = time.perf_counter()
+        failed = True
+        try:
+            await self._dispatch.run_async(api_method, revalidate=True, **kwargs)
+            failed = self.context.cache.get(key, param_key, stale=True) is None or (
+                self.context.cache.is_negative(key, param_key)
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.error("Failed to refresh %s: %s", key, format_exc())
+        finally:
+            if failed:
+                self.context.cache.set(
+                    key,
+                    param_key,
+                    cache_lookup.value,
+                    persist=False,
+                    expires_in=self.context.negative_cache_ttl,
+                )
+            self.context.end_refresh(cache_lookup, time.perf_counter() - start, failed)
+
     @abstractmethod
     @hybrid
     async def _dispatch(self, api_method: str, **kwargs) -> dict:
@@ -461,6 +950,25 @@ class BaseFinXClient(BaseMethods, ABC):
         :rtype: list[dict]
         """
 
+    @abstractmethod
+    async def _stream_batch_dispatch(
+        self, api_method: str, batch_params: list[dict], **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Issue a batch request and yield each result as soon as it is available (in
+        completion order rather than input order)
+
+        :param api_method: API method to call
+        :type api_method: str
+        :param batch_params: List of api parameters
+        :type batch_params: list[dict]
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :return: Async iterator of results
+        :rtype: AsyncIterator[Any]
+        """
+        yield  # Implementations are async generators
+
     @hybrid
     async def load_functions(self):
         """
@@ -3,16 +3,32 @@
 author: dick mule
 purpose: Base Context Manager for FinX SDK
 """
+from concurrent.futures import Future
+from datetime import date
+from functools import lru_cache, partial
 from typing import Any, NamedTuple, Optional
 
 import asyncio
 import gc as garbage_collector
 import os
+import re
+import threading
 
-from pydantic import Field
+import numpy as np
+import pandas as pd
+
+from pydantic import Field, PrivateAttr
 
 from finx.base_classes.from_kwargs import BaseMethods
+from finx.utils.cache_backends import CacheBackend
 from finx.utils.enums import ExtendedEnum
+from finx.utils.file_store import ResultFileStore
+from finx.utils.latency import LatencyStats
+from finx.utils.normalization import normalize_params, normalize_value
+from finx.utils.persistent_cache import PersistentResultStore
+from finx.utils.result_cache import RefreshStats, ResultCache
+from finx.utils.shared_cache import SharedMemoryBackend
+from finx.utils.snapshot import read_snapshot, write_snapshot
 
 # pylint: disable=no-member
 
@@ -27,6 +43,91 @@ class _ParamCacheKeys(ExtendedEnum):
     output_file = 5
 
 
+_EXCLUDED_PARAMS = frozenset(_ParamCacheKeys.list())
+_ISO_DATE = r"\d{4}-\d{2}-\d{2}"
+_DETERMINISTIC_ERROR = re.compile(
+    r"invalid|not covered|not found|unknown|missing|required|unsupported|not supported",
+    re.IGNORECASE,
+)
+_TRANSIENT_ERROR = re.compile(
+    r"time[d ]?\s?out|server|unavailable|try again|rate limit|too many|connection",
+    re.IGNORECASE,
+)
+
+
+def _is_deterministic_error(error: Any) -> bool:
+    """
+    Whether an API error would recur if the same request were sent again (an invalid or
+    uncovered security, bad parameters) as opposed to a transient server or timeout error
+
+    :param error: Error payload returned by the API
+    :type error: Any
+    :return: True if the error is safe to cache
+    :rtype: bool
+    """
+    if isinstance(error, dict):
+        error = error.get("error", error.get("message", error))
+    text = str(error)
+    return bool(_DETERMINISTIC_ERROR.search(text)) and not _TRANSIENT_ERROR.search(text)
+
+
+def _hash_keys(canonical: np.ndarray) -> list[str]:
+    """
+    Hash canonical parameter strings into fixed width 64-bit hex keys
+
+    :param canonical: Object array of canonical parameter strings
+    :type canonical: np.ndarray
+    :return: 16 character hex digests
+    :rtype: list[str]
+    """
+    return [f"{h:016x}" for h in pd.util.hash_array(canonical, categorize=False)]
+
+
+@lru_cache(maxsize=65536)
+def _params_key(items: tuple[tuple[str, type, Any], ...]) -> str:
+    """
+    Parameter key of one request, memoized so that repeated requests reuse the hash
+
+    :param items: Sorted (name, type, canonical value) of the parameters to hash (the type
+        keeps e.g. True and 1.0 apart, which compare equal)
+    :type items: tuple[tuple[str, type, Any], ...]
+    :return: 16 character hex digest or NONE if there is nothing to hash
+    :rtype: str
+    """
+    canonical = ",".join([f"{key}:{value}" for key, _, value in items])
+    if not canonical:
+        return "NONE"
+    return _hash_keys(np.array([canonical], dtype=object))[0]
+
+
+def _as_str(values: pd.Series) -> pd.Series:
+    """
+    Format every value of a column exactly as an f-string would (None -> "None")
+
+    :param values: Column of canonical values
+    :type values: pd.Series
+    :return: Object column of strings
+    :rtype: pd.Series
+    """
+    return (
+        values.astype(object).where(values.notna(), "None").astype(str).astype(object)
+    )
+
+
+def _settle_futures(settled: list[tuple[asyncio.Future, Any]]) -> None:
+    """
+    Resolve result futures on their own event loop (skipping any that were cancelled)
+
+    :param settled: (future, result) pairs
+    :type settled: list[tuple[asyncio.Future, Any]]
+    :return: None type
+    :rtype: None
+    """
+    for future, result in settled:
+        if not future.done():
+            future.set_result(result)
+
+
 class CacheLookup(NamedTuple):
     """A named tuple for cache lookup values"""
 
@@ -35,6 +136,8 @@ class CacheLookup(NamedTuple):
     param_key: str
 
 
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-public-methods
 class ApiContextManager(BaseMethods):
     """
     Context manager that manages the api key, endpoint configurations, and the results cache
@@ -42,12 +145,41 @@ class ApiContextManager(BaseMethods):
 
     api_key: Optional[str] = Field(None, hidden=True, repr=False)
     api_url: Optional[str] = Field(None, hidden=True, repr=False)
-    cache_size: int = Field(100000, repr=False)
-    cache: dict[str, dict[str, dict]] = Field(default_factory=dict, repr=False)
+    cache_size: Optional[int] = Field(100000, repr=False)
+    cache_max_bytes: Optional[int] = Field(None, repr=False)
+    cache_compression_threshold: Optional[int] = Field(None, repr=False)
+    cache: Optional[ResultCache] = Field(None, repr=False)
+    cache_backend: Optional[CacheBackend] = Field(None, repr=False)
+    persistent_cache_path: Optional[str] = Field(None, repr=False)
+    shared_cache_name: Optional[str] = Field(None, repr=False)
+    result_file_cache_dir: Optional[str] = Field(None, repr=False)
+    result_file_cache_max_bytes: Optional[int] = Field(None, repr=False)
+    file_store: Optional[ResultFileStore] = Field(None, repr=False)
+    negative_cache_ttl: float = Field(300.0, repr=False)
+    current_result_ttl: Optional[float] = Field(3600.0, repr=False)
+    result_ttls: dict[str, Optional[float]] = Field(default_factory=dict, repr=False)
+    stale_while_revalidate: bool | list[str] = Field(False, repr=False)
+    refresh_stats: RefreshStats = Field(default_factory=RefreshStats, repr=False)
     timeout: int = Field(100, repr=False)
+    hedge_requests: bool | list[str] = Field(False, repr=False)
+    hedge_percentile: float = Field(0.99, repr=False)
+    hedge_min_samples: int = Field(20, repr=False)
+    latency_stats: LatencyStats = Field(default_factory=LatencyStats, repr=False)
+    download_concurrency: int = Field(8, repr=False)
+    csv_engine: str = Field("c", repr=False)
+    input_chunk_size: int = Field(100000, repr=False)
+    output_chunk_size: int = Field(10000, repr=False)
     event_loop: asyncio.AbstractEventLoop = Field(
         default_factory=asyncio.get_event_loop, repr=False
     )
+    _refreshing: set[tuple[str, str]] = PrivateAttr(default_factory=set)
+    _refresh_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: dict[tuple[str, str], Future] = PrivateAttr(default_factory=dict)
+    _flight_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _waiters: dict[tuple[str, str], list[asyncio.Future]] = PrivateAttr(
+        default_factory=dict
+    )
+    _waiter_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
 
     def model_post_init(self, __context: Any) -> None:
         """
@@ -74,18 +206,464 @@ class ApiContextManager(BaseMethods):
             self.api_url += "/"
         if "api/" not in self.api_url:
             self.api_url += "api/"
+        self.persistent_cache_path = self.persistent_cache_path or os.environ.get(
+            "FINX_PERSISTENT_CACHE_PATH"
+        )
+        self.shared_cache_name = self.shared_cache_name or os.environ.get(
+            "FINX_SHARED_CACHE_NAME"
+        )
+        if self.persistent_cache_path and self.shared_cache_name:
+            raise ValueError(
+                "persistent_cache_path and shared_cache_name are mutually exclusive - "
+                "set only one of them (or pass a cache_backend)"
+            )
+        if self.cache_backend is None and self.persistent_cache_path:
+            self.cache_backend = PersistentResultStore(self.persistent_cache_path)
+        elif self.cache_backend is None and self.shared_cache_name:
+            self.cache_backend = SharedMemoryBackend(self.shared_cache_name)
+        self.result_file_cache_dir = self.result_file_cache_dir or os.environ.get(
+            "FINX_RESULT_FILE_CACHE_DIR"
+        )
+        if self.file_store is None and self.result_file_cache_dir:
+            self.file_store = ResultFileStore(
+                self.result_file_cache_dir, self.result_file_cache_max_bytes
+            )
+        if self.cache is None:
+            self.cache = ResultCache(
+                self.cache_size,
+                self.cache_max_bytes,
+                self.cache_backend,
+                self.cache_compression_threshold,
+            )
         super().model_post_init(__context)
 
-    def clear_cache(self) -> None:
+    def clear_cache(self, persistent: bool = False) -> None:
         """
         Clear the cache and run the garbage collector
 
+        :param persistent: Also clear the on-disk cache (if configured)
+        :type persistent: bool
         :return: None type
         :rtype: None
         """
-        self.cache.clear()
+        self.cache.clear(persistent)
         garbage_collector.collect()
 
+    def invalidate(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+        persistent: bool = True,
+    ) -> int:
+        """
+        Remove cached results of a security, date and/or api method without touching the rest
+        of the cache. Every given field must match; at least one field is required.
+
+        .. code-block:: python
+
+            >>> context.invalidate(security_id="912796YB9")
+            >>> context.invalidate(as_of_date="2024-09-30", api_method="get_curve")
+
+        :param security_id: Security ID
+        :type security_id: Optional[str]
+        :param as_of_date: As of date (any parseable format)
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method
+        :type api_method: Optional[str]
+        :param persistent: Also remove matching results from the on-disk cache (if configured)
+        :type persistent: bool
+        :return: Number of cached results removed from memory
+        :rtype: int
+        """
+        return self.cache.invalidate(
+            normalize_value("security_id", security_id),
+            normalize_value("as_of_date", as_of_date),
+            api_method,
+            persistent,
+        )
+
+    @staticmethod
+    def _snapshot_filters(
+        api_method: Optional[str | list[str]], as_of_date: Optional[str | list[str]]
+    ) -> tuple[Optional[list[str]], Optional[list[str]]]:
+        """
+        Coerce snapshot filters to lists of canonical values
+
+        :param api_method: Api method(s) or None for all
+        :type api_method: Optional[str | list[str]]
+        :param as_of_date: As of date(s) in any parseable format or None for all
+        :type as_of_date: Optional[str | list[str]]
+        :return: Tuple of api methods and canonical as of dates
+        :rtype: tuple[Optional[list[str]], Optional[list[str]]]
+        """
+        api_methods = [api_method] if isinstance(api_method, str) else api_method
+        as_of_dates = [as_of_date] if isinstance(as_of_date, str) else as_of_date
+        if as_of_dates is not None:
+            as_of_dates = [normalize_value("as_of_date", x) for x in as_of_dates]
+        return api_methods, as_of_dates
+
+    def export_cache(
+        self,
+        path: str,
+        api_method: Optional[str | list[str]] = None,
+        as_of_date: Optional[str | list[str]] = None,
+    ) -> int:
+        """
+        Write cached results to a compact binary snapshot (e.g. after a nightly run)
+
+        .. code-block:: python
+
+            >>> context.export_cache("eod.finx", api_method="get_security_reference_data")
+
+        :param path: Snapshot file path
+        :type path: str
+        :param api_method: Only export these api method(s) (None for all)
+        :type api_method: Optional[str | list[str]]
+        :param as_of_date: Only export these as of date(s) (None for all)
+        :type as_of_date: Optional[str | list[str]]
+        :return: Number of results exported
+        :rtype: int
+        """
+        return write_snapshot(
+            path, self.cache.snapshot(*self._snapshot_filters(api_method, as_of_date))
+        )
+
+    def import_cache(
+        self,
+        path: str,
+        api_method: Optional[str | list[str]] = None,
+        as_of_date: Optional[str | list[str]] = None,
+    ) -> int:
+        """
+        Warm the cache from a snapshot written by export_cache. Sections of other api
+        methods and dates are skipped without being decoded.
+
+        :param path: Snapshot file path
+        :type path: str
+        :param api_method: Only import these api method(s) (None for all)
+        :type api_method: Optional[str | list[str]]
+        :param as_of_date: Only import these as of date(s) (None for all)
+        :type as_of_date: Optional[str | list[str]]
+        :return: Number of results imported
+        :rtype: int
+        """
+        filters = self._snapshot_filters(api_method, as_of_date)
+        return sum(
+            self.cache.restore(entries) for entries in read_snapshot(path, *filters)
+        )
+
+    def cache_stats(self) -> pd.DataFrame:
+        """
+        Hits, misses, inserts, evictions, entries and bytes held per api method, e.g. to
+        size the cache or spot methods whose results are never reused
+
+        :return: DataFrame indexed by api_method
+        :rtype: pd.DataFrame
+        """
+        stats = pd.DataFrame.from_dict(self.cache.stats(), orient="index")
+        stats.index.name = "api_method"
+        if stats.empty:
+            return stats
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups.where(lookups > 0)).fillna(0.0)
+        return stats.sort_index()
+
+    def latency_report(self) -> pd.DataFrame:
+        """
+        Requests, median and hedge_percentile latency (the hedge cutoff), hedged requests,
+        hedges that answered first, timeouts and the extra load hedging added per api method
+
+        :return: DataFrame indexed by api_method
+        :rtype: pd.DataFrame
+        """
+        stats = pd.DataFrame.from_dict(
+            self.latency_stats.snapshot(self.hedge_percentile), orient="index"
+        )
+        stats.index.name = "api_method"
+        return stats.sort_index()
+
+    def cache_error(self, cache_key: str, params_key: str, error: Any) -> None:
+        """
+        Record a failed (uncovered/invalid) request for negative_cache_ttl seconds so that
+        repeated requests surface the error without a round trip. Transient errors (server
+        errors, timeouts) are not cached: the pending placeholder is dropped so that the
+        next request is sent again. Callers awaiting the result receive the error either way.
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param error: Error payload returned by the API
+        :type error: Any
+        :return: None type
+        :rtype: None
+        """
+        if _is_deterministic_error(error):
+            self.cache.set_error(cache_key, params_key, error, self.negative_cache_ttl)
+        else:
+            self.cache.delete(cache_key, params_key)
+        self.complete_results([(cache_key, params_key, error)])
+
+    def cache_results(self, results: list[tuple[str, str, Any]]) -> None:
+        """
+        Cache results as they arrive and wake every caller awaiting them
+
+        :param results: (cache_key, params_key, value) items
+        :type results: list[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        self.cache.set_many(results)
+        self.complete_results(results)
+
+    def expect_results(self, keys: list[tuple[str, str]]) -> list[asyncio.Future]:
+        """
+        Get a future per (cache_key, params_key) on the running event loop that resolves as
+        soon as the result lands (see complete_results). Results that are already cached
+        resolve immediately.
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :return: Futures in key order
+        :rtype: list[asyncio.Future]
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        with self._waiter_lock:
+            for key in keys:
+                future = loop.create_future()
+                if (value := self.cache.get(*key)) is not None:
+                    future.set_result(value)
+                else:
+                    self._waiters.setdefault(key, []).append(future)
+                    future.add_done_callback(partial(self._forget_waiter, key))
+                futures.append(future)
+        return futures
+
+    def _forget_waiter(self, key: tuple[str, str], future: asyncio.Future) -> None:
+        """
+        Unregister a cancelled waiter (settled waiters were already removed)
+
+        :param key: (cache_key, params_key) pair
+        :type key: tuple[str, str]
+        :param future: Waiter future
+        :type future: asyncio.Future
+        :return: None type
+        :rtype: None
+        """
+        if not future.cancelled():
+            return
+        with self._waiter_lock:
+            waiters = self._waiters.get(key, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._waiters.pop(key, None)
+
+    def complete_results(self, results: list[tuple[str, str, Any]]) -> None:
+        """
+        Resolve the futures awaiting results. Safe to call from any thread - each event
+        loop is woken once through call_soon_threadsafe, however many results it awaits.
+
+        :param results: (cache_key, params_key, value) items
+        :type results: list[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        by_loop: dict[asyncio.AbstractEventLoop, list] = {}
+        with self._waiter_lock:
+            if not self._waiters:
+                return
+            for cache_key, params_key, value in results:
+                for future in self._waiters.pop((cache_key, params_key), []):
+                    by_loop.setdefault(future.get_loop(), []).append((future, value))
+        for loop, settled in by_loop.items():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_settle_futures, settled)
+
+    def result_ttl(
+        self, api_method: str, as_of_date: Optional[str] = None
+    ) -> Optional[float]:
+        """
+        Seconds a result stays fresh. Results for a past as_of_date never change and are
+        pinned (None); results for today (or no as_of_date) expire after the api_method's
+        entry in result_ttls, falling back to current_result_ttl.
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param as_of_date: Canonical (YYYY-MM-DD) as of date of the request
+        :type as_of_date: Optional[str]
+        :return: Time to live in seconds or None if the result never expires
+        :rtype: Optional[float]
+        """
+        if (
+            isinstance(as_of_date, str)
+            and re.fullmatch(_ISO_DATE, as_of_date)
+            and as_of_date < date.today().isoformat()
+        ):
+            return None
+        return self.result_ttls.get(api_method, self.current_result_ttl)
+
+    def _result_ttls_from_frame(
+        self, api_method: str, frame: pd.DataFrame
+    ) -> list[Optional[float]]:
+        """
+        Vectorized equivalent of result_ttl for a batch of requests
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param frame: Canonical request parameters, one request per row
+        :type frame: pd.DataFrame
+        :return: Time to live for every row
+        :rtype: list[Optional[float]]
+        """
+        ttl = self.result_ttls.get(api_method, self.current_result_ttl)
+        if ttl is None or "as_of_date" not in frame:
+            return [ttl] * len(frame)
+        as_of_dates = _as_str(frame["as_of_date"]).astype(str)
+        pinned = as_of_dates.str.fullmatch(_ISO_DATE) & (
+            as_of_dates < date.today().isoformat()
+        )
+        return [None if x else ttl for x in pinned.tolist()]
+
+    def serves_stale(self, api_method: str) -> bool:
+        """
+        Check if expired results of an api method are served while they are refreshed
+        (stale_while_revalidate is either a flag for every method or a list of methods)
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :return: True if stale results are served
+        :rtype: bool
+        """
+        if isinstance(self.stale_while_revalidate, bool):
+            return self.stale_while_revalidate
+        return api_method in self.stale_while_revalidate
+
+    def hedge_delay(self, api_method: str) -> Optional[float]:
+        """
+        Seconds after which an outstanding request of an api method is duplicated - the
+        hedge_percentile of its observed latency, once hedge_min_samples requests were
+        observed (hedge_requests is either a flag for every method or a list of methods)
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :return: Delay in seconds or None if the request is not hedged
+        :rtype: Optional[float]
+        """
+        if isinstance(self.hedge_requests, bool):
+            hedged = self.hedge_requests
+        else:
+            hedged = api_method in self.hedge_requests
+        if not hedged:
+            return None
+        delay = self.latency_stats.percentile(
+            api_method, self.hedge_percentile, self.hedge_min_samples
+        )
+        return None if delay is None or delay >= self.timeout else delay
+
+    def is_stale(self, cache_lookup: CacheLookup) -> bool:
+        """
+        Check if a cache hit was served after its ttl expired
+
+        :param cache_lookup: Cache lookup object
+        :type cache_lookup: CacheLookup
+        :return: True if the value is stale
+        :rtype: bool
+        """
+        return cache_lookup.value is not None and self.cache.is_expired(
+            cache_lookup.key, cache_lookup.param_key
+        )
+
+    def begin_refresh(self, cache_lookup: CacheLookup) -> bool:
+        """
+        Claim a stale entry for refreshing so that concurrent hits do not refresh it twice
+
+        :param cache_lookup: Cache lookup object
+        :type cache_lookup: CacheLookup
+        :return: True if the caller should refresh the entry
+        :rtype: bool
+        """
+        key = (cache_lookup.key, cache_lookup.param_key)
+        with self._refresh_lock:
+            if key in self._refreshing or not self.is_stale(cache_lookup):
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(
+        self, cache_lookup: CacheLookup, latency: float, failed: bool = False
+    ) -> None:
+        """
+        Release a refreshed entry and record the refresh
+
+        :param cache_lookup: Cache lookup object
+        :type cache_lookup: CacheLookup
+        :param latency: Seconds the refresh took
+        :type latency: float
+        :param failed: The refresh raised or returned an error
+        :type failed: bool
+        :return: None type
+        :rtype: None
+        """
+        with self._refresh_lock:
+            self._refreshing.discard((cache_lookup.key, cache_lookup.param_key))
+        self.refresh_stats.record(latency, failed)
+
+    def join_flight(self, cache_lookup: CacheLookup) -> tuple[Future, bool]:
+        """
+        Single-flight a cache miss: the first caller owns the request and must settle it with
+        end_flight, identical concurrent callers await the owner's future instead of sending
+        the same request again
+
+        :param cache_lookup: Cache lookup object
+        :type cache_lookup: CacheLookup
+        :return: Tuple of the (thread safe) future and True if the caller owns the request
+        :rtype: tuple[Future, bool]
+        """
+        key = (cache_lookup.key, cache_lookup.param_key)
+        with self._flight_lock:
+            if (future := self._in_flight.get(key)) is not None:
+                return future, False
+            if (value := self.cache.get(*key)) is not None:
+                # The owner settled between the caller's cache check and now
+                future = Future()
+                future.set_result(value)
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def end_flight(
+        self,
+        cache_key: str,
+        params_key: str,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Settle an in-flight request, waking every caller waiting on it (no-op if there is none)
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param result: Result of the request
+        :type result: Any
+        :param error: Exception raised by the request
+        :type error: Optional[BaseException]
+        :return: None type
+        :rtype: None
+        """
+        with self._flight_lock:
+            future = self._in_flight.pop((cache_key, params_key), None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
     @staticmethod
     def _cache_key_from_kwargs(api_method: str, **kwargs) -> str:
         """
@@ -105,9 +683,71 @@ class ApiContextManager(BaseMethods):
         )
         return cache_key
 
+    @staticmethod
+    def _cache_keys_from_frame(api_method: str, frame: pd.DataFrame) -> list[str]:
+        """
+        Vectorized equivalent of _cache_key_from_kwargs for a batch of requests
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param frame: Canonical request parameters, one request per row
+        :type frame: pd.DataFrame
+        :return: Cache key for every row
+        :rtype: list[str]
+        """
+        if "security_id" not in frame:
+            return [api_method] * len(frame)
+        security_ids = frame["security_id"]
+        as_of_dates = frame.get("as_of_date", pd.Series(None, index=frame.index))
+        keyed = _as_str(security_ids) + ":" + _as_str(as_of_dates) + ":"
+        has_id = security_ids.notna() & (security_ids != "")
+        return (keyed.where(has_id, "") + api_method).tolist()
+
+    @staticmethod
+    def _params_key_from_kwargs(**kwargs) -> str:
+        """
+        Create a parameter key: a 64-bit hash (as 16 hex digits) of every parameter that is
+        not already part of the cache key
+
+        :param kwargs: Canonical request parameters
+        :type kwargs: dict
+        :return: Parameter key
+        :rtype: str
+        """
+        items = tuple(
+            sorted(
+                (key, type(value), value)
+                for key, value in kwargs.items()
+                if key not in _EXCLUDED_PARAMS
+            )
+        )
+        try:
+            return _params_key(items)
+        except TypeError:  # unhashable values (lists, dicts) are hashed every time
+            return _params_key.__wrapped__(items)
+
+    @staticmethod
+    def _params_keys_from_frame(frame: pd.DataFrame) -> list[str]:
+        """
+        Vectorized equivalent of _params_key_from_kwargs for a batch of requests
+
+        :param frame: Canonical request parameters, one request per row
+        :type frame: pd.DataFrame
+        :return: Parameter key for every row
+        :rtype: list[str]
+        """
+        columns = sorted(key for key in frame.columns if key not in _EXCLUDED_PARAMS)
+        if not columns:
+            return ["NONE"] * len(frame)
+        canonical = pd.Series("", index=frame.index, dtype=object)
+        for i, key in enumerate(columns):
+            canonical = canonical + f'{"," if i else ""}{key}:' + _as_str(frame[key])
+        return _hash_keys(canonical.to_numpy(dtype=object))
+
     def check_cache(self, api_method: str, **kwargs) -> CacheLookup:
         """
-        Check the cache for a value
+        Check the cache for a value. Parameters are canonicalized first so that equivalent
+        requests (9/30/24 vs 2024-09-30, 100 vs 100.0, "false" vs False) share an entry.
 
         :param api_method: Name of the API method
         :type api_method: str
@@ -116,22 +756,78 @@ class ApiContextManager(BaseMethods):
         :return: Cache lookup object
         :rtype: CacheLookup
         """
-        params: dict = {} if not kwargs else kwargs
+        return self.check_normalized_cache(api_method, normalize_params(kwargs))
+
+    def check_normalized_cache(self, api_method: str, params: dict) -> CacheLookup:
+        """
+        Check the cache for a value whose parameters were already canonicalized
+        (see finx.utils.normalization)
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param params: Canonical request parameters
+        :type params: dict
+        :return: Cache lookup object
+        :rtype: CacheLookup
+        """
         cache_key: str = self._cache_key_from_kwargs(api_method, **params)
-        params_key: str = (
-            ",".join(
-                [
-                    f"{key}:{params[key]}"
-                    for key in sorted(params.keys())
-                    if key not in _ParamCacheKeys.list()
-                ]
-            )
-            or "NONE"
-        )
-        cached_value = self.cache.get(cache_key, {}).get(params_key)
+        params_key: str = self._params_key_from_kwargs(**params)
+        ttl = self.result_ttl(api_method, params.get("as_of_date"))
+        return self._lookup(cache_key, params_key, ttl, self.serves_stale(api_method))
+
+    def check_cache_batch(
+        self, api_method: str, frame: pd.DataFrame, base_params: dict = None
+    ) -> list[CacheLookup]:
+        """
+        Check the cache for every row of a canonicalized batch of requests.
+        Keys for the whole batch are built column-wise in one vectorized pass and every miss
+        is read through to the cache backend in a single round trip.
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param frame: Canonical request parameters, one request per row
+        :type frame: pd.DataFrame
+        :param base_params: Canonical parameters shared by every request
+        :type base_params: dict
+        :return: Cache lookup objects in row order
+        :rtype: list[CacheLookup]
+        """
+        frame = frame.copy()
+        for key, value in (base_params or {}).items():
+            if key not in frame:
+                frame[key] = pd.Series([value] * len(frame), frame.index, object)
+        cache_keys = self._cache_keys_from_frame(api_method, frame)
+        params_keys = self._params_keys_from_frame(frame)
+        ttls = self._result_ttls_from_frame(api_method, frame)
+        keys = list(zip(cache_keys, params_keys))
+        values = self.cache.fetch_many(keys, ttls, self.serves_stale(api_method))
+        for key, ttl, value in zip(keys, ttls, values):
+            if value is None:
+                self.cache.reserve(*key, ttl)
+        return [CacheLookup(value, *key) for key, value in zip(keys, values)]
+
+    def _lookup(
+        self,
+        cache_key: str,
+        params_key: str,
+        ttl: Optional[float] = None,
+        stale: bool = False,
+    ) -> CacheLookup:
+        """
+        Look up a key pair and reserve a placeholder on a miss
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param ttl: Seconds the result stays fresh (None to pin)
+        :type ttl: Optional[float]
+        :param stale: Return expired values (see stale_while_revalidate)
+        :type stale: bool
+        :return: Cache lookup object
+        :rtype: CacheLookup
+        """
+        cached_value = self.cache.fetch(cache_key, params_key, ttl, stale)
         if cached_value is None:
-            # pylint: disable=unsupported-assignment-operation
-            self.cache[cache_key] = {}
-            # pylint: disable=unsubscriptable-object
-            self.cache[cache_key][params_key] = None
+            self.cache.reserve(cache_key, params_key, ttl)
         return CacheLookup(cached_value, cache_key, params_key)
@@ -6,15 +6,14 @@ purpose: base class for AIOHTTP session manager
 import asyncio
 import logging
 
-from io import StringIO
 from typing import Any, Optional
 
 import aiohttp
-import pandas as pd
 
 from pydantic import BaseModel, PrivateAttr
 
 from finx.utils.concurrency import hybrid, Hybrid
+from finx.utils.payload_parsing import parse_csv
 
 
 class SessionManager(BaseModel):
@@ -102,6 +101,7 @@ class SessionManager(BaseModel):
         self,
         url: str,
         is_json_response: bool = True,
+        csv_engine: str = "c",
         **kwargs,
     ):
         """
@@ -111,6 +111,8 @@ class SessionManager(BaseModel):
         :type url: str
         :param is_json_response: Boolean flag to determine if the response is JSON
         :type is_json_response: bool
+        :param csv_engine: pandas read_csv engine for CSV responses (c or pyarrow)
+        :type csv_engine: str
         :param kwargs: Data to be sent to the endpoint
         :type kwargs: dict
         :return: dictionary of the response
@@ -121,13 +123,32 @@ class SessionManager(BaseModel):
             resp.raise_for_status()
             if is_json_response:
                 return await resp.json()
-            return pd.read_csv(
-                StringIO((await resp.content.read()).decode("utf-8")),
-                engine="python",
-                converters={"security_id": str},
-            )
+            return parse_csv(await resp.read(), csv_engine)
+
+    async def download(self, url: str, **kwargs) -> bytes:
+        """
+        Call an endpoint with a GET request asynchronously and return the raw body, leaving
+        parsing to the caller (e.g. off the event loop)
 
-    async def get(self, url: str, is_json_response: bool = True, **kwargs):
+        :param url: String URL of the endpoint
+        :type url: str
+        :param kwargs: Query parameters (None values are dropped)
+        :type kwargs: dict
+        :return: Response body
+        :rtype: bytes
+        """
+        params = {k: v for k, v in kwargs.items() if v is not None}
+        async with self._session.get(url, params=params) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def get(
+        self,
+        url: str,
+        is_json_response: bool = True,
+        csv_engine: str = "c",
+        **kwargs,
+    ):
         """
         Call an endpoint with a GET request asynchronously
 
@@ -135,6 +156,8 @@ class SessionManager(BaseModel):
         :type url: str
         :param is_json_response: Boolean flag to determine if the response is JSON
         :type is_json_response: bool
+        :param csv_engine: pandas read_csv engine for CSV responses (c or pyarrow)
+        :type csv_engine: str
         :param kwargs: Data to be sent to the endpoint
         :type kwargs: dict
         :return: dictionary of the response
@@ -144,8 +167,4 @@ class SessionManager(BaseModel):
             resp.raise_for_status()
             if is_json_response:
                 return await resp.json()
-            return pd.read_csv(
-                StringIO((await resp.content.read()).decode("utf-8")),
-                engine="python",
-                converters={"security_id": str},
-            )
+            return parse_csv(await resp.read(), csv_engine)
@@ -3,20 +3,24 @@
 author: dick mule
 purpose: FinX Rest Client
 """
-from typing import Any
+from functools import partial
+from typing import Any, AsyncIterator
 from platform import system
 
 import asyncio
 import json
 import logging
+import time
 
 import requests
 
 from finx.base_classes.base_client import BaseFinXClient, SessionManager
 from finx.base_classes.context_manager import CacheLookup
 from finx.utils.concurrency import hybrid
+from finx.utils.output_writer import ResultWriter
 from finx.utils.task_runner import TaskRunner
 
+_MAX_IN_FLIGHT = 100
 
 # pylint: disable=no-member
 # pylint: disable=consider-using-with)
@@ -68,10 +72,11 @@ class FinXRestClient(BaseFinXClient):
         """
         if (error := data.get("error")) is not None:
             logging.error("API returned error: %s", error)
+            self.context.cache_error(cache_lookup.key, cache_lookup.param_key, error)
             return error
         if isinstance(data.get("data"), dict) and data.get("data", {}).get("filename"):
             data = self.download_file(data["data"])
-        self.context.cache[cache_lookup.key] = data
+        self.context.cache.set(cache_lookup.key, cache_lookup.param_key, data)
         return data
 
     @hybrid
@@ -81,11 +86,12 @@ class FinXRestClient(BaseFinXClient):
 
         :param api_method: API method to call
         :type api_method: str
-        :param kwargs: Keyword arguments
+        :param kwargs: Keyword arguments (revalidate=True bypasses a cached result)
         :type kwargs: dict
         :return: Response from the API
         :rtype: dict
         """
+        revalidate: bool = kwargs.pop("revalidate", False)
         payload: dict = {"finx_api_key": self.context.api_key, "api_method": api_method}
         is_json_data = len(kwargs) > 0
         payload.update(
@@ -95,20 +101,97 @@ class FinXRestClient(BaseFinXClient):
                 if key not in ["finx_api_key", "api_method"]
             }
         )
+        self._invalidate_registered_securities(api_method, persistent=False, **kwargs)
         cache_lookup = self.context.check_cache(api_method, **kwargs)
-        if cache_lookup.value is not None:
+        if cache_lookup.value is not None and not revalidate:
+            if self.context.is_stale(cache_lookup):
+                self._revalidate(cache_lookup, api_method, **kwargs)
             return cache_lookup.value
+        flight, is_owner = self.context.join_flight(cache_lookup)
+        if not is_owner:
+            logging.debug("Awaiting in-flight request for %s", cache_lookup.key)
+            return await asyncio.wrap_future(flight)
         logging.debug("API CALL: %s with %s / %s", api_method, payload, kwargs)
-        if not self.session:
-            async with SessionManager() as session:
-                data = await session.post(
-                    self.context.api_url, is_json_data=is_json_data, **payload
+        try:
+            if not self.session:
+                async with SessionManager() as session:
+                    data = await self._hedged_post(
+                        session, api_method, is_json_data, payload
+                    )
+            else:
+                data = await self._hedged_post(
+                    self.session, api_method, is_json_data, payload
                 )
-                return self._unpack_session_response(data, cache_lookup)
-        data = await self.session.post(
-            self.context.api_url, is_json_data=is_json_data, **payload
+            result = self._unpack_session_response(data, cache_lookup)
+            self._invalidate_registered_securities(api_method, **kwargs)
+        except BaseException as e:
+            self.context.end_flight(cache_lookup.key, cache_lookup.param_key, error=e)
+            raise
+        self.context.end_flight(cache_lookup.key, cache_lookup.param_key, result)
+        return result
+
+    async def _hedged_post(
+        self,
+        session: SessionManager,
+        api_method: str,
+        is_json_data: bool,
+        payload: dict,
+    ) -> Any:
+        """
+        Post a request, giving up after context.timeout seconds. If hedging is enabled for
+        the api method and the request is still outstanding after the hedge percentile of
+        its observed latency, a duplicate is posted and whichever answers first wins.
+
+        :param session: Session to post with
+        :type session: SessionManager
+        :param api_method: API method to call
+        :type api_method: str
+        :param is_json_data: Send the payload as JSON
+        :type is_json_data: bool
+        :param payload: Request payload
+        :type payload: dict
+        :return: Response from the API
+        :rtype: Any
+        """
+        post = partial(
+            session.post,
+            self.context.api_url,
+            csv_engine=self.context.csv_engine,
+            is_json_data=is_json_data,
+            **payload,
         )
-        return self._unpack_session_response(data, cache_lookup)
+        delay = self.context.hedge_delay(api_method)
+        start = time.perf_counter()
+        attempts = [asyncio.ensure_future(post())]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    logging.debug("Hedging %s after %.3fs", api_method, delay)
+                    attempts.append(asyncio.ensure_future(post()))
+            done, _ = await asyncio.wait(
+                attempts,
+                timeout=self.context.timeout - (time.perf_counter() - start),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                self.context.latency_stats.record_timeout(
+                    api_method, hedged=len(attempts) > 1
+                )
+                raise asyncio.TimeoutError(
+                    f"{api_method} did not answer within {self.context.timeout}s"
+                )
+            winner = next(attempt for attempt in attempts if attempt in done)
+            self.context.latency_stats.record(
+                api_method,
+                time.perf_counter() - start,
+                hedged=len(attempts) > 1,
+                hedge_won=winner is not attempts[0],
+            )
+            return winner.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
 
     @hybrid
     async def _batch_dispatch(
@@ -136,6 +219,63 @@ class FinXRestClient(BaseFinXClient):
             [{"api_method": api_method} | params for params in batch_params], **kwargs
         )
 
+    async def _stream_batch_dispatch(
+        self, api_method: str, batch_params: list[dict], **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Issue a request for each input (at most _MAX_IN_FLIGHT at a time) and yield each
+        response as soon as it completes (in completion order rather than input order).
+        A CSV input file (batch_params or input_file) is read input_chunk_size rows at a time
+        and responses are written to output_file as they are yielded.
+
+        :param api_method: API method to call
+        :type api_method: str
+        :param batch_params: List of api method parameters or a CSV input file path
+        :type batch_params: list[dict]
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :return: Async iterator of responses
+        :rtype: AsyncIterator[Any]
+        """
+        if api_method == "list_api_functions":
+            raise ValueError("list_api_functions cannot be batched")
+        input_file = self._batch_input_file(batch_params, kwargs)
+        if input_file is None and not isinstance(batch_params, list):
+            raise TypeError(
+                "batch_params must be a list of parameter dicts or an input file path"
+            )
+        writer = None
+        if (output_file := kwargs.pop("output_file", None)) is not None:
+            writer = ResultWriter(output_file, self.context.output_chunk_size)
+        semaphore = asyncio.Semaphore(_MAX_IN_FLIGHT)
+
+        async def request(params: dict) -> Any:
+            async with semaphore:
+                return await self._dispatch.run_async(api_method, **params, **kwargs)
+
+        async def chunks() -> AsyncIterator[list[dict]]:
+            if input_file is None:
+                yield batch_params
+                return
+            async for chunk in self._read_input_chunks(input_file):
+                yield chunk.to_dict("records")
+
+        try:
+            async for chunk in chunks():
+                tasks = [asyncio.ensure_future(request(params)) for params in chunk]
+                try:
+                    for task in asyncio.as_completed(tasks):
+                        result = await task
+                        if writer is not None:
+                            writer.write(result)
+                        yield result
+                finally:
+                    for task in tasks:
+                        task.cancel()
+        finally:
+            if writer is not None:
+                writer.close()
+
     @property
     def rest_url(self):
         """
@@ -5,9 +5,10 @@ purpose: FinX Socket Client
 """
 from threading import Thread
 from traceback import format_exc
-from typing import Any, Callable, Optional
+from typing import Any, AsyncIterator, Callable, Optional
 from uuid import uuid4
 
+import asyncio
 import json
 import logging
 import os
@@ -21,6 +22,8 @@ import pandas as pd
 from finx.base_classes.base_client import BaseFinXClient
 from finx.base_classes.context_manager import CacheLookup
 from finx.utils.concurrency import hybrid
+from finx.utils.normalization import normalize_frame, normalize_params, normalize_value
+from finx.utils.output_writer import ResultWriter
 from finx.utils.payload_parsing import get_size
 
 
@@ -209,6 +212,10 @@ class FinXSocketClient(BaseFinXClient):
                     return None
                 if (error := message.get("error")) is not None:
                     logging.error("API returned error: %s", error)
+                    if (cache_keys := message.get("cache_key")) is not None:
+                        for key in cache_keys:
+                            self.context.cache_error(key[1], key[2], error)
+                        return None
                     data = error
                 else:
                     data = message.get("data", message.get("message", {}))
@@ -216,51 +223,9 @@ class FinXSocketClient(BaseFinXClient):
                 if data_type is not list and (
                     data_type is not dict or data.get("progress") is not None
                 ):
-                    if message.get("task_name"):
-                        completed_frac = int(
-                            50 * message["completed"] / message["total_tasks"]
-                        )
-                        progress_bar = (
-                            f'{"#" * completed_frac}{"-" * (50 - completed_frac)}'
-                        )
-                        formatted_message = (
-                            f'\r{message.get("task_name")} => '
-                            f'{progress_bar} ({float(message["progress"]):.5f} %)'
-                        )
-                        if formatted_message != self._last_message:
-                            self._last_message = formatted_message
-                            print(
-                                formatted_message,
-                                end=["", "\n"][
-                                    message["completed"] == message["total_tasks"]
-                                ],
-                            )
-                        return None
-                    print(
-                        (
-                            message.get("message", message).get("progress", message)
-                            if not message.get("starting monitor")
-                            else "Starting monitor ... "
-                        ),
-                        end=["", "\n"][not message.get("starting monitor")],
-                    )
-                    return None
-                if (cache_keys := message.get("cache_key")) is None:
-                    return None
-                is_list_of_dicts = data_type is list and isinstance(data[0], dict)
-                for key in cache_keys:
-                    if is_list_of_dicts and key[0] is not None:
-                        value = next(
-                            (
-                                item
-                                for item in data
-                                if item.get("security_id", "") in key[1]
-                            ),
-                            None,
-                        )
-                    else:
-                        value = data
-                    self.context.cache[key[1]][key[2]] = value
+                    return self._print_progress(message)
+                if (cache_keys := message.get("cache_key")) is not None:
+                    self._cache_message_results(cache_keys, data)
             except Exception as e:  # pylint: disable=broad-exception-caught
                 logging.error(
                     "Socket (%s) on_message error: %s, %s",
@@ -273,6 +238,70 @@ class FinXSocketClient(BaseFinXClient):
 
         return on_message
 
+    def _print_progress(self, message: dict) -> None:
+        """
+        Print a progress update sent by the API
+
+        :param message: Progress message
+        :type message: dict
+        :return: None type
+        :rtype: None
+        """
+        if message.get("task_name"):
+            completed_frac = int(50 * message["completed"] / message["total_tasks"])
+            progress_bar = f'{"#" * completed_frac}{"-" * (50 - completed_frac)}'
+            formatted_message = (
+                f'\r{message.get("task_name")} => '
+                f'{progress_bar} ({float(message["progress"]):.5f} %)'
+            )
+            if formatted_message != self._last_message:
+                self._last_message = formatted_message
+                print(
+                    formatted_message,
+                    end=["", "\n"][message["completed"] == message["total_tasks"]],
+                )
+            return
+        print(
+            (
+                message.get("message", message).get("progress", message)
+                if not message.get("starting monitor")
+                else "Starting monitor ... "
+            ),
+            end=["", "\n"][not message.get("starting monitor")],
+        )
+
+    def _cache_message_results(self, cache_keys: list, data: Any) -> None:
+        """
+        Cache the results of a message, matching rows to their keys by security_id
+
+        :param cache_keys: [security_id, cache_key, params_key] items the message answers
+        :type cache_keys: list
+        :param data: Result rows or a single result
+        :type data: Any
+        :return: None type
+        :rtype: None
+        """
+        is_list_of_dicts = isinstance(data, list) and isinstance(data[0], dict)
+        results = []
+        for key in cache_keys:
+            if is_list_of_dicts and key[0] is not None:
+                value = next(
+                    (
+                        item
+                        for item in data
+                        if normalize_value("security_id", item.get("security_id", ""))
+                        in key[1]
+                    ),
+                    None,
+                )
+            else:
+                value = data
+            if isinstance(value, dict) and value.get("error") is not None:
+                self.context.cache_error(key[1], key[2], value)
+                continue
+            results.append((key[1], key[2], value))
+        self.context.cache_results(results)
+
     def _wrap_on_error(self) -> Callable[[FinXWebSocket, Exception], None]:
         """
         Wrap on error function so that it binds to self
@@ -343,15 +372,14 @@ class FinXSocketClient(BaseFinXClient):
         :rtype: tuple[list[CacheLookup], list[dict], list[dict]]
         """
         logging.debug("Parsing batch input...")
-        cache_keys: list[CacheLookup] = []
         batch_input_df = [pd.DataFrame, pd.read_csv][isinstance(batch_input, str)](
             batch_input
         )
-        for security_input in batch_input_df.to_dict("records"):
-            cache_lookup = self.context.check_cache(
-                **(base_cache_payload | security_input)
-            )
-            cache_keys.append(cache_lookup)
+        base_params = normalize_params(base_cache_payload)
+        api_method = base_params.pop("api_method")
+        cache_keys: list[CacheLookup] = self.context.check_cache_batch(
+            api_method, normalize_frame(batch_input_df), base_params
+        )
         batch_input_df["cache_keys"] = list(map(list, cache_keys))
         batch_input_df["cached_responses"] = batch_input_df["cache_keys"].str[0]
         cached_responses = batch_input_df.loc[
@@ -441,13 +469,14 @@ class FinXSocketClient(BaseFinXClient):
     # pylint: disable=too-many-locals
     # pylint: disable=too-many-branches
     # pylint: disable=too-many-statements
+    # pylint: disable=too-many-return-statements
     async def _dispatch(self, api_method: str, **kwargs) -> dict:
         """
         Dispatch a request to the API
 
         :param api_method: API method to call
         :type api_method: str
-        :param kwargs: Keyword arguments
+        :param kwargs: Keyword arguments (revalidate=True bypasses a cached result)
         :type kwargs: dict
         :return: Response from the API
         :rtype: dict
@@ -455,6 +484,8 @@ class FinXSocketClient(BaseFinXClient):
         assert self._socket, "Socket not initialized"
         assert self.is_authenticated, "Socket not authenticated"
         callback: callable = kwargs.pop("callback", None)
+        revalidate: bool = kwargs.pop("revalidate", False)
+        stream: bool = kwargs.pop("stream", False)
         payload: dict = {"api_method": api_method}
         if any(kwargs):
             payload.update(
@@ -478,15 +509,28 @@ class FinXSocketClient(BaseFinXClient):
         chunk_payload: bool = payload_size > 1e5
         cache_keys: list[CacheLookup] = []
         need_to_batch: bool = is_batch or chunk_payload
+        batch_input: Any = kwargs.get("batch_input")
+        self._invalidate_registered_securities(api_method, persistent=False, **kwargs)
         if not need_to_batch:
             cache_lookup: CacheLookup = self.context.check_cache(**payload)
+            if revalidate:
+                cache_lookup = cache_lookup._replace(value=None)
             if cache_lookup.value is not None:
                 logging.debug("Request found in cache: %s", cache_lookup.key)
+                if self.context.is_stale(cache_lookup):
+                    self._revalidate(cache_lookup, api_method, **kwargs)
                 if callable(callback):
                     return callback(
                         cache_lookup.value, **kwargs, cache_keys=cache_lookup
                     )
                 return cache_lookup.value
+            flight, is_owner = self.context.join_flight(cache_lookup)
+            if not is_owner:
+                logging.debug("Awaiting in-flight request for %s", cache_lookup.key)
+                value = await asyncio.wrap_future(flight)
+                if callable(callback):
+                    return callback(value, **kwargs, cache_keys=cache_lookup)
+                return value
             cache_keys.append(cache_lookup)
         else:
             total_requests: int = 1
@@ -530,18 +574,208 @@ class FinXSocketClient(BaseFinXClient):
         if need_to_batch:
             self.update_payload_cache("", payload, cache_keys)
         try:
-            self._socket.send(json.dumps(payload))
-        except Exception as e:
-            for k, v in payload.items():
-                logging.error("%s: %s", k, str(v)[:1000])
-            raise ValueError("Failed to serialize payload") from e
-        results = await self._listen_for_results.run_async(
-            cache_keys, callback, **kwargs
-        )
+            try:
+                message = json.dumps(payload)
+                self._socket.send(message)
+            except Exception as e:
+                for k, v in payload.items():
+                    logging.error("%s: %s", k, str(v)[:1000])
+                raise ValueError("Failed to serialize payload") from e
+            if stream:
+                return self._stream_dispatched_results(
+                    cache_keys, api_method, batch_input, **kwargs
+                )
+            if need_to_batch:
+                results = await self._listen_for_results.run_async(
+                    cache_keys, callback, **kwargs
+                )
+            else:
+                results = await self._listen_with_deadline(
+                    message, cache_keys[0], api_method, callback, **kwargs
+                )
+        finally:
+            if not need_to_batch:
+                # Results are handed to waiting callers as they land; release the rest
+                self.context.end_flight(
+                    cache_keys[0].key,
+                    cache_keys[0].param_key,
+                    error=RuntimeError(f"Request for {cache_keys[0].key} failed"),
+                )
         self._payload_cache = None
         self._last_message = ""
+        self._invalidate_registered_securities(
+            api_method, **(kwargs | {"batch_input": batch_input})
+        )
         return results
 
+    def _send_hedge(
+        self, message: str, cache_lookup: CacheLookup, hedged: list[bool]
+    ) -> None:
+        """
+        Send a request again unless its result already landed
+
+        :param message: Serialized request
+        :type message: str
+        :param cache_lookup: Cache lookup of the request
+        :type cache_lookup: CacheLookup
+        :param hedged: Appended to when the request is sent again
+        :type hedged: list[bool]
+        :return: None type
+        :rtype: None
+        """
+        if self.context.cache.get(cache_lookup.key, cache_lookup.param_key) is not None:
+            return
+        logging.debug("Hedging %s", cache_lookup.key)
+        hedged.append(True)
+        self._socket.send(message)
+
+    async def _listen_with_deadline(
+        self,
+        message: str,
+        cache_lookup: CacheLookup,
+        api_method: str,
+        callback: Optional[Callable] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Listen for the result of a single request, giving up after context.timeout
+        seconds. If hedging is enabled for the api method and the result has not landed
+        after the hedge percentile of its observed latency, the request is sent again and
+        the first answer is used (both answers fill the same cache key, so which one won
+        is not known).
+
+        :param message: Serialized request that was just sent
+        :type message: str
+        :param cache_lookup: Cache lookup of the request
+        :type cache_lookup: CacheLookup
+        :param api_method: API method that was called
+        :type api_method: str
+        :param callback: Callback function to process results
+        :type callback: Optional[Callable]
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :return: Results from the API
+        :rtype: Any
+        """
+        hedged: list[bool] = []
+        timer = None
+        if (delay := self.context.hedge_delay(api_method)) is not None:
+            timer = asyncio.get_running_loop().call_later(
+                delay, self._send_hedge, message, cache_lookup, hedged
+            )
+        start = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(
+                self._listen_for_results.run_async([cache_lookup], callback, **kwargs),
+                self.context.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.context.latency_stats.record_timeout(api_method, hedged=any(hedged))
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        self.context.latency_stats.record(
+            api_method, time.perf_counter() - start, hedged=any(hedged)
+        )
+        return results
+
+    async def _stream_dispatched_results(
+        self,
+        cache_keys: list[CacheLookup],
+        api_method: str,
+        batch_input: Any,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Yield the results of a request that was just sent as they land, then release the
+        request like _dispatch does once all of them are in
+
+        :param cache_keys: Cache lookups of the request
+        :type cache_keys: list[CacheLookup]
+        :param api_method: API method that was called
+        :type api_method: str
+        :param batch_input: Batch input of the request
+        :type batch_input: Any
+        :param kwargs: Keyword arguments of the request
+        :type kwargs: dict
+        :return: Async iterator of results
+        :rtype: AsyncIterator[Any]
+        """
+        writer = None
+        if (output_file := kwargs.get("output_file")) is not None:
+            logging.debug("Writing data to %s", output_file)
+            writer = ResultWriter(output_file, self.context.output_chunk_size)
+        try:
+            async for _, result in self._stream_results(cache_keys):
+                if writer is not None:
+                    writer.write(result)
+                yield result
+        finally:
+            self._payload_cache = None
+            self._last_message = ""
+            if writer is not None:
+                writer.close()
+        self._invalidate_registered_securities(
+            api_method, **(kwargs | {"batch_input": batch_input})
+        )
+
+    async def _stream_batch_dispatch(
+        self, api_method: str, batch_params: list[dict], **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Issue a batch request and yield each result as soon as its cache key is filled (in
+        completion order rather than input order)
+
+        .. code-block:: python
+
+            >>> async for result in client.stream_batch_get_security_reference_data(
+            >>>     batch_params
+            >>> ):
+            >>>     # Aggregate result while the rest of the batch is computed
+
+        :param api_method: API method to call
+        :type api_method: str
+        :param batch_params: List of security parameters
+        :type batch_params: list[dict]
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :return: Async iterator of results
+        :rtype: AsyncIterator[Any]
+        """
+        if (input_file := self._batch_input_file(batch_params, kwargs)) is not None:
+            output_file = kwargs.pop("output_file", None)
+            writer = None
+            if output_file is not None:
+                writer = ResultWriter(output_file, self.context.output_chunk_size)
+            try:
+                async for chunk in self._read_input_chunks(input_file):
+                    async for result in self._stream_batch_dispatch(
+                        api_method, chunk, **kwargs
+                    ):
+                        if writer is not None:
+                            writer.write(result)
+                        yield result
+            finally:
+                if writer is not None:
+                    writer.close()
+            return
+        results = await self._dispatch.run_async(
+            api_method, batch_input=batch_params, **kwargs, is_batch=True, stream=True
+        )
+        if isinstance(results, list):
+            # Every result was cached, so nothing was streamed through a writer
+            if (output_file := kwargs.get("output_file")) is not None:
+                with ResultWriter(
+                    output_file, self.context.output_chunk_size
+                ) as writer:
+                    writer.write_many(results)
+            for result in results:
+                yield result
+            return
+        async for result in results:
+            yield result
+
     @hybrid
     async def _batch_dispatch(
         self, api_method: str, batch_params: list[dict], **kwargs
@@ -558,6 +792,51 @@ class FinXSocketClient(BaseFinXClient):
         :return: Response from the API
         :rtype: list[dict]
         """
+        input_file = self._batch_input_file(batch_params, kwargs)
+        if input_file is not None and not callable(kwargs.get("callback")):
+            return self._dispatch_input_file(api_method, input_file, **kwargs)
         return self._dispatch(
-            api_method, batch_input=batch_params, **kwargs, is_batch=True
+            api_method,
+            batch_input=batch_params if input_file is None else input_file,
+            **kwargs,
+            is_batch=True,
         )
+
+    async def _dispatch_input_file(
+        self, api_method: str, input_file: str, **kwargs
+    ) -> list[Any]:
+        """
+        Issue a batch request for a CSV input file one chunk at a time, reading the next
+        chunk while the current one is sent. Only one chunk of the input is held at a
+        time, but the results of every chunk are collected for the return value (use
+        stream_batch_<name> with output_file to keep memory bounded). Chunks are sent one
+        after another because the client tracks a single job for reconnects.
+
+        :param api_method: API method to call
+        :type api_method: str
+        :param input_file: CSV file path
+        :type input_file: str
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :return: Results in input order
+        :rtype: list[Any]
+        """
+        output_file = kwargs.pop("output_file", None)
+        writer = None
+        if output_file is not None:
+            writer = ResultWriter(output_file, self.context.output_chunk_size)
+        results: list[Any] = []
+        try:
+            async for chunk in self._read_input_chunks(input_file):
+                chunk_results = await self._dispatch.run_async(
+                    api_method, batch_input=chunk, **kwargs, is_batch=True
+                )
+                if not isinstance(chunk_results, list):
+                    chunk_results = [chunk_results]
+                if writer is not None:
+                    writer.write_many(chunk_results)
+                results.extend(chunk_results)
+        finally:
+            if writer is not None:
+                writer.close()
+        return results
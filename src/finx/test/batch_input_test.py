@@ -0,0 +1,249 @@
+#! python
+"""
+author: dick mule
+purpose: unittest reading batch input files in chunks
+"""
+import json
+import os
+import unittest
+
+import pandas as pd
+
+from finx.base_classes.session_manager import SessionManager
+from finx.clients.rest_client import FinXRestClient
+from finx.clients.socket_client import FinXSocketClient
+from finx.test.fixtures import loop_context, scratch_directory
+
+# pylint: disable=protected-access
+
+
+class _EchoSocket:
+    """Socket stub answering every batch request straight into the client cache"""
+
+    def __init__(self, client: FinXSocketClient):
+        """
+        Attach to a client
+
+        :param client: Client whose cache is filled
+        :type client: FinXSocketClient
+        """
+        self.client = client
+        self.batch_sizes: list[int] = []
+
+    def send(self, message: str) -> None:
+        """
+        Answer a batch request with one result per outstanding row
+
+        :param message: Serialized request
+        :type message: str
+        :return: None type
+        :rtype: None
+        """
+        payload = json.loads(message)
+        self.batch_sizes.append(len(payload["batch_input"]))
+        self.client.context.cache_results(
+            [
+                (key[1], key[2], {"security_id": row["security_id"], "value": 1.0})
+                for key, row in zip(payload["cache_key"], payload["batch_input"])
+            ]
+        )
+
+    def close(self) -> None:
+        """
+        Nothing to close
+
+        :return: None type
+        :rtype: None
+        """
+
+
+class _EchoSession(SessionManager):
+    """Session stub answering every REST request with its security_id"""
+
+    def model_post_init(self, __context):
+        """
+        Skip opening an aiohttp session
+
+        :param __context: Context information for pydantic
+        :type __context: Any
+        :return: None type
+        :rtype: None
+        """
+
+    async def post(self, url: str, is_json_response: bool = True, **kwargs):
+        """
+        Answer a request with its security_id
+
+        :param url: String URL of the endpoint
+        :type url: str
+        :param is_json_response: Unused
+        :type is_json_response: bool
+        :param kwargs: Request payload
+        :type kwargs: dict
+        :return: Result row
+        :rtype: dict
+        """
+        return {"security_id": kwargs["security_id"], "value": 1.0}
+
+
+class _EchoClient(FinXSocketClient):
+    """Socket client talking to an _EchoSocket instead of the API"""
+
+    def model_post_init(self, __context):
+        """
+        Attach the socket stub instead of connecting
+
+        :param __context: Context information for pydantic
+        :type __context: Any
+        :return: None type
+        :rtype: None
+        """
+        self._socket = _EchoSocket(self)
+        self._is_authenticated = True
+        super().model_post_init(__context)
+
+
+class BatchInputTest(unittest.TestCase):
+    """Unittest reading batch input files in chunks"""
+
+    def setUp(self):
+        """
+        Write an input file and create a client reading it 40 rows at a time
+
+        :return: None type
+        :rtype: None
+        """
+        self.directory = scratch_directory(self)
+        self.input_file = os.path.join(self.directory, "holdings.csv")
+        self.security_ids = [f"SEC{i:05d}" for i in range(100)]
+        pd.DataFrame(
+            {"security_id": self.security_ids, "as_of_date": "2021-01-01"}
+        ).to_csv(self.input_file, index=False)
+        self.context = loop_context(self, input_chunk_size=40)
+        self.loop = self.context.event_loop
+        self.client = _EchoClient(context=self.context)
+
+    def _batch(self, *args, **kwargs):
+        """
+        Run a batch request like the generated batch_<name> methods do
+
+        :param args: Arguments of _batch_dispatch
+        :type args: Any
+        :param kwargs: Keyword arguments of _batch_dispatch
+        :type kwargs: dict
+        :return: Results
+        :rtype: Any
+        """
+
+        async def batch():
+            result = await self.client._batch_dispatch.run_async(*args, **kwargs)
+            if not isinstance(result, (list, dict, pd.DataFrame)):
+                return await result
+            return result
+
+        return self.loop.run_until_complete(batch())
+
+    def test_input_file_is_sent_in_chunks(self):
+        """
+        Every chunk of the input file goes out as its own batch, results come back in
+        input order and are written to output_file
+
+        :return: None type
+        :rtype: None
+        """
+        output_file = os.path.join(self.directory, "results.csv")
+        results = self._batch(
+            "get_security_reference_data",
+            None,
+            input_file=self.input_file,
+            output_file=output_file,
+        )
+        self.assertEqual(self.client._socket.batch_sizes, [40, 40, 20])
+        self.assertEqual([x["security_id"] for x in results], self.security_ids)
+        written = pd.read_csv(output_file)
+        self.assertEqual(written["security_id"].tolist(), self.security_ids)
+
+    def test_input_file_is_streamed_in_chunks(self):
+        """
+        Streaming a batch input file yields every result, reusing cached chunks
+
+        :return: None type
+        :rtype: None
+        """
+
+        async def stream():
+            return [
+                result
+                async for result in self.client._stream_batch_dispatch(
+                    "get_security_reference_data", self.input_file
+                )
+            ]
+
+        self._batch("get_security_reference_data", self.input_file)
+        results = self.loop.run_until_complete(stream())
+        self.assertEqual(self.client._socket.batch_sizes, [40, 40, 20])
+        self.assertEqual(sorted(x["security_id"] for x in results), self.security_ids)
+
+    def test_cached_stream_writes_output_file(self):
+        """
+        Streaming a batch writes output_file whether or not its results were cached
+
+        :return: None type
+        :rtype: None
+        """
+        batch_params = [
+            {"security_id": security_id, "as_of_date": "2021-01-01"}
+            for security_id in self.security_ids[:5]
+        ]
+        output_file = os.path.join(self.directory, "results.csv")
+
+        async def stream():
+            return [
+                result
+                async for result in self.client._stream_batch_dispatch(
+                    "get_security_reference_data",
+                    batch_params,
+                    output_file=output_file,
+                )
+            ]
+
+        for _ in range(2):
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            results = self.loop.run_until_complete(stream())
+            self.assertEqual(len(results), 5)
+            written = pd.read_csv(output_file)
+            self.assertEqual(sorted(written["security_id"]), self.security_ids[:5])
+        self.assertEqual(self.client._socket.batch_sizes, [5])
+
+    def test_rest_input_file_is_streamed(self):
+        """
+        The REST client streams an input file chunk by chunk into output_file and rejects
+        batch_params that are neither a list nor a file
+
+        :return: None type
+        :rtype: None
+        """
+        client = FinXRestClient(context=self.context, session=_EchoSession())
+        output_file = os.path.join(self.directory, "results.csv")
+
+        async def stream(batch_params, **kwargs):
+            return [
+                result
+                async for result in client._stream_batch_dispatch(
+                    "get_security_reference_data", batch_params, **kwargs
+                )
+            ]
+
+        results = self.loop.run_until_complete(
+            stream(None, input_file=self.input_file, output_file=output_file)
+        )
+        self.assertEqual(sorted(x["security_id"] for x in results), self.security_ids)
+        written = pd.read_csv(output_file)
+        self.assertEqual(sorted(written["security_id"]), self.security_ids)
+        with self.assertRaises(TypeError):
+            self.loop.run_until_complete(stream({"security_id": "SEC00000"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+#! python
+"""
+author: dick mule
+purpose: unittest the shared cache backends behind the results cache
+"""
+from collections import Counter
+from fnmatch import fnmatchcase
+
+import multiprocessing as mp
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+from finx.base_classes.context_manager import ApiContextManager
+from finx.utils.cache_backends import MemoryBackend, RedisBackend
+from finx.utils.persistent_cache import PersistentResultStore
+from finx.utils.shared_cache import SharedMemoryBackend
+
+# pylint: disable=protected-access
+
+
+def _fetch_in_worker(backend: SharedMemoryBackend, security_id: str) -> None:
+    """
+    Cache a result from a separate process
+
+    :param backend: Shared backend (re-attached by name in the worker)
+    :type backend: SharedMemoryBackend
+    :param security_id: Security ID
+    :type security_id: str
+    :return: None type
+    :rtype: None
+    """
+    context = ApiContextManager(
+        api_key="test", api_url="http://localhost", cache_backend=backend
+    )
+    lookup = context.check_cache("get_security_reference_data", security_id=security_id)
+    context.cache.set(lookup.key, lookup.param_key, {"fetched_by": os.getpid()})
+
+
+class _RespStandIn(socketserver.ThreadingTCPServer):
+    """Minimal in-process server speaking the subset of RESP used by RedisBackend"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        """
+        Listen on a free local port
+        """
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.data: dict[bytes, bytes] = {}
+        self.commands: Counter = Counter()
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Answer GET, MGET, SET, MSET, DEL, SCAN and SELECT"""
+
+    def _read_command(self) -> list[bytes]:
+        """
+        Read one RESP array of bulk strings
+
+        :return: Command name and arguments
+        :rtype: list[bytes]
+        """
+        header = self.rfile.readline()
+        if not header:
+            return []
+        args = []
+        for _ in range(int(header[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value: bytes | None) -> bytes:
+        """
+        Encode a bulk string reply
+
+        :param value: Value or None
+        :type value: bytes | None
+        :return: Encoded reply
+        :rtype: bytes
+        """
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        """
+        Serve commands until the client disconnects
+
+        :return: None type
+        :rtype: None
+        """
+        data = self.server.data
+        while args := self._read_command():
+            name, args = args[0].upper().decode(), args[1:]
+            self.server.commands[name] += 1
+            if name in ("SET", "MSET", "SELECT"):
+                data.update(zip(args[::2], args[1::2]) if name != "SELECT" else {})
+                reply = b"+OK\r\n"
+            elif name == "GET":
+                reply = self._bulk(data.get(args[0]))
+            elif name == "MGET":
+                reply = b"*%d\r\n" % len(args) + b"".join(
+                    self._bulk(data.get(key)) for key in args
+                )
+            elif name == "DEL":
+                reply = b":%d\r\n" % sum(
+                    data.pop(key, None) is not None for key in args
+                )
+            elif name == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode()
+                keys = [k for k in list(data) if fnmatchcase(k.decode(), pattern)]
+                reply = b"*2\r\n" + self._bulk(b"0") + b"*%d\r\n" % len(keys)
+                reply += b"".join(self._bulk(key) for key in keys)
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+class CacheBackendsTest(unittest.TestCase):
+    """Unittest the memory, SQLite and Redis protocol backends"""
+
+    def setUp(self):
+        """
+        Start a local RESP stand-in
+
+        :return: None type
+        :rtype: None
+        """
+        self.server = _RespStandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.redis = RedisBackend(*self.server.server_address, db=1)
+
+    def tearDown(self):
+        """
+        Stop the local RESP stand-in
+
+        :return: None type
+        :rtype: None
+        """
+        self.redis.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_backends_share_protocol(self):
+        """
+        Every backend honors get, get_many, set, set_many, delete and delete_matching
+
+        :return: None type
+        :rtype: None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            sqlite = PersistentResultStore(os.path.join(directory, "cache.sqlite"))
+            shared = SharedMemoryBackend(f"test-{os.getpid()}", 2**20, 64)
+            for backend in [MemoryBackend(), sqlite, self.redis, shared]:
+                backend.set("A:2021-01-01:get_curve", "NONE", {"a": 1})
+                backend.set_many(
+                    [
+                        ("A:2021-01-01:get_curve", "0123", [1, 2]),
+                        ("B:2021-01-01:get_curve", "NONE", "b"),
+                        ("list_api_functions", "NONE", ["f"]),
+                    ]
+                )
+                if backend is sqlite:
+                    sqlite.flush()
+                entries = backend.get_many(
+                    [
+                        ("A:2021-01-01:get_curve", "NONE"),
+                        ("missing", "NONE"),
+                        ("A:2021-01-01:get_curve", "0123"),
+                    ]
+                )
+                self.assertEqual(
+                    [None if x is None else x.value for x in entries],
+                    [{"a": 1}, None, [1, 2]],
+                )
+                self.assertEqual(backend.get("list_api_functions", "NONE").value, ["f"])
+                self.assertEqual(backend.delete("A:2021-01-01:get_curve"), 2)
+                self.assertEqual(backend.delete_matching(api_method="get_curve"), 1)
+                self.assertEqual(backend.delete("list_api_functions", "NONE"), 1)
+                self.assertEqual(
+                    backend.get_many([("list_api_functions", "NONE")]), [None]
+                )
+                backend.close()
+            os.remove(shared.path)
+
+    def test_shared_memory_across_processes(self):
+        """
+        A result cached by one worker process is a hit for every other process
+
+        :return: None type
+        :rtype: None
+        """
+        backend = SharedMemoryBackend(f"test-{os.getpid()}", 2**20, 64)
+        for start_method in ["fork", "spawn"]:
+            worker = mp.get_context(start_method).Process(
+                target=_fetch_in_worker, args=(backend, start_method)
+            )
+            worker.start()
+            worker.join()
+            context = ApiContextManager(
+                api_key="test", api_url="http://localhost", cache_backend=backend
+            )
+            cached = context.check_cache(
+                "get_security_reference_data", security_id=start_method
+            )
+            self.assertEqual(cached.value, {"fetched_by": worker.pid})
+        for i in range(100):
+            backend.set(f"{i}", "NONE", i)
+        # A full table evicts its oldest records rather than starting over
+        recent = backend.get_many([(f"{i}", "NONE") for i in range(80, 100)])
+        self.assertEqual([entry.value for entry in recent], list(range(80, 100)))
+        self.assertIsNone(backend.get("0", "NONE"))
+        # A forked worker closes the inherited map before mapping the table again
+        inherited_map = backend._map
+        backend._pid = -1
+        self.assertEqual(backend.get("99", "NONE").value, 99)
+        self.assertTrue(inherited_map.closed)
+        backend.unlink()
+        with self.assertRaises(ValueError):
+            ApiContextManager(
+                api_key="test",
+                api_url="http://localhost",
+                persistent_cache_path="cache.sqlite",
+                shared_cache_name="default",
+            )
+
+    def test_batch_lookup_is_one_round_trip(self):
+        """
+        Contexts sharing a backend share results and a batch is read with a single MGET
+
+        :return: None type
+        :rtype: None
+        """
+        writer = ApiContextManager(
+            api_key="test", api_url="http://localhost", cache_backend=self.redis
+        )
+        frame = pd.DataFrame(
+            {
+                "security_id": [f"{i:09d}" for i in range(1000)],
+                "as_of_date": "2021-01-01",
+            }
+        )
+        lookups = writer.check_cache_batch("get_security_reference_data", frame)
+        writer.cache.set_many([(x.key, x.param_key, {"id": x.key}) for x in lookups])
+        reader = ApiContextManager(
+            api_key="test", api_url="http://localhost", cache_backend=self.redis
+        )
+        self.server.commands.clear()
+        cached = reader.check_cache_batch("get_security_reference_data", frame)
+        self.assertEqual([x.value for x in cached], [{"id": x.key} for x in lookups])
+        self.assertEqual(self.server.commands, Counter({"MGET": 1}))
+
+
+if __name__ == "__main__":
+    unittest.main()
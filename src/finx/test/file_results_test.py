@@ -0,0 +1,248 @@
+#! python
+"""
+author: dick mule
+purpose: unittest downloading and parsing batch result files
+"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import pandas as pd
+
+from finx.base_classes.context_manager import ApiContextManager
+from finx.base_classes.session_manager import SessionManager
+from finx.clients.rest_client import FinXRestClient
+from finx.test.fixtures import loop_context, scratch_directory
+from finx.utils.file_store import ResultFileStore
+from finx.utils.payload_parsing import parse_csv, read_csv_file
+
+# pylint: disable=protected-access
+
+
+class _FileSession(SessionManager):
+    """Session stub serving result files from memory"""
+
+    files: dict[str, bytes] = {}
+    delay: float = 0.0
+    active: int = 0
+    max_active: int = 0
+    downloads: int = 0
+
+    def model_post_init(self, __context):
+        """
+        Skip opening an aiohttp session
+
+        :param __context: Context information for pydantic
+        :type __context: Any
+        :return: None type
+        :rtype: None
+        """
+
+    async def download(self, url: str, **kwargs) -> bytes:
+        """
+        Serve a file after a delay, tracking the number of concurrent transfers
+
+        :param url: String URL of the endpoint
+        :type url: str
+        :param kwargs: Query parameters
+        :type kwargs: dict
+        :return: File contents
+        :rtype: bytes
+        """
+        self.active += 1
+        self.downloads += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return self.files[kwargs["filename"]]
+
+
+class FileResultsTest(unittest.TestCase):
+    """Unittest downloading and parsing batch result files"""
+
+    def setUp(self):
+        """
+        Create a client whose session serves result files from memory
+
+        :return: None type
+        :rtype: None
+        """
+        self.context = loop_context(self, download_concurrency=2)
+        self.loop = self.context.event_loop
+        self.session = _FileSession(delay=0.05)
+        self.client = FinXRestClient(context=self.context, session=self.session)
+
+    def test_downloads_are_concurrent_and_bounded(self):
+        """
+        Result files are downloaded concurrently, at most download_concurrency at a time
+
+        :return: None type
+        :rtype: None
+        """
+        self.session.files = {
+            f"file_{i}.csv": f"security_id,value\n00{i},{i}\n".encode()
+            for i in range(6)
+        }
+        file_results = [(i, {"filename": f"file_{i}.csv"}) for i in range(6)]
+        downloaded = self.loop.run_until_complete(
+            self.client._download_file_results.run_async(file_results)
+        )
+        self.assertEqual(self.session.max_active, 2)
+        self.assertEqual(sorted(downloaded), sorted(self.session.files))
+        self.assertEqual(downloaded["file_3.csv"]["security_id"].tolist(), ["003"])
+        self.assertEqual(downloaded["file_3.csv"]["value"].tolist(), [3])
+
+    def test_file_rows_are_joined_to_cache_keys(self):
+        """
+        Rows of a result file are matched to their cache keys whether the server wrote the
+        keys as JSON or python lists, and the matched rows are cached
+
+        :return: None type
+        :rtype: None
+        """
+        frame = pd.DataFrame(
+            {
+                "security_id": [f"{i:09d}" for i in range(2000)],
+                "as_of_date": "2021-01-01",
+            }
+        )
+        lookups = self.context.check_cache_batch("calculate_greeks", frame)
+        rows = pd.DataFrame(
+            {
+                "security_id": frame["security_id"],
+                "delta": range(2000),
+                "cache_key": [
+                    json.dumps(list(x)) if i % 2 else f"{list(x)}"
+                    for i, x in enumerate(lookups)
+                ],
+            }
+        ).sample(frac=1, random_state=0)
+        self.session.files = {"greeks.csv": rows.to_csv(index=False).encode()}
+        self.context.cache_results(
+            [(x.key, x.param_key, {"filename": "greeks.csv"}) for x in lookups]
+        )
+        results, file_results = self.loop.run_until_complete(
+            self.client._wait_for_results.run_async(lookups)
+        )
+        self.assertEqual(len(file_results), 2000)
+        self.assertEqual(self.session.downloads, 1)
+        self.assertEqual([x["delta"] for x in results], list(range(2000)))
+        self.assertEqual(results[7]["security_id"], "000000007")
+        cached = self.context.check_cache(
+            "calculate_greeks", security_id="000000007", as_of_date="2021-01-01"
+        )
+        self.assertEqual(cached.value, results[7])
+
+    def test_downloaded_files_are_stored_locally(self):
+        """
+        A file downloaded once is read back from the local store by any later context
+
+        :return: None type
+        :rtype: None
+        """
+        self.session.files = {"ref.csv": b"security_id,coupon\n0012,1.5\n"}
+        with tempfile.TemporaryDirectory() as directory:
+            for use_async in [True, False, True]:
+                context = ApiContextManager(
+                    api_key="test",
+                    api_url="http://localhost/",
+                    event_loop=self.loop,
+                    result_file_cache_dir=directory,
+                )
+                client = FinXRestClient(context=context, session=self.session)
+                file_df = self.loop.run_until_complete(
+                    client.download_file.run_async("ref.csv", "bucket", use_async)
+                )
+                self.assertEqual(file_df["security_id"].tolist(), ["0012"])
+                downloaded = self.loop.run_until_complete(
+                    client._download_file_results.run_async(
+                        [(0, {"filename": "ref.csv", "bucket_name": "bucket"})]
+                    )
+                )
+                self.assertEqual(downloaded["ref.csv"]["coupon"].tolist(), [1.5])
+            self.assertEqual(self.session.downloads, 1)
+            self.assertEqual(len(os.listdir(os.path.join(directory, "objects"))), 1)
+            self.assertIsNone(context.file_store.path("ref.csv", "other"))
+
+    def test_pruned_files_are_misses(self):
+        """
+        Pruning removes the names of removed files, and a file pruned between lookup and
+        read is treated as a miss
+
+        :return: None type
+        :rtype: None
+        """
+        directory = scratch_directory(self)
+        store = ResultFileStore(directory, max_bytes=40)
+        old_path = store.put("old.csv", "bucket", b"security_id,value\n001,1.0\n")
+        os.utime(old_path, (0, 0))
+        store.put("new.csv", "bucket", b"security_id,value\n002,2.0\n")
+        self.assertIsNone(store.path("old.csv", "bucket"))
+        self.assertIsNotNone(store.path("new.csv", "bucket"))
+        self.assertEqual(len(os.listdir(os.path.join(directory, "names"))), 1)
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost/",
+            event_loop=self.loop,
+            file_store=store,
+        )
+        client = FinXRestClient(context=context, session=self.session)
+        store.path = lambda *args: os.path.join(directory, "objects", "pruned")
+        self.assertIsNone(client._read_stored_file("new.csv", "bucket"))
+
+    def test_csv_keeps_leading_zeros_and_blank_ids(self):
+        """
+        Security ids are parsed as strings, blank ids as empty strings, from bytes and from
+        a stored file
+
+        :return: None type
+        :rtype: None
+        """
+        content = b"security_id,coupon\n000123,1.5\n,2.0\n0012E5,2.5\n"
+        directory = scratch_directory(self)
+        path = os.path.join(directory, "ref.csv")
+        with open(path, "wb") as file:
+            file.write(content)
+        for engine in ["c", "python"]:
+            for file_df in [parse_csv(content, engine), read_csv_file(path, engine)]:
+                self.assertEqual(
+                    file_df["security_id"].tolist(), ["000123", "", "0012E5"]
+                )
+                self.assertEqual(file_df["coupon"].tolist(), [1.5, 2.0, 2.5])
+
+    def test_csv_engine_parses_downloads_and_stored_files(self):
+        """
+        The csv_engine of the context is used to parse downloaded and stored files
+
+        :return: None type
+        :rtype: None
+        """
+        self.session.files = {"ref.csv": b"security_id,coupon\n0012,1.5\n"}
+        context = loop_context(
+            self,
+            csv_engine="python",
+            file_store=ResultFileStore(scratch_directory(self)),
+        )
+        client = FinXRestClient(context=context, session=self.session)
+        with mock.patch(
+            "finx.utils.payload_parsing.pd.read_csv", wraps=pd.read_csv
+        ) as read_csv:
+            for _ in range(2):
+                # Downloaded first, read back from the store second
+                file_df = context.event_loop.run_until_complete(
+                    client.download_file.run_async("ref.csv", "bucket", True)
+                )
+                self.assertEqual(file_df["security_id"].tolist(), ["0012"])
+        self.assertEqual(self.session.downloads, 1)
+        self.assertEqual(
+            [call.kwargs["engine"] for call in read_csv.call_args_list],
+            ["python", "python"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
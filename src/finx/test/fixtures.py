@@ -0,0 +1,43 @@
+#! python
+"""
+author: dick mule
+purpose: fixtures shared by the unittests
+"""
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from finx.base_classes.context_manager import ApiContextManager
+
+
+def loop_context(test: unittest.TestCase, **kwargs) -> ApiContextManager:
+    """
+    Create a context bound to a new event loop that is closed when the test ends
+
+    :param test: Test case owning the event loop
+    :type test: unittest.TestCase
+    :param kwargs: Context fields
+    :type kwargs: dict
+    :return: Context whose event_loop is the new loop
+    :rtype: ApiContextManager
+    """
+    loop = asyncio.new_event_loop()
+    test.addCleanup(loop.close)
+    return ApiContextManager(
+        api_key="test", api_url="http://localhost/", event_loop=loop, **kwargs
+    )
+
+
+def scratch_directory(test: unittest.TestCase) -> str:
+    """
+    Create a temporary directory that is removed when the test ends
+
+    :param test: Test case owning the directory
+    :type test: unittest.TestCase
+    :return: Directory path
+    :rtype: str
+    """
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+    return directory
@@ -0,0 +1,151 @@
+#! python
+"""
+author: dick mule
+purpose: unittest compiling and binding API function stubs
+"""
+import inspect
+import unittest
+
+from types import SimpleNamespace
+
+from finx.clients.rest_client import FinXRestClient
+from finx.test.fixtures import loop_context
+from finx.utils.concurrency import Hybrid
+
+# pylint: disable=protected-access
+
+_FUNCTIONS = [
+    {"name": "get_curve", "required": ["curve_name"], "optional": None},
+    {"name": "get_widget", "required": ["widget_id"], "optional": None},
+    {"name": "list_widgets", "required": [], "optional": {"currency": None}},
+    {
+        "name": "price_widget",
+        "required": ["security_id"],
+        "optional": {
+            "as_of_date": None,
+            "price": 100.0,
+            "volatility": 1.0,
+            "alt_security_id": None,
+        },
+    },
+]
+
+
+class FunctionStubsTest(unittest.TestCase):
+    """Unittest compiling and binding API function stubs"""
+
+    def setUp(self):
+        """
+        Create two clients sharing a context
+
+        :return: None type
+        :rtype: None
+        """
+        self.context = loop_context(self)
+        self.clients = [FinXRestClient(context=self.context) for _ in range(2)]
+        for client in self.clients:
+            client._reload_function_definitions({"data": _FUNCTIONS})
+
+    def test_stubs_are_shared_and_bound_lazily(self):
+        """
+        Stubs are compiled once for every client and bound on first access
+
+        :return: None type
+        :rtype: None
+        """
+        first, second = self.clients
+        self.assertNotIn("get_widget", first.__dict__)
+        self.assertIn("batch_list_widgets", dir(first))
+        self.assertIsInstance(first.get_widget, Hybrid)
+        self.assertIs(first.get_widget, first.get_widget)
+        self.assertIs(first.get_widget.my_func.__self__, first)
+        self.assertIs(second.get_widget.my_func.__self__, second)
+        self.assertIs(
+            first.get_widget.my_func.__func__, second.get_widget.my_func.__func__
+        )
+        self.assertTrue(inspect.isasyncgenfunction(first.stream_batch_get_widget))
+        self.assertEqual(
+            list(inspect.signature(first.list_widgets.my_func).parameters),
+            ["currency", "kwargs"],
+        )
+        # Functions documented on the client class are replaced by their stubs
+        self.assertIs(first.get_curve.my_func.__self__, first)
+        self.assertEqual(
+            list(inspect.signature(first.get_curve.my_func).parameters),
+            ["curve_name", "kwargs"],
+        )
+        with self.assertRaises(AttributeError):
+            _ = first.get_unknown
+
+    def test_optional_params_keep_server_order(self):
+        """
+        Optional parameters keep the order of the schema, so positional calls bind to the
+        parameters the server listed
+
+        :return: None type
+        :rtype: None
+        """
+        client = self.clients[0]
+        self.assertEqual(
+            list(inspect.signature(client.price_widget.my_func).parameters),
+            [
+                "security_id",
+                "as_of_date",
+                "price",
+                "volatility",
+                "alt_security_id",
+                "kwargs",
+            ],
+        )
+        calls = []
+
+        async def dispatch(api_method, **kwargs):
+            calls.append((api_method, kwargs))
+            return kwargs
+
+        stand_in = SimpleNamespace(_dispatch=SimpleNamespace(run_async=dispatch))
+        self.context.event_loop.run_until_complete(
+            client.price_widget.my_func.__func__(stand_in, "X", "2024-09-30")
+        )
+        self.assertEqual(
+            calls,
+            [
+                (
+                    "price_widget",
+                    {
+                        "security_id": "X",
+                        "as_of_date": "2024-09-30",
+                        "price": 100.0,
+                        "volatility": 1.0,
+                        "alt_security_id": None,
+                    },
+                )
+            ],
+        )
+
+    def test_reload_rebinds_changed_functions(self):
+        """
+        Reloading a changed function schema replaces the bound stub
+
+        :return: None type
+        :rtype: None
+        """
+        client = self.clients[0]
+        _ = client.get_curve
+        client._reload_function_definitions(
+            [
+                {
+                    "name": "get_curve",
+                    "required": ["curve_name", "tenor"],
+                    "optional": None,
+                }
+            ]
+        )
+        self.assertEqual(
+            list(inspect.signature(client.get_curve.my_func).parameters),
+            ["curve_name", "tenor", "kwargs"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
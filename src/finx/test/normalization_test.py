@@ -0,0 +1,106 @@
+#! python
+"""
+author: dick mule
+purpose: unittest request normalization used to build cache keys
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from finx.base_classes.context_manager import ApiContextManager
+from finx.utils.normalization import normalize_frame, normalize_params
+
+
+class NormalizationTest(unittest.TestCase):
+    """Unittest request parameter normalization"""
+
+    def test_equivalent_requests_share_cache_entry(self):
+        """
+        Differently formatted but equivalent requests map to the same cache entry
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(api_key="test", api_url="http://localhost")
+        first = context.check_cache(
+            "get_security_reference_data",
+            security_id="us91282cca7",
+            as_of_date="9/30/24",
+            price=100,
+            price_as_yield="false",
+        )
+        context.cache.set(first.key, first.param_key, {"asset_class": "bond"})
+        second = context.check_cache(
+            "get_security_reference_data",
+            security_id="US91282CCA7 ",
+            as_of_date="2024-09-30",
+            price=100.0,
+            price_as_yield=False,
+        )
+        self.assertEqual((first.key, first.param_key), (second.key, second.param_key))
+        self.assertEqual(second.value, {"asset_class": "bond"})
+
+    def test_frame_matches_single_requests(self):
+        """
+        Vectorized frame normalization agrees with per-request normalization
+
+        :return: None type
+        :rtype: None
+        """
+        frame = pd.DataFrame(
+            {
+                "security_id": ["abc", "DEF", None],
+                "as_of_date": ["9/30/24", "2024-09-30", np.nan],
+                "price": [100, 99.5, np.nan],
+                "price_as_yield": ["TRUE", "false", None],
+                "use_test_data": [True, False, True],
+            }
+        )
+        expected = [normalize_params(row) for row in frame.to_dict("records")]
+        self.assertEqual(normalize_frame(frame).to_dict("records"), expected)
+        self.assertEqual(expected[0]["as_of_date"], "2024-09-30")
+        self.assertIsNone(expected[2]["price"])
+
+    def test_batch_keys_match_single_keys(self):
+        """
+        Vectorized batch key building agrees with single request key building
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(api_key="test", api_url="http://localhost")
+        frame = pd.DataFrame(
+            {
+                "security_id": ["abc", None, "def"],
+                "as_of_date": ["9/30/24", "2024-09-30", None],
+                "price": [100, 99.5, np.nan],
+                "shock_in_bp": [[-100, 100], None, 0],
+            }
+        )
+        base_params = {"volatility": 1, "currency_list": ["USD", "GBP"]}
+        batch = context.check_cache_batch(
+            "forecast_cf_and_prices",
+            normalize_frame(frame),
+            normalize_params(base_params),
+        )
+        single = [
+            context.check_cache("forecast_cf_and_prices", **(base_params | row))
+            for row in frame.to_dict("records")
+        ]
+        self.assertEqual(
+            [(x.key, x.param_key) for x in batch],
+            [(x.key, x.param_key) for x in single],
+        )
+        self.assertEqual(len(batch[0].param_key), 16)
+        # Memoized single request keys still tell equal comparing values apart
+        flags = [
+            context.check_cache("calculate_greeks", security_id="abc", flag=flag)
+            for flag in [True, 1.0, True]
+        ]
+        self.assertNotEqual(flags[0].param_key, flags[1].param_key)
+        self.assertEqual(flags[0].param_key, flags[2].param_key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+#! python
+"""
+author: dick mule
+purpose: unittest writing batch results to output_file in chunks
+"""
+import asyncio
+import os
+import unittest
+
+import pandas as pd
+
+from finx.base_classes.context_manager import ApiContextManager
+from finx.clients.rest_client import FinXRestClient
+from finx.test.fixtures import loop_context, scratch_directory
+from finx.utils.output_writer import ResultWriter, infer_format, pa
+
+# pylint: disable=protected-access
+
+
+class OutputWriterTest(unittest.TestCase):
+    """Unittest writing batch results to output_file in chunks"""
+
+    def setUp(self):
+        """
+        Create a scratch directory and a batch of result rows
+
+        :return: None type
+        :rtype: None
+        """
+        self.directory = scratch_directory(self)
+        self.rows = [
+            {"security_id": f"{i:09d}", "delta": i / 10, "cache_key": f"key{i}"}
+            for i in range(25)
+        ]
+
+    def _path(self, name: str) -> str:
+        """
+        Path in the scratch directory
+
+        :param name: File name
+        :type name: str
+        :return: File path
+        :rtype: str
+        """
+        return os.path.join(self.directory, name)
+
+    def test_format_is_inferred_from_extension(self):
+        """
+        Extensions map to formats, anything unrecognized is written as CSV
+
+        :return: None type
+        :rtype: None
+        """
+        self.assertEqual(infer_format("out.csv"), "csv")
+        self.assertEqual(infer_format("out.CSV.GZ"), "csv.gz")
+        self.assertEqual(infer_format("out.parquet"), "parquet")
+        self.assertEqual(infer_format("out.feather"), "feather")
+        self.assertEqual(infer_format("out.txt"), "csv")
+
+    def test_csv_is_written_in_chunks(self):
+        """
+        Rows are appended chunk by chunk under a single header, plain or gzipped
+
+        :return: None type
+        :rtype: None
+        """
+        for name in ["out.csv", "out.csv.gz"]:
+            path = self._path(name)
+            with ResultWriter(path, chunk_size=10) as writer:
+                writer.write_many(self.rows[:15])
+                self.assertEqual(writer.n_rows, 10)
+                writer.write_many(self.rows[15:] + ["not a row"])
+            self.assertEqual(writer.n_rows, 25)
+            written = pd.read_csv(path, dtype={"security_id": str})
+            pd.testing.assert_frame_equal(written, pd.DataFrame(self.rows))
+
+    def test_new_columns_widen_the_file(self):
+        """
+        A field first seen beyond the first chunk is added to the header, blank in the rows
+        written before it
+
+        :return: None type
+        :rtype: None
+        """
+        rows = self.rows[:15] + [self.rows[15] | {"gamma": 0.5}] + self.rows[16:]
+        for name in ["out.csv", "out.csv.gz"]:
+            path = self._path(name)
+            with ResultWriter(path, chunk_size=10) as writer:
+                writer.write_many(rows)
+            written = pd.read_csv(path, dtype={"security_id": str})
+            pd.testing.assert_frame_equal(written, pd.DataFrame(rows))
+
+    def test_nothing_is_written_without_rows(self):
+        """
+        No file is created if no result is a row
+
+        :return: None type
+        :rtype: None
+        """
+        path = self._path("out.csv")
+        with ResultWriter(path) as writer:
+            writer.write_many([None, "text"])
+        self.assertFalse(os.path.exists(path))
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed")
+    def test_columnar_formats(self):
+        """
+        Parquet and Feather files hold every chunk
+
+        :return: None type
+        :rtype: None
+        """
+        for name, read in [
+            ("out.parquet", pd.read_parquet),
+            ("out.feather", pd.read_feather),
+        ]:
+            path = self._path(name)
+            with ResultWriter(path, chunk_size=10) as writer:
+                writer.write_many(self.rows)
+            pd.testing.assert_frame_equal(read(path), pd.DataFrame(self.rows))
+            # A later chunk with a new field and a wider type rewrites the schema
+            rows = [{"n": i} for i in range(10)] + [{"n": 1.5, "gamma": "x"}]
+            with ResultWriter(path, chunk_size=10) as writer:
+                writer.write_many(rows)
+            pd.testing.assert_frame_equal(
+                read(path), pd.DataFrame(rows).astype({"n": float})
+            )
+
+    @unittest.skipIf(pa is not None, "pyarrow is installed")
+    def test_columnar_formats_need_pyarrow(self):
+        """
+        Writing a columnar format without pyarrow fails before anything is written
+
+        :return: None type
+        :rtype: None
+        """
+        with self.assertRaises(ImportError):
+            ResultWriter(self._path("out.parquet"))
+
+    def test_listen_for_results_writes_output_file(self):
+        """
+        Results collected for a request are written to its output_file
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost/",
+            event_loop=loop,
+            output_chunk_size=4,
+        )
+        client = FinXRestClient(context=context)
+        cache_keys = [[row, "greeks", str(i)] for i, row in enumerate(self.rows)]
+        path = self._path("out.csv.gz")
+        results = loop.run_until_complete(
+            client._listen_for_results.run_async(cache_keys, output_file=path)
+        )
+        loop.close()
+        self.assertEqual(results, self.rows)
+        written = pd.read_csv(path, dtype={"security_id": str})
+        pd.testing.assert_frame_equal(written, pd.DataFrame(self.rows))
+
+    def test_output_file_fills_while_results_land(self):
+        """
+        Results are written as they land, before the rest of the batch is in
+
+        :return: None type
+        :rtype: None
+        """
+        context = loop_context(self, output_chunk_size=4)
+        client = FinXRestClient(context=context)
+        cache_keys = [[row, "greeks", str(i)] for i, row in enumerate(self.rows[:10])]
+        cache_keys += [[None, "greeks", str(i)] for i in range(10, 25)]
+        path = self._path("out.csv")
+
+        async def listen():
+            listening = asyncio.ensure_future(
+                client._listen_for_results.run_async(cache_keys, output_file=path)
+            )
+            await asyncio.sleep(0.05)
+            n_written = len(pd.read_csv(path))
+            context.cache_results(
+                [("greeks", str(i), self.rows[i]) for i in range(10, 25)]
+            )
+            return n_written, await listening
+
+        n_written, results = context.event_loop.run_until_complete(listen())
+        self.assertEqual(n_written, 8)
+        self.assertEqual(results, self.rows)
+        written = pd.read_csv(path, dtype={"security_id": str})
+        pd.testing.assert_frame_equal(written, pd.DataFrame(self.rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
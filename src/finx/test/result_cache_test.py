@@ -0,0 +1,714 @@
+#! python
+"""
+author: dick mule
+purpose: unittest the results cache used by the ApiContextManager
+"""
+from datetime import date
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+import pandas as pd
+
+from finx.base_classes.context_manager import ApiContextManager
+from finx.base_classes.session_manager import SessionManager
+from finx.clients.rest_client import FinXRestClient
+from finx.test.fixtures import loop_context, scratch_directory
+from finx.utils.result_cache import ResultCache
+
+# pylint: disable=protected-access
+
+
+class _CountingSession(SessionManager):
+    """Session stub answering every request with an incrementing counter"""
+
+    calls: int = 0
+    delay: float = 0.0
+    delays: dict[int, float] = {}
+    failures: set[int] = set()
+
+    def model_post_init(self, __context):
+        """
+        Skip opening an aiohttp session
+
+        :param __context: Context information for pydantic
+        :type __context: Any
+        :return: None type
+        :rtype: None
+        """
+
+    async def post(self, url: str, is_json_response: bool = True, **kwargs):
+        """
+        Count the request and answer with the count
+
+        :param url: String URL of the endpoint
+        :type url: str
+        :param is_json_response: Unused
+        :type is_json_response: bool
+        :param kwargs: Unused
+        :type kwargs: dict
+        :return: Counter payload
+        :rtype: dict
+        """
+        self.calls += 1
+        calls = self.calls
+        await asyncio.sleep(self.delays.get(calls, self.delay))
+        if calls in self.failures:
+            raise ConnectionError(f"Request {calls} failed")
+        return {"data": calls}
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Unittest the bounded LRU results cache"""
+
+    def test_evicts_least_recently_used(self):
+        """
+        Oldest untouched group is evicted once the entry limit is exceeded
+
+        :return: None type
+        :rtype: None
+        """
+        cache = ResultCache(max_entries=2)
+        cache.set("a", "NONE", 1)
+        cache.set("b", "NONE", 2)
+        self.assertEqual(cache.get("a", "NONE"), 1)
+        cache.set("c", "NONE", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("a", "NONE"), 1)
+        self.assertEqual(cache.get("c", "NONE"), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_pending_reservations_are_not_evicted(self):
+        """
+        Placeholders neither count against the entry limit nor get evicted
+
+        :return: None type
+        :rtype: None
+        """
+        cache = ResultCache(max_entries=2)
+        cache.set("A", "NONE", 1)
+        cache.set("B", "NONE", 2)
+        for i in range(10):
+            cache.reserve(f"P{i}", "NONE")
+        self.assertEqual([cache.get("A", "NONE"), cache.get("B", "NONE")], [1, 2])
+        cache.set("P0", "NONE", 3)
+        self.assertIsNone(cache.get("A", "NONE"))
+        self.assertEqual(cache.get("P0", "NONE"), 3)
+        self.assertTrue(all(f"P{i}" in cache for i in range(1, 10)))
+        self.assertEqual(len(cache), 11)
+
+    def test_byte_limit(self):
+        """
+        Values are evicted once the approximate byte limit is exceeded
+
+        :return: None type
+        :rtype: None
+        """
+        frame = pd.DataFrame({"x": range(1000)})
+        cache = ResultCache(
+            max_entries=None, max_bytes=int(frame.memory_usage().sum() * 1.5)
+        )
+        cache.set("a", "NONE", frame)
+        cache.set("b", "NONE", frame.copy())
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+        self.assertLessEqual(cache.n_bytes, cache.max_bytes)
+
+    def test_context_honors_cache_size(self):
+        """
+        ApiContextManager.cache_size bounds the number of cached results
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", cache_size=10
+        )
+        for i in range(50):
+            lookup = context.check_cache(
+                "get_security_reference_data", security_id=f"{i}"
+            )
+            context.cache.set(lookup.key, lookup.param_key, {"security_id": f"{i}"})
+        self.assertEqual(len(context.cache), 10)
+        cached = context.check_cache("get_security_reference_data", security_id="49")
+        self.assertEqual(cached.value, {"security_id": "49"})
+        self.assertIsNone(
+            context.check_cache("get_security_reference_data", security_id="0").value
+        )
+
+    def test_large_values_are_compressed(self):
+        """
+        Values above the compression threshold are held compressed and decoded on read
+
+        :return: None type
+        :rtype: None
+        """
+        flows = pd.DataFrame(
+            {
+                "date": pd.date_range("2024-01-01", periods=360, freq="MS"),
+                "principal": [1000.0] * 360,
+                "currency": ["USD"] * 360,
+            }
+        )
+        records = flows.astype({"date": str}).to_dict(orient="records")
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost",
+            cache_max_bytes=2**30,
+            cache_compression_threshold=1024,
+        )
+        context.cache.set("A", "NONE", flows)
+        context.cache.set("B", "NONE", records)
+        context.cache.set("C", "NONE", {"small": True})
+        pd.testing.assert_frame_equal(context.cache.get("A", "NONE"), flows)
+        self.assertEqual(context.cache.get("B", "NONE"), records)
+        self.assertEqual(context.cache.variants("C"), {"NONE": {"small": True}})
+        self.assertLess(context.cache.n_bytes, flows.memory_usage(deep=True).sum())
+
+    def test_scenario_variants_do_not_evict_each_other(self):
+        """
+        Parameter variants of one security/method are cached side by side
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(api_key="test", api_url="http://localhost")
+        params = {"security_id": "912796YB9", "as_of_date": "2021-01-01"}
+        for shock in [-100, 0, 100]:
+            lookup = context.check_cache(
+                "forecast_cf_and_prices", shock_in_bp=shock, **params
+            )
+            self.assertIsNone(lookup.value)
+            context.cache.set(lookup.key, lookup.param_key, {"shock": shock})
+        for shock in [-100, 0, 100]:
+            lookup = context.check_cache(
+                "forecast_cf_and_prices", shock_in_bp=shock, **params
+            )
+            self.assertEqual(lookup.value, {"shock": shock})
+        self.assertEqual(len(context.cache.variants(lookup.key)), 3)
+        self.assertEqual(context.cache.delete(lookup.key, lookup.param_key), 1)
+        self.assertEqual(len(context.cache.variants(lookup.key)), 2)
+
+    def test_negative_entries_expire(self):
+        """
+        Cached failures surface immediately until their own ttl expires
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", negative_cache_ttl=60
+        )
+        lookup = context.check_cache("coverage_check", security_id="IM A FAKE ID")
+        context.cache_error(lookup.key, lookup.param_key, "Security not covered")
+        cached = context.check_cache("coverage_check", security_id="IM A FAKE ID")
+        self.assertEqual(cached.value, "Security not covered")
+        self.assertTrue(context.cache.is_negative(lookup.key, lookup.param_key))
+        context.cache.set_error(lookup.key, lookup.param_key, "expired", ttl=0)
+        retried = context.check_cache("coverage_check", security_id="IM A FAKE ID")
+        self.assertIsNone(retried.value)
+
+    def test_transient_errors_are_not_cached(self):
+        """
+        Server and timeout errors are not cached, so the request is sent again
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", negative_cache_ttl=60
+        )
+        for error in ["Internal server error", {"error": "Request timed out"}]:
+            lookup = context.check_cache("coverage_check", security_id="SLOW ID")
+            context.cache_error(lookup.key, lookup.param_key, error)
+            self.assertFalse(context.cache.is_negative(lookup.key, lookup.param_key))
+            self.assertEqual(len(context.cache), 0)
+            retried = context.check_cache("coverage_check", security_id="SLOW ID")
+            self.assertIsNone(retried.value)
+            context.cache.delete(retried.key, retried.param_key)
+
+    def test_historical_results_pinned_current_results_expire(self):
+        """
+        Past as_of_date results never expire while current results honor their ttl
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost",
+            result_ttls={"get_security_reference_data": 0},
+        )
+        today = date.today().isoformat()
+        lookups = context.check_cache_batch(
+            "get_security_reference_data",
+            pd.DataFrame(
+                {
+                    "security_id": ["A", "B", "C"],
+                    "as_of_date": ["2021-01-01", today, None],
+                }
+            ),
+        )
+        for lookup in lookups:
+            context.cache.set(lookup.key, lookup.param_key, {"key": lookup.key})
+        historical = context.check_cache(
+            "get_security_reference_data", security_id="A", as_of_date="1/1/21"
+        )
+        self.assertEqual(historical.value, {"key": lookups[0].key})
+        self.assertIsNone(
+            context.check_cache(
+                "get_security_reference_data", security_id="B", as_of_date=today
+            ).value
+        )
+        self.assertIsNone(
+            context.check_cache("get_security_reference_data", security_id="C").value
+        )
+        self.assertIsNone(context.result_ttl("forecast_cf_and_prices", "2021-01-01"))
+        self.assertEqual(
+            context.result_ttl("forecast_cf_and_prices", today),
+            context.current_result_ttl,
+        )
+
+    def test_stale_while_revalidate(self):
+        """
+        Expired results are served immediately and refreshed in the background
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost",
+            event_loop=loop,
+            result_ttls={"get_curve": 0},
+            stale_while_revalidate=["get_curve"],
+        )
+        session = _CountingSession()
+        client = FinXRestClient(context=context, session=session)
+
+        async def request_twice():
+            first = await client._dispatch.run_async("get_curve", curve_name="sofr")
+            second = await client._dispatch.run_async("get_curve", curve_name="sofr")
+            await asyncio.sleep(0.05)
+            return first, second
+
+        self.assertEqual(loop.run_until_complete(request_twice()), ({"data": 1},) * 2)
+        self.assertEqual(session.calls, 2)
+        lookup = context.check_cache("get_curve", curve_name="sofr")
+        self.assertEqual(lookup.value, {"data": 2})
+        self.assertEqual(context.refresh_stats.snapshot()["refreshes"], 1)
+        self.assertEqual(context.refresh_stats.failures, 0)
+        loop.close()
+
+    def test_failed_refresh_keeps_result_ttl(self):
+        """
+        A failed refresh holds the stale value for negative_cache_ttl seconds only, the
+        next successful refresh expires after the result ttl again
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost",
+            event_loop=loop,
+            result_ttls={"get_curve": 0},
+            stale_while_revalidate=["get_curve"],
+            negative_cache_ttl=0.5,
+        )
+        session = _CountingSession(failures={2})
+        client = FinXRestClient(context=context, session=session)
+
+        async def request():
+            result = await client._dispatch.run_async("get_curve", curve_name="sofr")
+            await asyncio.sleep(0.05)
+            return result
+
+        self.assertEqual(loop.run_until_complete(request()), {"data": 1})
+        self.assertEqual(loop.run_until_complete(request()), {"data": 1})
+        lookup = context.check_cache("get_curve", curve_name="sofr")
+        self.assertEqual(lookup.value, {"data": 1})
+        self.assertFalse(context.cache.is_expired(lookup.key, lookup.param_key))
+        self.assertEqual(context.refresh_stats.failures, 1)
+        loop.run_until_complete(asyncio.sleep(0.5))
+        self.assertEqual(loop.run_until_complete(request()), {"data": 1})
+        self.assertEqual(session.calls, 3)
+        self.assertEqual(
+            context.cache.get(lookup.key, lookup.param_key, stale=True), {"data": 3}
+        )
+        self.assertTrue(context.cache.is_expired(lookup.key, lookup.param_key))
+        self.assertEqual(context.refresh_stats.snapshot()["refreshes"], 2)
+        loop.close()
+
+    def test_identical_concurrent_requests_share_one_call(self):
+        """
+        Concurrent identical misses are coalesced into a single request
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", event_loop=loop
+        )
+        session = _CountingSession(delay=0.05)
+        client = FinXRestClient(context=context, session=session)
+
+        async def request_concurrently():
+            return await asyncio.gather(
+                *[
+                    client._dispatch.run_async(
+                        "get_security_reference_data",
+                        security_id="912796YB9",
+                        as_of_date=as_of_date,
+                    )
+                    for as_of_date in ["2021-01-01"] * 49 + ["2021-01-04"]
+                ]
+            )
+
+        results = loop.run_until_complete(request_concurrently())
+        self.assertEqual(session.calls, 2)
+        self.assertEqual(results[:49], [{"data": 1}] * 49)
+        self.assertEqual(results[49], {"data": 2})
+        loop.close()
+
+    def test_slow_requests_are_hedged(self):
+        """
+        A request outstanding past the hedge percentile is duplicated and the first answer
+        wins; requests outstanding past the timeout are abandoned
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test",
+            api_url="http://localhost",
+            event_loop=loop,
+            timeout=1,
+            hedge_requests=["get_security_reference_data"],
+            hedge_min_samples=5,
+        )
+        session = _CountingSession(delay=0.01, delays={7: 5.0, 9: 5.0, 10: 5.0})
+        client = FinXRestClient(context=context, session=session)
+
+        def request(day):
+            return loop.run_until_complete(
+                client._dispatch.run_async(
+                    "get_security_reference_data",
+                    security_id="912796YB9",
+                    as_of_date=f"2021-01-{day:02d}",
+                )
+            )
+
+        self.assertEqual(
+            [request(day) for day in range(1, 7)], [{"data": i} for i in range(1, 7)]
+        )
+        self.assertIsNotNone(context.hedge_delay("get_security_reference_data"))
+        self.assertIsNone(context.hedge_delay("calculate_greeks"))
+        self.assertEqual(request(7), {"data": 8})
+        with self.assertRaises(asyncio.TimeoutError):
+            request(8)
+        report = context.latency_report().loc["get_security_reference_data"]
+        self.assertEqual(report["requests"], 8)
+        self.assertEqual(report["hedged"], 2)
+        self.assertEqual(report["hedge_wins"], 1)
+        self.assertEqual(report["timeouts"], 1)
+        self.assertEqual(report["extra_load"], 0.25)
+        self.assertLess(report["cutoff"], 1)
+        loop.close()
+
+    def test_waiters_wake_when_results_land(self):
+        """
+        Pending results resolve as soon as another thread delivers them
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", event_loop=loop
+        )
+        client = FinXRestClient(context=context, session=_CountingSession())
+        frame = pd.DataFrame(
+            {"security_id": ["A", "B", "C"], "as_of_date": "2021-01-01"}
+        )
+        lookups = context.check_cache_batch("get_security_reference_data", frame)
+        context.cache.set(lookups[0].key, lookups[0].param_key, {"id": "A"})
+        lookups = context.check_cache_batch("get_security_reference_data", frame)
+
+        def deliver():
+            context.cache_results([(lookups[1].key, lookups[1].param_key, {"id": "B"})])
+            context.cache_error(lookups[2].key, lookups[2].param_key, "not covered")
+
+        async def wait():
+            waiting = asyncio.ensure_future(client._wait_for_results.run_async(lookups))
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiting.done())
+            threading.Thread(target=deliver).start()
+            return await asyncio.wait_for(waiting, 1)
+
+        results, _ = loop.run_until_complete(wait())
+        self.assertEqual(results, [{"id": "A"}, {"id": "B"}, "not covered"])
+        self.assertEqual(context._waiters, {})
+        loop.close()
+
+    def test_stream_batch_yields_results_as_they_land(self):
+        """
+        Streamed batch results are yielded in completion order
+
+        :return: None type
+        :rtype: None
+        """
+        loop = asyncio.new_event_loop()
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", event_loop=loop
+        )
+        client = FinXRestClient(context=context, session=_CountingSession())
+        client._reload_function_definitions(
+            [{"name": "get_curve", "required": ["curve_name"], "optional": None}]
+        )
+        frame = pd.DataFrame(
+            {"security_id": ["A", "B", "C"], "as_of_date": "2021-01-01"}
+        )
+        lookups = context.check_cache_batch("get_security_reference_data", frame)
+
+        async def stream():
+            streamed = []
+            async for result in client.stream_batch_get_curve(
+                [{"curve_name": "sofr"}, {"curve_name": "libor"}]
+            ):
+                streamed.append(result)
+            for lookup in lookups[::-1]:
+                loop.call_later(
+                    0.01,
+                    context.cache_results,
+                    [(lookup.key, lookup.param_key, lookup.key)],
+                )
+            async for _, result in client._stream_results(lookups):
+                streamed.append(result)
+            return streamed
+
+        streamed = loop.run_until_complete(stream())
+        self.assertEqual(sorted(streamed[:2], key=str), [{"data": 1}, {"data": 2}])
+        self.assertEqual(streamed[2:], [lookup.key for lookup in lookups[::-1]])
+        loop.close()
+
+    def test_invalidate_by_security_date_and_method(self):
+        """
+        Only results matching every given field are invalidated, in memory and on disk
+
+        :return: None type
+        :rtype: None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            context = ApiContextManager(
+                api_key="test",
+                api_url="http://localhost",
+                persistent_cache_path=os.path.join(directory, "cache.sqlite"),
+            )
+            requests = [
+                ("get_security_reference_data", "912796YB9", "2021-01-01"),
+                ("get_security_reference_data", "912796YB9", "2021-01-02"),
+                ("forecast_cf_and_prices", "912796YB9", "2021-01-01"),
+                ("get_security_reference_data", "91282CCA7", "2021-01-01"),
+            ]
+            for api_method, security_id, as_of_date in requests:
+                lookup = context.check_cache(
+                    api_method, security_id=security_id, as_of_date=as_of_date
+                )
+                context.cache.set(lookup.key, lookup.param_key, {"cached": True})
+            context.check_cache("list_api_functions")
+            self.assertEqual(
+                context.invalidate(
+                    security_id="912796yb9",
+                    as_of_date="1/1/21",
+                    api_method="get_security_reference_data",
+                ),
+                1,
+            )
+            self.assertEqual(context.invalidate(security_id="912796YB9"), 2)
+            self.assertEqual(context.invalidate(api_method="list_api_functions"), 1)
+            self.assertEqual(
+                list(context.cache),
+                ["91282CCA7:2021-01-01:get_security_reference_data"],
+            )
+            context.cache.clear()
+            retained = context.check_cache(
+                "get_security_reference_data",
+                security_id="91282CCA7",
+                as_of_date="2021-01-01",
+            )
+            self.assertEqual(retained.value, {"cached": True})
+            self.assertIsNone(
+                context.check_cache(
+                    "forecast_cf_and_prices",
+                    security_id="912796YB9",
+                    as_of_date="2021-01-01",
+                ).value
+            )
+            context.cache.store.close()
+
+    def test_repeated_registration_is_sent_and_invalidates(self):
+        """
+        Registering a bond again reaches the API and drops the cached results of the
+        security, whether it is registered alone or in a DataFrame batch. The on-disk cache
+        is scanned once per criterion after each registration, not before the lookup.
+
+        :return: None type
+        :rtype: None
+        """
+        context = loop_context(
+            self,
+            persistent_cache_path=os.path.join(scratch_directory(self), "cache.sqlite"),
+        )
+        self.addCleanup(context.cache.store.close)
+        session = _CountingSession()
+        client = FinXRestClient(context=context, session=session)
+        reference_data = {"security_id": "TEMPBOND1", "coupon_rate": 0.05}
+        with mock.patch.object(
+            context.cache.store,
+            "delete_matching",
+            wraps=context.cache.store.delete_matching,
+        ) as delete_matching:
+            for i in range(2):
+                lookup = context.check_cache(
+                    "forecast_cf_and_prices", security_id="TEMPBOND1"
+                )
+                context.cache.set(lookup.key, lookup.param_key, {"cached": True})
+                result = context.event_loop.run_until_complete(
+                    client._dispatch.run_async(
+                        "register_temporary_bond",
+                        reference_data=reference_data,
+                        schedule_data={},
+                    )
+                )
+                self.assertEqual(result, {"data": i + 1})
+                self.assertNotIn(lookup.key, context.cache)
+                self.assertEqual(delete_matching.call_count, 2 * (i + 1))
+        self.assertIsNone(context.cache.store.get(lookup.key, lookup.param_key))
+        context.cache.set(lookup.key, lookup.param_key, {"cached": True})
+        removed = client._invalidate_registered_securities(
+            "register_temporary_bond",
+            persistent=False,
+            batch_input=pd.DataFrame([{"reference_data": reference_data}]),
+        )
+        self.assertEqual(removed, 1)
+        self.assertEqual(len(context.cache), 0)
+
+    def test_persistent_cache_survives_restart(self):
+        """
+        Results written behind to disk are read through by a fresh context
+
+        :return: None type
+        :rtype: None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            params = {"security_id": "912796YB9", "as_of_date": "2021-01-01"}
+            context = ApiContextManager(
+                api_key="test", api_url="http://localhost", persistent_cache_path=path
+            )
+            lookup = context.check_cache("get_security_reference_data", **params)
+            context.cache.set(lookup.key, lookup.param_key, {"asset_class": "bond"})
+            context.cache.store.close()
+            restarted = ApiContextManager(
+                api_key="test", api_url="http://localhost", persistent_cache_path=path
+            )
+            cached = restarted.check_cache("get_security_reference_data", **params)
+            self.assertEqual(cached.value, {"asset_class": "bond"})
+            restarted.clear_cache(persistent=True)
+            self.assertIsNone(restarted.cache.store.get(lookup.key, lookup.param_key))
+            restarted.cache.store.close()
+
+    def test_snapshot_export_import(self):
+        """
+        A filtered snapshot warms a fresh context with the selected results and their ttls
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(api_key="test", api_url="http://localhost")
+        today = date.today().isoformat()
+        for security_id, as_of_date in [("A", "2021-01-01"), ("B", today)]:
+            for api_method in ["get_security_reference_data", "calculate_greeks"]:
+                lookup = context.check_cache(
+                    api_method, security_id=security_id, as_of_date=as_of_date
+                )
+                context.cache.set(lookup.key, lookup.param_key, {"id": security_id})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.finx")
+            n_exported = context.export_cache(
+                path, api_method="get_security_reference_data"
+            )
+            self.assertEqual(n_exported, 2)
+            restored = ApiContextManager(api_key="test", api_url="http://localhost")
+            self.assertEqual(restored.import_cache(path, as_of_date=[today]), 1)
+        cached = restored.check_cache(
+            "get_security_reference_data", security_id="B", as_of_date=today
+        )
+        self.assertEqual(cached.value, {"id": "B"})
+        self.assertEqual(restored.cache._ttls[(cached.key, cached.param_key)], 3600)
+        for api_method, security_id, as_of_date in [
+            ("get_security_reference_data", "A", "2021-01-01"),
+            ("calculate_greeks", "B", today),
+        ]:
+            missed = restored.check_cache(
+                api_method, security_id=security_id, as_of_date=as_of_date
+            )
+            self.assertIsNone(missed.value)
+
+    def test_stats_per_api_method(self):
+        """
+        Hits, misses, inserts, evictions and footprint are reported per api method
+
+        :return: None type
+        :rtype: None
+        """
+        context = ApiContextManager(
+            api_key="test", api_url="http://localhost", cache_size=3
+        )
+        for security_id in ["A", "B", "C", "A"]:
+            lookup = context.check_cache(
+                "get_security_reference_data",
+                security_id=security_id,
+                as_of_date="2021-01-01",
+            )
+            if lookup.value is None:
+                context.cache.set(lookup.key, lookup.param_key, {"id": security_id})
+        frame = pd.DataFrame({"security_id": ["A", "D"], "as_of_date": "2021-01-01"})
+        lookups = context.check_cache_batch("calculate_greeks", frame)
+        context.cache.set(lookups[1].key, lookups[1].param_key, {"delta": 0.5})
+        stats = context.cache_stats()
+        self.assertEqual(
+            stats.loc["get_security_reference_data", ["hits", "misses", "inserts"]]
+            .astype(int)
+            .to_list(),
+            [1, 3, 3],
+        )
+        # Only the filled greeks result counts against cache_size, not the placeholders
+        self.assertEqual(stats.loc["get_security_reference_data", "evictions"], 1)
+        self.assertEqual(stats.loc["calculate_greeks", "misses"], 2)
+        self.assertEqual(stats.loc["calculate_greeks", "entries"], 1)
+        self.assertGreater(stats.loc["calculate_greeks", "bytes"], 0)
+        self.assertAlmostEqual(
+            stats.loc["get_security_reference_data", "hit_rate"], 0.25
+        )
+        context.cache.reset_stats()
+        self.assertEqual(context.cache_stats()["hits"].sum(), 0)
+        restored = ResultCache()
+        restored.restore(
+            ("X:2021-01-01:get_curve", f"{i:016x}", i, None, None) for i in range(3)
+        )
+        self.assertEqual(restored.stats()["get_curve"]["inserts"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
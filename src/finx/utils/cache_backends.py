@@ -0,0 +1,508 @@
+#! python
+"""
+author: dick mule
+purpose: pluggable shared backends (memory, Redis protocol) behind the results cache
+"""
+from fnmatch import fnmatchcase
+from typing import Any, Iterable, NamedTuple, Optional, Protocol, runtime_checkable
+
+import pickle
+import socket
+import threading
+import time
+
+_SEPARATOR = "|"
+
+
+class CacheEntry(NamedTuple):
+    """A stored value and the time it was written"""
+
+    value: Any
+    created: float
+
+
+@runtime_checkable
+class CacheBackend(Protocol):
+    """
+    Interface of a shared store behind the in-memory ResultCache.
+
+    Values are keyed by (cache_key, params_key). Implementations must be thread safe since
+    they are written from the socket thread and read from the event loop.
+    """
+
+    def get(self, cache_key: str, params_key: str) -> Optional[CacheEntry]:
+        """Read one entry (None if missing)"""
+
+    def get_many(self, keys: list[tuple[str, str]]) -> list[Optional[CacheEntry]]:
+        """Read many entries in one round trip, in key order"""
+
+    def set(self, cache_key: str, params_key: str, value: Any) -> None:
+        """Write one value"""
+
+    def set_many(self, items: Iterable[tuple[str, str, Any]]) -> None:
+        """Write many (cache_key, params_key, value) items in one round trip"""
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """Delete one variant, or every variant of a cache key if params_key is None"""
+
+    def delete_matching(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+    ) -> int:
+        """Delete every value of the given security, date and/or method"""
+
+    def clear(self) -> None:
+        """Delete every value"""
+
+    def close(self) -> None:
+        """Release any connections"""
+
+
+def _glob_escape(value: str) -> str:
+    """
+    Escape glob wildcards so that a value only matches itself
+
+    :param value: Literal value
+    :type value: str
+    :return: Escaped value
+    :rtype: str
+    """
+    return value.replace("[", "[[]").replace("*", "[*]").replace("?", "[?]")
+
+
+def key_patterns(
+    security_id: Optional[str] = None,
+    as_of_date: Optional[str] = None,
+    api_method: Optional[str] = None,
+) -> list[str]:
+    """
+    Glob patterns (SQLite GLOB, fnmatch and Redis MATCH syntax) matching every cache key
+    (security_id:as_of_date:api_method or api_method) of the given security, date and/or
+    method (None matches anything)
+
+    :param security_id: Canonical security id
+    :type security_id: Optional[str]
+    :param as_of_date: Canonical as of date
+    :type as_of_date: Optional[str]
+    :param api_method: Name of the API method
+    :type api_method: Optional[str]
+    :return: Glob patterns
+    :rtype: list[str]
+    """
+    parts = [
+        "*" if value is None else _glob_escape(value)
+        for value in (security_id, as_of_date, api_method)
+    ]
+    patterns = [":".join(parts)]
+    if security_id is None and as_of_date is None:
+        patterns.append(parts[2])
+    return patterns
+
+
+class MemoryBackend:
+    """
+    Process local backend - lets several contexts (clients) in one process share results
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty backend
+        """
+        self._entries: dict[tuple[str, str], CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str, params_key: str) -> Optional[CacheEntry]:
+        """
+        Read one entry
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Stored entry or None if missing
+        :rtype: Optional[CacheEntry]
+        """
+        return self._entries.get((cache_key, params_key))
+
+    def get_many(self, keys: list[tuple[str, str]]) -> list[Optional[CacheEntry]]:
+        """
+        Read many entries
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :return: Stored entries (None if missing) in key order
+        :rtype: list[Optional[CacheEntry]]
+        """
+        with self._lock:
+            return [self._entries.get(key) for key in keys]
+
+    def set(self, cache_key: str, params_key: str, value: Any) -> None:
+        """
+        Write one value
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param value: Value to store
+        :type value: Any
+        :return: None type
+        :rtype: None
+        """
+        self.set_many([(cache_key, params_key, value)])
+
+    def set_many(self, items: Iterable[tuple[str, str, Any]]) -> None:
+        """
+        Write many values
+
+        :param items: (cache_key, params_key, value) items
+        :type items: Iterable[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        now = time.time()
+        with self._lock:
+            for cache_key, params_key, value in items:
+                self._entries[(cache_key, params_key)] = CacheEntry(value, now)
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """
+        Delete one variant, or every variant of a cache key if params_key is None
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if key[0] == cache_key and params_key in (None, key[1])
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def delete_matching(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+    ) -> int:
+        """
+        Delete every value of the given security, date and/or method
+
+        :param security_id: Canonical security id (None matches any)
+        :type security_id: Optional[str]
+        :param as_of_date: Canonical as of date (None matches any)
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method (None matches any)
+        :type api_method: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        patterns = key_patterns(security_id, as_of_date, api_method)
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if any(fnmatchcase(key[0], pattern) for pattern in patterns)
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        Delete every value
+
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """
+        Nothing to release
+
+        :return: None type
+        :rtype: None
+        """
+
+
+def _encode_command(*args: Any) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings
+
+    :param args: Command name and arguments
+    :type args: Any
+    :return: Encoded command
+    :rtype: bytes
+    """
+    chunks = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        chunks.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(chunks)
+
+
+class RedisBackend:
+    """
+    Backend speaking the Redis protocol (RESP) over a plain socket - works with Redis,
+    Valkey, KeyDB, Dragonfly, ... without any additional dependency.
+
+    Keys are stored as <prefix><cache_key>|<params_key> and values as pickled
+    (value, created) tuples. Batches are sent as a single MGET / MSET.
+    """
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "finx:",
+        timeout: float = 30,
+    ):
+        """
+        Connect to the server
+
+        :param host: Server host
+        :type host: str
+        :param port: Server port
+        :type port: int
+        :param db: Database number
+        :type db: int
+        :param password: Optional password
+        :type password: Optional[str]
+        :param prefix: Namespace prepended to every key
+        :type prefix: str
+        :param timeout: Socket timeout in seconds
+        :type timeout: float
+        """
+        self.prefix: str = prefix
+        self._lock = threading.Lock()
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+        if password is not None:
+            self._execute(("AUTH", password))
+        if db:
+            self._execute(("SELECT", db))
+
+    def _read_reply(self) -> Any:
+        """
+        Read one RESP reply
+
+        :return: Decoded reply
+        :rtype: Any
+        """
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode("utf-8")
+        if prefix == b"-":
+            raise ValueError(f"Redis error: {body.decode('utf-8')}")
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            size = int(body)
+            return None if size < 0 else self._reader.read(size + 2)[:-2]
+        if prefix == b"*":
+            size = int(body)
+            return None if size < 0 else [self._read_reply() for _ in range(size)]
+        raise ValueError(f"Unexpected Redis reply: {line!r}")
+
+    def _execute(self, *commands: tuple) -> list[Any]:
+        """
+        Send pipelined commands and read every reply
+
+        :param commands: Tuples of command name and arguments
+        :type commands: tuple
+        :return: One reply per command
+        :rtype: list[Any]
+        """
+        with self._lock:
+            self._socket.sendall(b"".join(_encode_command(*c) for c in commands))
+            return [self._read_reply() for _ in commands]
+
+    def _key(self, cache_key: str, params_key: str) -> str:
+        """
+        Build the server side key of a variant
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Server side key
+        :rtype: str
+        """
+        return f"{self.prefix}{cache_key}{_SEPARATOR}{params_key}"
+
+    def _scan(self, pattern: str) -> list[bytes]:
+        """
+        Find every server side key matching a glob pattern
+
+        :param pattern: Glob pattern (including the prefix)
+        :type pattern: str
+        :return: Matching keys
+        :rtype: list[bytes]
+        """
+        keys, cursor = [], b"0"
+        while True:
+            cursor, batch = self._execute(
+                ("SCAN", cursor, "MATCH", pattern, "COUNT", 10000)
+            )[0]
+            keys.extend(batch)
+            if cursor == b"0":
+                return keys
+
+    def _unlink(self, keys: list[bytes]) -> int:
+        """
+        Delete server side keys
+
+        :param keys: Keys to delete
+        :type keys: list[bytes]
+        :return: Number of keys deleted
+        :rtype: int
+        """
+        return self._execute(("DEL", *keys))[0] if keys else 0
+
+    @staticmethod
+    def _decode(blob: Optional[bytes]) -> Optional[CacheEntry]:
+        """
+        Decode a stored (value, created) blob
+
+        :param blob: Pickled entry
+        :type blob: Optional[bytes]
+        :return: Stored entry or None if missing
+        :rtype: Optional[CacheEntry]
+        """
+        return None if blob is None else CacheEntry(*pickle.loads(blob))
+
+    def get(self, cache_key: str, params_key: str) -> Optional[CacheEntry]:
+        """
+        Read one entry
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Stored entry or None if missing
+        :rtype: Optional[CacheEntry]
+        """
+        return self._decode(self._execute(("GET", self._key(cache_key, params_key)))[0])
+
+    def get_many(self, keys: list[tuple[str, str]]) -> list[Optional[CacheEntry]]:
+        """
+        Read many entries with a single MGET
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :return: Stored entries (None if missing) in key order
+        :rtype: list[Optional[CacheEntry]]
+        """
+        if not keys:
+            return []
+        blobs = self._execute(("MGET", *[self._key(*key) for key in keys]))[0]
+        return [self._decode(blob) for blob in blobs]
+
+    def set(self, cache_key: str, params_key: str, value: Any) -> None:
+        """
+        Write one value
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param value: Value to store
+        :type value: Any
+        :return: None type
+        :rtype: None
+        """
+        self.set_many([(cache_key, params_key, value)])
+
+    def set_many(self, items: Iterable[tuple[str, str, Any]]) -> None:
+        """
+        Write many values with a single MSET
+
+        :param items: (cache_key, params_key, value) items
+        :type items: Iterable[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        now = time.time()
+        arguments = []
+        for cache_key, params_key, value in items:
+            arguments.append(self._key(cache_key, params_key))
+            arguments.append(pickle.dumps((value, now), pickle.HIGHEST_PROTOCOL))
+        if arguments:
+            self._execute(("MSET", *arguments))
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """
+        Delete one variant, or every variant of a cache key if params_key is None
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        if params_key is not None:
+            return self._unlink([self._key(cache_key, params_key).encode("utf-8")])
+        pattern = self._key(_glob_escape(cache_key), "*")
+        return self._unlink(self._scan(pattern))
+
+    def delete_matching(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+    ) -> int:
+        """
+        Delete every value of the given security, date and/or method
+
+        :param security_id: Canonical security id (None matches any)
+        :type security_id: Optional[str]
+        :param as_of_date: Canonical as of date (None matches any)
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method (None matches any)
+        :type api_method: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        keys = set()
+        for pattern in key_patterns(security_id, as_of_date, api_method):
+            keys.update(self._scan(self._key(pattern, "*")))
+        return self._unlink(list(keys))
+
+    def clear(self) -> None:
+        """
+        Delete every value under the prefix
+
+        :return: None type
+        :rtype: None
+        """
+        self._unlink(self._scan(f"{_glob_escape(self.prefix)}*"))
+
+    def close(self) -> None:
+        """
+        Close the connection
+
+        :return: None type
+        :rtype: None
+        """
+        self._reader.close()
+        self._socket.close()
@@ -0,0 +1,129 @@
+#! python
+"""
+author: dick mule
+purpose: compact compressed representation of large cached results, decoded only when read
+"""
+from typing import Any, Optional
+
+import pickle
+import zlib
+
+import numpy as np
+import pandas as pd
+
+_LEVEL = 1
+_RAW_KINDS = "biufcmM"
+
+
+def _compress_column(values: pd.Series) -> tuple[Any, ...]:
+    """
+    Compress one column - plain numpy buffers for numeric/datetime columns, a pickled
+    Series for everything else (strings, categoricals, extension dtypes)
+
+    :param values: Column to compress
+    :type values: pd.Series
+    :return: Tuple of encoding, dtype and compressed bytes
+    :rtype: tuple[Any, ...]
+    """
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in _RAW_KINDS:
+        buffer = np.ascontiguousarray(values.to_numpy()).tobytes()
+        return "raw", dtype.str, zlib.compress(buffer, _LEVEL)
+    blob = pickle.dumps(values.reset_index(drop=True), pickle.HIGHEST_PROTOCOL)
+    return "pickle", None, zlib.compress(blob, _LEVEL)
+
+
+def _decompress_column(encoding: str, dtype: Optional[str], blob: bytes) -> Any:
+    """
+    Rebuild one column compressed by _compress_column
+
+    :param encoding: raw or pickle
+    :type encoding: str
+    :param dtype: Numpy dtype string of raw columns
+    :type dtype: Optional[str]
+    :param blob: Compressed bytes
+    :type blob: bytes
+    :return: Column values
+    :rtype: Any
+    """
+    if encoding == "raw":
+        return np.frombuffer(bytearray(zlib.decompress(blob)), dtype=np.dtype(dtype))
+    return pickle.loads(zlib.decompress(blob)).array
+
+
+class CompressedValue:
+    """
+    A cached value held in compressed form. DataFrames are stored column by column (each
+    column compressed on its own); any other value is pickled and compressed.
+    """
+
+    __slots__ = ("_columns", "_index", "_blob", "n_bytes")
+
+    def __init__(
+        self,
+        blob: Optional[bytes] = None,
+        columns: Optional[list[tuple[Any, ...]]] = None,
+        index: Optional[bytes] = None,
+    ):
+        """
+        Initialize from already compressed parts (see CompressedValue.encode)
+
+        :param blob: Compressed pickle of a non DataFrame value
+        :type blob: Optional[bytes]
+        :param columns: Compressed columns of a DataFrame
+        :type columns: Optional[list[tuple[Any, ...]]]
+        :param index: Compressed pickle of the DataFrame index and column labels
+        :type index: Optional[bytes]
+        """
+        self._blob = blob
+        self._columns = columns
+        self._index = index
+        self.n_bytes: int = (
+            len(blob)
+            if blob is not None
+            else len(index) + sum(len(column[-1]) for column in columns)
+        )
+
+    @classmethod
+    def encode(cls, value: Any, threshold: int = 0) -> Any:
+        """
+        Compress a value if it is at least threshold bytes large
+
+        :param value: Value to compress
+        :type value: Any
+        :param threshold: Minimum (approximate) size in bytes worth compressing
+        :type threshold: int
+        :return: CompressedValue or the value itself if it is too small
+        :rtype: Any
+        """
+        if isinstance(value, pd.DataFrame):
+            if value.memory_usage(deep=False).sum() < threshold:
+                return value
+            labels = pickle.dumps((value.index, value.columns), pickle.HIGHEST_PROTOCOL)
+            return cls(
+                columns=[
+                    _compress_column(value.iloc[:, i]) for i in range(value.shape[1])
+                ],
+                index=zlib.compress(labels, _LEVEL),
+            )
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) < threshold:
+            return value
+        return cls(blob=zlib.compress(blob, _LEVEL))
+
+    def decode(self) -> Any:
+        """
+        Rebuild the original value
+
+        :return: Decoded value
+        :rtype: Any
+        """
+        if self._blob is not None:
+            return pickle.loads(zlib.decompress(self._blob))
+        index, columns = pickle.loads(zlib.decompress(self._index))
+        frame = pd.DataFrame(
+            {i: _decompress_column(*column) for i, column in enumerate(self._columns)},
+            index=index,
+        )
+        frame.columns = columns
+        return frame
@@ -0,0 +1,188 @@
+#! python
+"""
+author: dick mule
+purpose: content addressed local store of downloaded batch result files
+"""
+from typing import Optional
+
+import hashlib
+import os
+import tempfile
+
+
+class ResultFileStore:
+    """
+    Local store of downloaded result files shared by every process on the host.
+
+    Files are stored once under the sha256 of their content (objects/<digest>) and every
+    (bucket_name, filename) they were downloaded as points at that digest (names/<hash>), so
+    a file served under several names is only kept once. All writes go through a temporary
+    file and os.replace, so concurrent writers never expose a partial file. Stored files are
+    parsed memory mapped, so their raw bytes are only held once, in the OS page cache - every
+    process still parses its own copy of the result. If max_bytes is set, the least recently
+    read files (and the names pointing at them) are removed once the store grows beyond it.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        """
+        Open (or create) a store
+
+        :param directory: Root directory of the store
+        :type directory: str
+        :param max_bytes: Maximum total size of the stored files (None for unbounded)
+        :type max_bytes: Optional[int]
+        """
+        self.directory: str = directory
+        self.max_bytes: Optional[int] = max_bytes
+        self._objects = os.path.join(directory, "objects")
+        self._names = os.path.join(directory, "names")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._names, exist_ok=True)
+
+    def _name_path(self, filename: str, bucket_name: Optional[str]) -> str:
+        """
+        Path of the entry pointing a downloaded name at its content
+
+        :param filename: Name of the downloaded file
+        :type filename: str
+        :param bucket_name: Bucket the file was downloaded from
+        :type bucket_name: Optional[str]
+        :return: Path of the name entry
+        :rtype: str
+        """
+        name = f"{bucket_name or ''}\0{filename}".encode("utf-8")
+        return os.path.join(
+            self._names, hashlib.blake2b(name, digest_size=16).hexdigest()
+        )
+
+    def _write(self, path: str, content: bytes) -> None:
+        """
+        Atomically write a file
+
+        :param path: Destination path
+        :type path: str
+        :param content: File contents
+        :type content: bytes
+        :return: None type
+        :rtype: None
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def path(self, filename: str, bucket_name: Optional[str] = None) -> Optional[str]:
+        """
+        Local path of a previously downloaded file
+
+        :param filename: Name of the downloaded file
+        :type filename: str
+        :param bucket_name: Bucket the file was downloaded from
+        :type bucket_name: Optional[str]
+        :return: Path of the stored file or None if it was never stored (or was pruned).
+            Another process may still prune the file before it is opened, so readers treat
+            FileNotFoundError as a miss.
+        :rtype: Optional[str]
+        """
+        try:
+            with open(self._name_path(filename, bucket_name), encoding="utf-8") as file:
+                object_path = os.path.join(self._objects, file.read().strip())
+            os.utime(object_path)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+        return object_path
+
+    def put(self, filename: str, bucket_name: Optional[str], content: bytes) -> str:
+        """
+        Store a downloaded file
+
+        :param filename: Name of the downloaded file
+        :type filename: str
+        :param bucket_name: Bucket the file was downloaded from
+        :type bucket_name: Optional[str]
+        :param content: File contents
+        :type content: bytes
+        :return: Path of the stored file
+        :rtype: str
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = os.path.join(self._objects, digest)
+        if os.path.exists(object_path):
+            os.utime(object_path)
+        else:
+            self._write(object_path, content)
+        self._write(self._name_path(filename, bucket_name), digest.encode("utf-8"))
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+        return object_path
+
+    def prune(self, max_bytes: int) -> int:
+        """
+        Remove the least recently read files, and the names pointing at them, until the
+        store holds at most max_bytes
+
+        :param max_bytes: Size to shrink the store to
+        :type max_bytes: int
+        :return: Number of files removed
+        :rtype: int
+        """
+        entries = []
+        for entry in os.scandir(self._objects):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        n_bytes = sum(size for _, size, _ in entries)
+        removed = set()
+        for _, size, path in sorted(entries):
+            if n_bytes <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            n_bytes -= size
+            removed.add(os.path.basename(path))
+        if removed:
+            self._prune_names(removed)
+        return len(removed)
+
+    def _prune_names(self, digests: set[str]) -> None:
+        """
+        Remove the names pointing at removed files
+
+        :param digests: Digests of the removed files
+        :type digests: set[str]
+        :return: None type
+        :rtype: None
+        """
+        for entry in os.scandir(self._names):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as file:
+                    if file.read().strip() in digests:
+                        os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+
+    def clear(self) -> None:
+        """
+        Remove every stored file
+
+        :return: None type
+        :rtype: None
+        """
+        for directory in [self._names, self._objects]:
+            for entry in os.scandir(directory):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
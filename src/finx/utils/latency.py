@@ -0,0 +1,124 @@
+#! python
+"""
+author: dick mule
+purpose: observed request latency per api method, used to hedge slow requests
+"""
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+import threading
+
+
+class LatencyStats:
+    """
+    Thread safe rolling window of request latencies per api method, plus counters of
+    requests, hedged (duplicated) requests, hedges that answered first and timeouts
+    """
+
+    FIELDS = ("requests", "hedged", "hedge_wins", "timeouts")
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize empty statistics
+
+        :param window: Number of most recent latencies kept per api method
+        :type window: int
+        """
+        self.window: int = window
+        self._latencies: defaultdict[str, deque] = defaultdict(
+            lambda: deque(maxlen=self.window)
+        )
+        self._counts: defaultdict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        api_method: str,
+        latency: float,
+        hedged: bool = False,
+        hedge_won: bool = False,
+    ) -> None:
+        """
+        Record a completed request
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param latency: Seconds until the request was answered
+        :type latency: float
+        :param hedged: A duplicate request was sent
+        :type hedged: bool
+        :param hedge_won: The duplicate answered first
+        :type hedge_won: bool
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            self._latencies[api_method].append(latency)
+            counts = self._counts[api_method]
+            counts["requests"] += 1
+            counts["hedged"] += int(hedged)
+            counts["hedge_wins"] += int(hedge_won)
+
+    def record_timeout(self, api_method: str, hedged: bool = False) -> None:
+        """
+        Record a request that was abandoned at its deadline
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param hedged: A duplicate request was sent
+        :type hedged: bool
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            counts = self._counts[api_method]
+            counts["requests"] += 1
+            counts["hedged"] += int(hedged)
+            counts["timeouts"] += 1
+
+    def percentile(
+        self, api_method: str, q: float, min_samples: int = 1
+    ) -> Optional[float]:
+        """
+        Latency below which a fraction q of the recent requests completed
+
+        :param api_method: Name of the API method
+        :type api_method: str
+        :param q: Fraction between 0 and 1 (e.g. 0.99)
+        :type q: float
+        :param min_samples: Minimum number of observed requests
+        :type min_samples: int
+        :return: Latency in seconds or None if too few requests were observed
+        :rtype: Optional[float]
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(api_method, ()))
+        if not latencies or len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def snapshot(self, q: float = 0.99) -> dict[str, dict[str, float]]:
+        """
+        Copy the current statistics
+
+        :param q: Percentile reported as the hedge cutoff
+        :type q: float
+        :return: Statistics keyed by api method, then by name - the counters, the median and
+            q-th percentile latency (cutoff) and the extra load hedging added (hedged / requests)
+        :rtype: dict[str, dict[str, float]]
+        """
+        with self._lock:
+            api_methods = list(self._counts)
+        snapshot = {}
+        for api_method in api_methods:
+            with self._lock:
+                counts = {
+                    field: self._counts[api_method][field] for field in self.FIELDS
+                }
+            counts["median"] = self.percentile(api_method, 0.5)
+            counts["cutoff"] = self.percentile(api_method, q)
+            counts["extra_load"] = (
+                counts["hedged"] / counts["requests"] if counts["requests"] else 0.0
+            )
+            snapshot[api_method] = counts
+        return snapshot
@@ -0,0 +1,175 @@
+#! python
+"""
+author: dick mule
+purpose: canonicalize request parameters so equivalent calls share cache keys
+"""
+from datetime import date
+from functools import lru_cache
+from typing import Any, Optional
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_numeric_dtype,
+)
+
+_ID_FIELDS = frozenset(["security_id", "alt_security_id"])
+_BOOLEANS = {"true": True, "false": False}
+
+
+def _is_date_field(key: str) -> bool:
+    """
+    Check if a parameter name holds a date
+
+    :param key: Parameter name
+    :type key: str
+    :return: True if the parameter is a date
+    :rtype: bool
+    """
+    return key.endswith("_date")
+
+
+@lru_cache(maxsize=65536)
+def _normalize_date_string(value: str) -> str:
+    """
+    Convert any parseable date string (9/30/24, 20240930, ...) to YYYY-MM-DD
+
+    :param value: Date string
+    :type value: str
+    :return: ISO formatted date or the stripped input if it cannot be parsed
+    :rtype: str
+    """
+    value = value.strip()
+    if not any(c.isdigit() for c in value):
+        return value
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d")
+    except (ValueError, TypeError, OverflowError):
+        return value
+
+
+@lru_cache(maxsize=65536)
+def _normalize_string(value: str) -> Any:
+    """
+    Convert boolean and numeric strings to their python types
+
+    :param value: Parameter value
+    :type value: str
+    :return: bool, float or the stripped string
+    :rtype: Any
+    """
+    value = value.strip()
+    if (boolean := _BOOLEANS.get(value.lower())) is not None:
+        return boolean
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return None if math.isnan(number) else number
+
+
+def _normalize_id(value: Any) -> Optional[str]:
+    """
+    Canonicalize an identifier (security_id, ...) - stripped and upper case
+
+    :param value: Identifier
+    :type value: Any
+    :return: Canonical identifier or None if it is missing
+    :rtype: Optional[str]
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return str(value).strip().upper()
+
+
+def normalize_value(key: str, value: Any) -> Any:
+    """
+    Canonicalize a single request parameter
+
+    :param key: Parameter name
+    :type key: str
+    :param value: Parameter value
+    :type value: Any
+    :return: Canonical value
+    :rtype: Any
+    """
+    if value is None:
+        return None
+    if key in _ID_FIELDS:
+        return _normalize_id(value)
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return None if math.isnan(value) else value
+    if isinstance(value, date):
+        return None if pd.isna(value) else value.strftime("%Y-%m-%d")
+    if isinstance(value, str):
+        normalize = _normalize_date_string if _is_date_field(key) else _normalize_string
+        return normalize(value)
+    return value
+
+
+def normalize_params(params: dict) -> dict:
+    """
+    Canonicalize every parameter of a single request
+
+    :param params: Request parameters
+    :type params: dict
+    :return: Canonical parameters
+    :rtype: dict
+    """
+    return {key: normalize_value(key, value) for key, value in params.items()}
+
+
+def normalize_column(key: str, values: pd.Series) -> pd.Series:
+    """
+    Canonicalize a column of request parameters.
+    Produces exactly what normalize_value would for every row, but each distinct value is
+    only converted once.
+
+    :param key: Parameter name
+    :type key: str
+    :param values: Column of parameter values
+    :type values: pd.Series
+    :return: Canonical column (object dtype)
+    :rtype: pd.Series
+    """
+    missing = values.isna()
+    if is_datetime64_any_dtype(values):
+        normalized = values.dt.strftime("%Y-%m-%d").astype(object)
+    elif key not in _ID_FIELDS and is_bool_dtype(values):
+        normalized = values.astype(bool).astype(object)
+    elif key not in _ID_FIELDS and is_numeric_dtype(values):
+        normalized = values.astype(float).astype(object)
+    else:
+        present = values[~missing]
+        try:
+            uniques = pd.unique(present)
+        except TypeError:
+            return values.map(lambda x: normalize_value(key, x)).astype(object)
+        mapping = pd.Series(
+            [normalize_value(key, x) for x in uniques], index=uniques, dtype=object
+        )
+        normalized = present.map(mapping).reindex(values.index).astype(object)
+    return normalized.where(~missing, None)
+
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Canonicalize every column of a batch of requests
+
+    :param frame: DataFrame with one request per row
+    :type frame: pd.DataFrame
+    :return: Canonical copy of the frame
+    :rtype: pd.DataFrame
+    """
+    return pd.DataFrame(
+        {key: normalize_column(str(key), frame[key]) for key in frame.columns},
+        index=frame.index,
+    )
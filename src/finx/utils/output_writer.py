@@ -0,0 +1,310 @@
+#! python
+"""
+author: dick mule
+purpose: write batch results to output_file in chunks as they arrive
+"""
+from typing import Any, Iterable, Optional
+
+import gzip
+import logging
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is an optional dependency
+    pa = None
+    pq = None
+
+_SUFFIXES = [
+    (".csv.gz", "csv.gz"),
+    (".gz", "csv.gz"),
+    (".parquet", "parquet"),
+    (".pq", "parquet"),
+    (".feather", "feather"),
+    (".arrow", "feather"),
+]
+_ARROW_FORMATS = ("parquet", "feather")
+
+
+def infer_format(path: str) -> str:
+    """
+    Output format implied by a file extension (CSV for anything unrecognized)
+
+    :param path: Output file path
+    :type path: str
+    :return: csv, csv.gz, parquet or feather
+    :rtype: str
+    """
+    name = os.fspath(path).lower()
+    for suffix, file_format in _SUFFIXES:
+        if name.endswith(suffix):
+            return file_format
+    return "csv"
+
+
+# pylint: disable=too-many-instance-attributes
+class ResultWriter:
+    """
+    Append result rows (dicts or lists) to a file chunk by chunk, so memory use is bounded
+    by chunk_size rather than by the size of the batch. A chunk bringing new columns (or, in
+    Parquet/Feather files, types that do not fit the schema so far) widens the file: what was
+    written is rewritten once under the new header or schema. Nothing is created until the
+    first row is written.
+
+    .. code-block:: python
+
+        >>> with ResultWriter("greeks.parquet") as writer:
+        >>>     for result in results:
+        >>>         writer.write(result)
+    """
+
+    def __init__(
+        self, path: str, chunk_size: int = 10000, file_format: Optional[str] = None
+    ):
+        """
+        Prepare a writer
+
+        :param path: Output file path
+        :type path: str
+        :param chunk_size: Number of rows buffered before they are written
+        :type chunk_size: int
+        :param file_format: csv, csv.gz, parquet or feather (inferred from path if None)
+        :type file_format: Optional[str]
+        """
+        self.path: str = path
+        self.chunk_size: int = max(1, chunk_size)
+        self.file_format: str = file_format or infer_format(path)
+        if self.file_format in _ARROW_FORMATS and pa is None:
+            raise ImportError(f"pyarrow is required to write {self.file_format} files")
+        self.columns: Optional[list] = None
+        self.n_rows: int = 0
+        self._rows: list[Any] = []
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def __enter__(self) -> "ResultWriter":
+        """
+        Enter the writer context
+
+        :return: Writer
+        :rtype: ResultWriter
+        """
+        return self
+
+    def __exit__(self, *args) -> None:
+        """
+        Write the remaining rows and close the file
+
+        :param args: Exception info
+        :type args: Any
+        :return: None type
+        :rtype: None
+        """
+        self.close()
+
+    def write(self, result: Any) -> None:
+        """
+        Buffer one result row, writing the buffer once it holds chunk_size rows
+
+        :param result: Result row (anything but a dict or list is skipped)
+        :type result: Any
+        :return: None type
+        :rtype: None
+        """
+        if type(result) not in [list, dict]:
+            return
+        self._rows.append(result)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, results: Iterable[Any]) -> None:
+        """
+        Buffer result rows, writing a chunk every chunk_size rows
+
+        :param results: Result rows
+        :type results: Iterable[Any]
+        :return: None type
+        :rtype: None
+        """
+        for result in results:
+            self.write(result)
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows
+
+        :return: None type
+        :rtype: None
+        """
+        if not self._rows:
+            return
+        frame = pd.DataFrame(self._rows)
+        self._rows = []
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        elif new_columns := [c for c in frame.columns if c not in self.columns]:
+            logging.debug("Adding columns %s to %s", new_columns, self.path)
+            self.columns += new_columns
+            if self._file is not None:
+                self._widen_csv()
+        frame = frame.reindex(columns=self.columns)
+        if self.file_format in _ARROW_FORMATS:
+            self._write_arrow(frame)
+        else:
+            self._write_csv(frame)
+        self.n_rows += len(frame)
+
+    def _open_csv(self, path: str, mode: str) -> Any:
+        """
+        Open a (gzip) CSV file for writing
+
+        :param path: File path
+        :type path: str
+        :param mode: w to truncate, a to append
+        :type mode: str
+        :return: Text file handle
+        :rtype: Any
+        """
+        if self.file_format == "csv.gz":
+            return gzip.open(path, f"{mode}t", newline="", encoding="utf-8")
+        # The handle is kept open across chunks and closed by close()
+        return open(  # pylint: disable=consider-using-with
+            path, mode, newline="", encoding="utf-8"
+        )
+
+    def _write_csv(self, frame: pd.DataFrame) -> None:
+        """
+        Append a chunk to a (gzip) CSV file and flush it to disk
+
+        :param frame: Chunk of rows
+        :type frame: pd.DataFrame
+        :return: None type
+        :rtype: None
+        """
+        header = self._file is None
+        if header:
+            self._file = self._open_csv(self.path, "w")
+        frame.to_csv(self._file, header=header, index=False)
+        self._file.flush()
+
+    def _widen_csv(self) -> None:
+        """
+        Rewrite the CSV written so far under the widened header (the new columns are left
+        blank in the rows already written), then keep appending to it
+
+        :return: None type
+        :rtype: None
+        """
+        self._file.close()
+        tmp_path = os.path.join(
+            os.path.dirname(os.path.abspath(self.path)),
+            f".tmp-{os.path.basename(self.path)}",
+        )
+        written = pd.read_csv(
+            self.path,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=self.chunk_size,
+            compression="gzip" if self.file_format == "csv.gz" else None,
+        )
+        with written, self._open_csv(tmp_path, "w") as file:
+            for i, chunk in enumerate(written):
+                chunk.reindex(columns=self.columns, fill_value="").to_csv(
+                    file, header=i == 0, index=False
+                )
+        os.replace(tmp_path, self.path)
+        self._file = self._open_csv(self.path, "a")
+
+    def _open_arrow(self, path: str) -> Any:
+        """
+        Open a Parquet or Feather writer for the current schema
+
+        :param path: File path
+        :type path: str
+        :return: Writer
+        :rtype: Any
+        """
+        if self.file_format == "parquet":
+            return pq.ParquetWriter(path, self._schema)
+        return pa.ipc.new_file(path, self._schema)
+
+    def _write_arrow(self, frame: pd.DataFrame) -> None:
+        """
+        Append a chunk to a Parquet file (one row group) or Feather file (one record batch)
+
+        :param frame: Chunk of rows
+        :type frame: pd.DataFrame
+        :return: None type
+        :rtype: None
+        """
+        frame.columns = frame.columns.map(str)
+        if self._writer is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            self._schema = table.schema
+            self._writer = self._open_arrow(self.path)
+            self._writer.write_table(table)
+            return
+        if (table := self._fit_schema(frame)) is None:
+            self._widen_arrow(pa.Table.from_pandas(frame, preserve_index=False))
+            return
+        self._writer.write_table(table)
+
+    def _fit_schema(self, frame: pd.DataFrame) -> Optional["pa.Table"]:
+        """
+        Convert a chunk to the schema written so far
+
+        :param frame: Chunk of rows
+        :type frame: pd.DataFrame
+        :return: Table or None if the chunk has new columns or types that do not convert
+        :rtype: Optional[pa.Table]
+        """
+        if list(frame.columns) != self._schema.names:
+            return None
+        try:
+            return pa.Table.from_pandas(
+                frame, schema=self._schema, preserve_index=False
+            )
+        except (ValueError, TypeError, NotImplementedError):
+            # ArrowInvalid, ArrowTypeError and ArrowNotImplementedError derive from these
+            return None
+
+    def _widen_arrow(self, table: "pa.Table") -> None:
+        """
+        Rewrite the Parquet or Feather file written so far together with a chunk that does
+        not fit its schema, under the schema promoted to hold both
+
+        :param table: Chunk of rows
+        :type table: pa.Table
+        :return: None type
+        :rtype: None
+        """
+        self._writer.close()
+        if self.file_format == "parquet":
+            written = pq.read_table(self.path)
+        else:
+            with pa.OSFile(self.path, "rb") as file:
+                written = pa.ipc.open_file(file).read_all()
+        combined = pa.concat_tables(
+            [written, table], promote_options="permissive"
+        ).replace_schema_metadata(None)
+        self._schema = combined.schema
+        logging.debug("Rewriting %s with schema %s", self.path, self._schema)
+        self._writer = self._open_arrow(self.path)
+        self._writer.write_table(combined)
+
+    def close(self) -> None:
+        """
+        Write the remaining rows and close the file
+
+        :return: None type
+        :rtype: None
+        """
+        self.flush()
+        for handle in [self._file, self._writer]:
+            if handle is not None:
+                handle.close()
+        self._file = self._writer = None
@@ -3,9 +3,14 @@
 author: dick mule
 purpose: utils for parsing payloads - sizing/etc.
 """
+from io import BytesIO
 from sys import getsizeof
 from typing import Any
 
+import pandas as pd
+
+CSV_DTYPES = {"security_id": str}
+
 
 def get_size(obj: Any, seen: set = None) -> int:
     """
@@ -33,3 +38,55 @@ def get_size(obj: Any, seen: set = None) -> int:
     elif hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes, bytearray)):
         size += sum(get_size(i, seen) for i in obj)
     return size
+
+
+def _fill_security_ids(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Read blank security ids as empty strings (as the str converter did) rather than NaN
+
+    :param frame: Parsed frame
+    :type frame: pd.DataFrame
+    :return: Frame with blank security ids filled
+    :rtype: pd.DataFrame
+    """
+    if "security_id" in frame:
+        frame["security_id"] = frame["security_id"].fillna("")
+    return frame
+
+
+def parse_csv(content: bytes, engine: str = "c") -> pd.DataFrame:
+    """
+    Parse a CSV payload straight from its bytes (no intermediate decoded copy) with the
+    C parser, or pyarrow if requested (its type inference differs from the C parser).
+    Security ids are always read as strings so that leading zeros survive, and blank ids
+    are read as empty strings.
+
+    :param content: CSV bytes
+    :type content: bytes
+    :param engine: pandas read_csv engine (c or pyarrow)
+    :type engine: str
+    :return: Parsed frame
+    :rtype: pd.DataFrame
+    """
+    return _fill_security_ids(
+        pd.read_csv(BytesIO(content), engine=engine, dtype=CSV_DTYPES)
+    )
+
+
+def read_csv_file(path: str, engine: str = "c") -> pd.DataFrame:
+    """
+    Parse a local CSV file, memory mapped with the C parser rather than read into memory
+    first, or with pyarrow if requested
+
+    :param path: CSV file path
+    :type path: str
+    :param engine: pandas read_csv engine (c or pyarrow)
+    :type engine: str
+    :return: Parsed frame
+    :rtype: pd.DataFrame
+    """
+    # pyarrow rejects the memory_map option
+    options = {"memory_map": True} if engine == "c" else {}
+    return _fill_security_ids(
+        pd.read_csv(path, engine=engine, dtype=CSV_DTYPES, **options)
+    )
@@ -0,0 +1,310 @@
+#! python
+"""
+author: dick mule
+purpose: SQLite backed result store so cached API results survive process restarts
+"""
+from typing import Any, Iterable, Optional
+
+import logging
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+
+from finx.utils.cache_backends import CacheEntry, key_patterns
+
+_CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    "cache_key TEXT NOT NULL, "
+    "params_key TEXT NOT NULL, "
+    "value BLOB NOT NULL, "
+    "created REAL NOT NULL, "
+    "PRIMARY KEY (cache_key, params_key)"
+    ") WITHOUT ROWID"
+)
+_SELECT = "SELECT value, created FROM results WHERE cache_key = ? AND params_key = ?"
+_UPSERT = "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)"
+_DELETE_MATCHING = "DELETE FROM results WHERE cache_key GLOB ?"
+_SELECT_MANY = (
+    "SELECT cache_key, params_key, value, created FROM results "
+    "WHERE (cache_key, params_key) IN (VALUES {})"
+)
+_MAX_PAIRS_PER_QUERY = 499
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """
+    Open a connection configured for one writer and many concurrent readers
+
+    :param path: Path to the SQLite database file
+    :type path: str
+    :return: SQLite connection
+    :rtype: sqlite3.Connection
+    """
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(_CREATE_TABLE)
+    connection.commit()
+    return connection
+
+
+class PersistentResultStore:
+    """
+    On-disk store of API results keyed by (cache_key, params_key) implementing the
+    CacheBackend protocol. Several processes on one host may share the same file.
+
+    Reads are synchronous; writes are queued and committed in batches by a background thread
+    so that the socket and event loop threads never block on disk.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        """
+        Open (or create) the store
+
+        :param path: Path to the SQLite database file
+        :type path: str
+        :param batch_size: Maximum number of writes committed per transaction
+        :type batch_size: int
+        """
+        self.path: str = os.path.abspath(os.path.expanduser(path))
+        self.batch_size: int = batch_size
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._reader: sqlite3.Connection = _connect(self.path)
+        self._read_lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_behind,
+            args=(self._writes, self.path, batch_size),
+            daemon=True,
+        )
+        self._writer.start()
+        self._finalizer = weakref.finalize(
+            self, self._shutdown, self._writes, self._writer, self._reader
+        )
+
+    @staticmethod
+    def _write_behind(writes: queue.Queue, path: str, batch_size: int) -> None:
+        """
+        Drain queued writes into the database until a shutdown sentinel arrives
+
+        :param writes: Queue of pending writes
+        :type writes: queue.Queue
+        :param path: Path to the SQLite database file
+        :type path: str
+        :param batch_size: Maximum number of writes committed per transaction
+        :type batch_size: int
+        :return: None type
+        :rtype: None
+        """
+        connection = _connect(path)
+        running = True
+        while running:
+            rows = [writes.get()]
+            while len(rows) < batch_size:
+                try:
+                    rows.append(writes.get_nowait())
+                except queue.Empty:
+                    break
+            running = rows[-1] is not None
+            records = [row for row in rows if row is not None]
+            try:
+                if records:
+                    connection.executemany(_UPSERT, records)
+                    connection.commit()
+            except sqlite3.Error as e:
+                logging.error(
+                    "Failed to persist %i cached results: %s", len(records), e
+                )
+            finally:
+                for _ in rows:
+                    writes.task_done()
+        connection.close()
+
+    @staticmethod
+    def _shutdown(
+        writes: queue.Queue, writer: threading.Thread, reader: sqlite3.Connection
+    ) -> None:
+        """
+        Flush pending writes and release both connections
+
+        :param writes: Queue of pending writes
+        :type writes: queue.Queue
+        :param writer: Background writer thread
+        :type writer: threading.Thread
+        :param reader: Reader connection
+        :type reader: sqlite3.Connection
+        :return: None type
+        :rtype: None
+        """
+        if writer.is_alive():
+            writes.put(None)
+            writer.join()
+        reader.close()
+
+    @staticmethod
+    def _decode(cache_key: str, blob: bytes, created: float) -> Optional[CacheEntry]:
+        """
+        Unpickle a stored value
+
+        :param cache_key: Cache key (for logging)
+        :type cache_key: str
+        :param blob: Pickled value
+        :type blob: bytes
+        :param created: Time the value was written
+        :type created: float
+        :return: Stored entry or None if it cannot be read
+        :rtype: Optional[CacheEntry]
+        """
+        try:
+            return CacheEntry(pickle.loads(blob), created)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logging.warning("Discarding unreadable cached result %s: %s", cache_key, e)
+            return None
+
+    def get(self, cache_key: str, params_key: str) -> Optional[CacheEntry]:
+        """
+        Read a persisted value along with the time it was written
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Persisted entry or None if missing
+        :rtype: Optional[CacheEntry]
+        """
+        with self._read_lock:
+            row = self._reader.execute(_SELECT, (cache_key, params_key)).fetchone()
+        return None if row is None else self._decode(cache_key, *row)
+
+    def get_many(self, keys: list[tuple[str, str]]) -> list[Optional[CacheEntry]]:
+        """
+        Read many persisted values
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :return: Persisted entries (None if missing) in key order
+        :rtype: list[Optional[CacheEntry]]
+        """
+        found: dict[tuple[str, str], tuple[bytes, float]] = {}
+        with self._read_lock:
+            for i in range(0, len(keys), _MAX_PAIRS_PER_QUERY):
+                chunk = keys[i : i + _MAX_PAIRS_PER_QUERY]
+                query = _SELECT_MANY.format(",".join(["(?, ?)"] * len(chunk)))
+                arguments = [part for key in chunk for part in key]
+                for cache_key, params_key, blob, created in self._reader.execute(
+                    query, arguments
+                ):
+                    found[(cache_key, params_key)] = (blob, created)
+        return [
+            self._decode(key[0], *found[key]) if key in found else None for key in keys
+        ]
+
+    def set(self, cache_key: str, params_key: str, value: Any) -> None:
+        """
+        Queue a value to be written behind
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param value: Value to persist
+        :type value: Any
+        :return: None type
+        :rtype: None
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._writes.put((cache_key, params_key, blob, time.time()))
+
+    def set_many(self, items: Iterable[tuple[str, str, Any]]) -> None:
+        """
+        Queue many values to be written behind
+
+        :param items: (cache_key, params_key, value) items
+        :type items: Iterable[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        for cache_key, params_key, value in items:
+            self.set(cache_key, params_key, value)
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """
+        Delete one variant, or every variant of a cache key if params_key is None
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        self.flush()
+        query, arguments = "DELETE FROM results WHERE cache_key = ?", [cache_key]
+        if params_key is not None:
+            query, arguments = f"{query} AND params_key = ?", [cache_key, params_key]
+        with self._read_lock:
+            deleted = self._reader.execute(query, arguments).rowcount
+            self._reader.commit()
+        return deleted
+
+    def delete_matching(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+    ) -> int:
+        """
+        Delete every persisted value of the given security, date and/or method
+
+        :param security_id: Canonical security id (None matches any)
+        :type security_id: Optional[str]
+        :param as_of_date: Canonical as of date (None matches any)
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method (None matches any)
+        :type api_method: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        self.flush()
+        patterns = key_patterns(security_id, as_of_date, api_method)
+        with self._read_lock:
+            deleted = sum(
+                self._reader.execute(_DELETE_MATCHING, (pattern,)).rowcount
+                for pattern in patterns
+            )
+            self._reader.commit()
+        return deleted
+
+    def flush(self) -> None:
+        """
+        Block until every queued write has been committed
+
+        :return: None type
+        :rtype: None
+        """
+        self._writes.join()
+
+    def clear(self) -> None:
+        """
+        Delete every persisted value
+
+        :return: None type
+        :rtype: None
+        """
+        self.flush()
+        with self._read_lock:
+            self._reader.execute("DELETE FROM results")
+            self._reader.commit()
+
+    def close(self) -> None:
+        """
+        Flush pending writes and close the store
+
+        :return: None type
+        :rtype: None
+        """
+        self._finalizer()
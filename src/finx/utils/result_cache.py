@@ -0,0 +1,926 @@
+#! python
+"""
+author: dick mule
+purpose: bounded LRU store backing the ApiContextManager results cache
+"""
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+import gc
+import threading
+import time
+
+import pandas as pd
+
+from finx.utils.payload_parsing import get_size
+from finx.utils.cache_backends import CacheBackend, CacheEntry
+from finx.utils.compression import CompressedValue
+from finx.utils.snapshot import SnapshotEntry
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Approximate the number of bytes held by a cached value
+
+    :param value: Any cached value
+    :type value: Any
+    :return: Approximate size in bytes
+    :rtype: int
+    """
+    if isinstance(value, CompressedValue):
+        return value.n_bytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    return get_size(value)
+
+
+class NegativeResult(NamedTuple):
+    """A cached failure (uncovered or invalid request) that expires on its own schedule"""
+
+    error: Any
+    expires_at: float
+
+    @property
+    def expired(self) -> bool:
+        """
+        Check if the failure should be retried
+
+        :return: True if the entry has expired
+        :rtype: bool
+        """
+        return time.time() >= self.expires_at
+
+
+_INDEXED_FIELDS = ("security_id", "as_of_date", "api_method")
+
+
+def split_cache_key(cache_key: str) -> tuple[Optional[str], Optional[str], str]:
+    """
+    Split a cache key (security_id:as_of_date:api_method or api_method) into its parts
+
+    :param cache_key: Cache key
+    :type cache_key: str
+    :return: Tuple of security_id, as_of_date and api_method
+    :rtype: tuple[Optional[str], Optional[str], str]
+    """
+    parts = cache_key.rsplit(":", 2)
+    if len(parts) < 3:
+        return None, None, cache_key
+    return parts[0], parts[1], parts[2]
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector while creating millions of containers in bulk, which
+    would otherwise trigger repeated full collections
+
+    :return: Context manager
+    :rtype: Iterator[None]
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class RefreshStats:
+    """Thread safe counters describing background (stale-while-revalidate) refreshes"""
+
+    def __init__(self):
+        """
+        Initialize empty counters
+        """
+        self.refreshes: int = 0
+        self.failures: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, failed: bool = False) -> None:
+        """
+        Record a completed refresh
+
+        :param latency: Seconds the refresh took
+        :type latency: float
+        :param failed: The refresh raised or returned an error
+        :type failed: bool
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            self.refreshes += 1
+            self.failures += int(failed)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def mean_latency(self) -> float:
+        """
+        Mean refresh latency in seconds
+
+        :return: Mean latency
+        :rtype: float
+        """
+        return self.total_latency / self.refreshes if self.refreshes else 0.0
+
+    def snapshot(self) -> dict[str, float]:
+        """
+        Copy the current counters
+
+        :return: Counters keyed by name
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            return {
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "mean_latency": self.mean_latency,
+                "max_latency": self.max_latency,
+            }
+
+
+class CacheStats:
+    """
+    Per api_method counters of cache lookups (hits and misses), inserts and evictions.
+    Updated by the owning ResultCache while it holds its lock.
+    """
+
+    FIELDS = ("hits", "misses", "inserts", "evictions")
+
+    def __init__(self):
+        """
+        Initialize empty counters
+        """
+        self._counts: defaultdict[str, Counter] = defaultdict(Counter)
+
+    def record(self, field: str, cache_key: str, n: int = 1) -> None:
+        """
+        Increment a counter of the api method of a cache key
+
+        :param field: One of hits, misses, inserts or evictions
+        :type field: str
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param n: Increment
+        :type n: int
+        :return: None type
+        :rtype: None
+        """
+        self._counts[split_cache_key(cache_key)[2]][field] += n
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        """
+        Copy the current counters
+
+        :return: Counters keyed by api method, then by name
+        :rtype: dict[str, dict[str, int]]
+        """
+        return {
+            api_method: {field: counts[field] for field in self.FIELDS}
+            for api_method, counts in self._counts.items()
+        }
+
+    def clear(self) -> None:
+        """
+        Reset every counter
+
+        :return: None type
+        :rtype: None
+        """
+        self._counts.clear()
+
+
+# pylint: disable=too-many-instance-attributes
+class ResultCache:
+    """
+    Thread safe LRU store of API results keyed by (cache_key, params_key).
+
+    Results are grouped under their cache key (security_id:as_of_date:api_method) so every
+    parameter variant (shock, volatility, price, ...) of one security and method lives side by
+    side. Recency is tracked per variant and the least recently used variants are evicted once
+    either the entry or byte limit is exceeded. Pending placeholders (None values) are not
+    counted against either limit and never evicted, since callers are waiting on them.
+    Failures are held as NegativeResult entries that are never persisted and are dropped once
+    they expire. Results reserved with a ttl (e.g. results for the current as_of_date) expire
+    ttl seconds after they are filled; all others are pinned until evicted. Expired results
+    read as misses but are kept until evicted (or purged) so that they can still be served
+    stale while a refresh is in flight.
+    If a backend (SQLite, Redis, ...) is attached, values are written behind to it and read
+    through on a miss, so that processes sharing the backend share results.
+    Values of at least compress_threshold bytes are held compressed (DataFrames column by
+    column) and only decoded when read.
+    Groups are indexed by security_id, as_of_date and api_method (parsed from the cache key) so
+    that invalidate only touches the groups it removes.
+    Lookups, inserts and evictions are counted per api_method (see ResultCache.stats).
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 100000,
+        max_bytes: Optional[int] = None,
+        store: Optional[CacheBackend] = None,
+        compress_threshold: Optional[int] = None,
+    ):
+        """
+        Initialize the results cache
+
+        :param max_entries: Maximum number of cached parameter variants (None for unbounded)
+        :type max_entries: Optional[int]
+        :param max_bytes: Maximum approximate size of cached values in bytes (None for unbounded)
+        :type max_bytes: Optional[int]
+        :param store: Optional shared backend behind the in-memory cache
+        :type store: Optional[CacheBackend]
+        :param compress_threshold: Compress values of at least this many bytes (None to never
+            compress)
+        :type compress_threshold: Optional[int]
+        """
+        self.max_entries: Optional[int] = max_entries
+        self.max_bytes: Optional[int] = max_bytes
+        self.store: Optional[CacheBackend] = store
+        self.compress_threshold: Optional[int] = compress_threshold
+        self._groups: dict[str, dict[str, Any]] = {}
+        self._indexes: dict[str, dict[str, set[str]]] = {
+            field: {} for field in _INDEXED_FIELDS
+        }
+        self._lru: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._pending: set[tuple[str, str]] = set()
+        self._ttls: dict[tuple[str, str], float] = {}
+        self._expires: dict[tuple[str, str], float] = {}
+        self._n_bytes: int = 0
+        self._stats = CacheStats()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        """
+        Number of cached parameter variants (including pending placeholders)
+
+        :return: Number of entries
+        :rtype: int
+        """
+        return len(self._lru) + len(self._pending)
+
+    def __contains__(self, cache_key: str) -> bool:
+        """
+        Check if a cache key group exists
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :return: True if the group exists
+        :rtype: bool
+        """
+        return cache_key in self._groups
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterate over cache key groups
+
+        :return: Iterator of cache keys
+        :rtype: Iterator[str]
+        """
+        return iter(list(self._groups))
+
+    @property
+    def n_bytes(self) -> int:
+        """
+        Approximate number of bytes held by cached values
+
+        :return: Size in bytes
+        :rtype: int
+        """
+        return self._n_bytes
+
+    def _value_size(self, value: Any) -> int:
+        """
+        Size a value only if a byte limit is enforced
+
+        :param value: Cached value
+        :type value: Any
+        :return: Approximate size in bytes
+        :rtype: int
+        """
+        if value is None or self.max_bytes is None:
+            return 0
+        return approximate_size(value)
+
+    def _discard(self, cache_key: str, params_key: str) -> bool:
+        """
+        Remove a single variant and release its accounting
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: True if the variant existed
+        :rtype: bool
+        """
+        key = (cache_key, params_key)
+        if key in self._pending:
+            self._pending.discard(key)
+            size = 0
+        elif (size := self._lru.pop(key, None)) is None:
+            return False
+        self._ttls.pop(key, None)
+        self._expires.pop(key, None)
+        self._n_bytes -= size
+        group = self._groups[cache_key]
+        del group[params_key]
+        if not group:
+            del self._groups[cache_key]
+            for field, value in zip(_INDEXED_FIELDS, split_cache_key(cache_key)):
+                keys = self._indexes[field][value]
+                keys.discard(cache_key)
+                if not keys:
+                    del self._indexes[field][value]
+        return True
+
+    def _group(self, cache_key: str) -> dict[str, Any]:
+        """
+        Get the variants of a cache key, creating and indexing the group if it is new
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :return: Mapping of params_key to cached value
+        :rtype: dict[str, Any]
+        """
+        if (group := self._groups.get(cache_key)) is None:
+            group = self._groups[cache_key] = {}
+            for field, value in zip(_INDEXED_FIELDS, split_cache_key(cache_key)):
+                self._indexes[field].setdefault(value, set()).add(cache_key)
+        return group
+
+    def _evict(self) -> None:
+        """
+        Evict least recently used results until the store is within its limits. Pending
+        placeholders are not counted and never evicted - a caller is waiting on them.
+
+        :return: None type
+        :rtype: None
+        """
+        while len(self._lru) > 1 and (
+            (self.max_entries is not None and len(self._lru) > self.max_entries)
+            or (self.max_bytes is not None and self._n_bytes > self.max_bytes)
+        ):
+            cache_key, params_key = next(iter(self._lru))
+            self._stats.record("evictions", cache_key)
+            self._discard(cache_key, params_key)
+
+    def get(
+        self, cache_key: str, params_key: str, default: Any = None, stale: bool = False
+    ) -> Any:
+        """
+        Get a cached value and mark it as recently used
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param default: Value returned if nothing is cached
+        :type default: Any
+        :param stale: Return the value even if its ttl has expired
+        :type stale: bool
+        :return: Cached value (the error payload for a cached failure)
+        :rtype: Any
+        """
+        with self._lock:
+            value = self._groups.get(cache_key, {}).get(params_key)
+            if value is None:
+                return default
+            if isinstance(value, NegativeResult):
+                if value.expired:
+                    self._discard(cache_key, params_key)
+                    return default
+                value = value.error
+            elif not stale and self.is_expired(cache_key, params_key):
+                return default
+            self._lru.move_to_end((cache_key, params_key))
+        if isinstance(value, CompressedValue):
+            return value.decode()
+        return value
+
+    def is_expired(self, cache_key: str, params_key: str) -> bool:
+        """
+        Check if a filled variant has outlived its ttl
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: True if the variant has expired
+        :rtype: bool
+        """
+        expires_at = self._expires.get((cache_key, params_key))
+        return expires_at is not None and time.time() >= expires_at
+
+    def purge_expired(self) -> int:
+        """
+        Remove every expired variant (expired variants are otherwise kept until evicted)
+
+        :return: Number of variants removed
+        :rtype: int
+        """
+        now = time.time()
+        with self._lock:
+            expired = [key for key, at in self._expires.items() if now >= at]
+            return sum(self._discard(*key) for key in expired)
+
+    def is_negative(self, cache_key: str, params_key: str) -> bool:
+        """
+        Check if a variant holds an unexpired cached failure
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: True if the variant is a cached failure
+        :rtype: bool
+        """
+        value = self._groups.get(cache_key, {}).get(params_key)
+        return isinstance(value, NegativeResult) and not value.expired
+
+    def variants(self, cache_key: str) -> dict[str, Any]:
+        """
+        Get every cached parameter variant of a cache key
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :return: Mapping of params_key to cached value (None while pending)
+        :rtype: dict[str, Any]
+        """
+        with self._lock:
+            group = dict(self._groups.get(cache_key, {}))
+        return {
+            key: value.decode() if isinstance(value, CompressedValue) else value
+            for key, value in group.items()
+        }
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def fetch(
+        self,
+        cache_key: str,
+        params_key: str,
+        ttl: Optional[float] = None,
+        stale: bool = False,
+    ) -> Any:
+        """
+        Get a cached value, reading through to the backend on a miss
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param ttl: Seconds a persisted value stays fresh after it was written (None to pin)
+        :type ttl: Optional[float]
+        :param stale: Return the value even if its ttl has expired
+        :type stale: bool
+        :return: Cached value or None if missing
+        :rtype: Any
+        """
+        value = self.get(cache_key, params_key, stale=stale)
+        if value is None and self.store is not None:
+            entry = self.store.get(cache_key, params_key)
+            value = self._load(cache_key, params_key, entry, ttl, stale)
+        with self._lock:
+            self._stats.record("misses" if value is None else "hits", cache_key)
+        return value
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def _load(
+        self,
+        cache_key: str,
+        params_key: str,
+        entry: Optional[CacheEntry],
+        ttl: Optional[float],
+        stale: bool,
+    ) -> Any:
+        """
+        Copy an entry read from the backend into memory unless it has expired
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param entry: Entry read from the backend
+        :type entry: Optional[CacheEntry]
+        :param ttl: Seconds the value stays fresh after it was written (None to pin)
+        :type ttl: Optional[float]
+        :param stale: Return the value even if its ttl has expired
+        :type stale: bool
+        :return: Value or None if missing or expired
+        :rtype: Any
+        """
+        if entry is None:
+            return None
+        expires_at = None if ttl is None else entry.created + ttl
+        if not stale and expires_at is not None and time.time() >= expires_at:
+            return None
+        with self._lock:
+            self.set(cache_key, params_key, entry.value, persist=False, ttl=ttl)
+            if expires_at is not None:
+                self._expires[(cache_key, params_key)] = expires_at
+        return entry.value
+
+    def fetch_many(
+        self,
+        keys: list[tuple[str, str]],
+        ttls: list[Optional[float]],
+        stale: bool = False,
+    ) -> list[Any]:
+        """
+        Get many cached values, reading every miss through to the backend in one round trip
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :param ttls: Seconds each persisted value stays fresh after it was written
+        :type ttls: list[Optional[float]]
+        :param stale: Return values even if their ttl has expired
+        :type stale: bool
+        :return: Cached values (None if missing) in key order
+        :rtype: list[Any]
+        """
+        with self._lock:
+            values = [self.get(*key, stale=stale) for key in keys]
+        misses = [i for i, value in enumerate(values) if value is None]
+        if misses and self.store is not None:
+            entries = self.store.get_many([keys[i] for i in misses])
+            for i, entry in zip(misses, entries):
+                values[i] = self._load(*keys[i], entry, ttls[i], stale)
+        with self._lock:
+            for (cache_key, _), value in zip(keys, values):
+                self._stats.record("misses" if value is None else "hits", cache_key)
+        return values
+
+    def reserve(
+        self, cache_key: str, params_key: str, ttl: Optional[float] = None
+    ) -> None:
+        """
+        Insert a pending placeholder for a variant unless it is already present
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param ttl: Seconds the value stays fresh once it is filled (None to pin)
+        :type ttl: Optional[float]
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            group = self._group(cache_key)
+            if params_key in group:
+                return
+            group[params_key] = None
+            self._pending.add((cache_key, params_key))
+            if ttl is not None:
+                self._ttls[(cache_key, params_key)] = ttl
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def set(
+        self,
+        cache_key: str,
+        params_key: str,
+        value: Any,
+        persist: bool = True,
+        ttl: Optional[float] = None,
+        expires_in: Optional[float] = None,
+    ) -> None:
+        """
+        Insert a value, evicting least recently used variants if a limit is exceeded.
+        The value expires after ttl seconds, or after the ttl given when it was reserved.
+        expires_in overrides the expiry of this value only - the ttl of later values is kept.
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param value: Value to cache
+        :type value: Any
+        :param persist: Write the value behind to the backend (if any)
+        :type persist: bool
+        :param ttl: Seconds the value stays fresh (None to use the reserved ttl)
+        :type ttl: Optional[float]
+        :param expires_in: Seconds this value stays fresh (None to use the ttl)
+        :type expires_in: Optional[float]
+        :return: None type
+        :rtype: None
+        """
+        if (
+            persist
+            and value is not None
+            and self.store is not None
+            and not isinstance(value, NegativeResult)
+        ):
+            self.store.set(cache_key, params_key, value)
+        if self.compress_threshold is not None and not (
+            value is None or isinstance(value, NegativeResult)
+        ):
+            value = CompressedValue.encode(value, self.compress_threshold)
+        size = self._value_size(value)
+        key = (cache_key, params_key)
+        with self._lock:
+            self._group(cache_key)[params_key] = value
+            self._n_bytes -= self._lru.pop(key, 0)
+            if value is None:
+                self._pending.add(key)
+            else:
+                self._pending.discard(key)
+                self._n_bytes += size
+                self._lru[key] = size
+            if ttl is not None:
+                self._ttls[key] = ttl
+            if value is not None and expires_in is not None:
+                self._expires[key] = time.time() + expires_in
+            elif value is not None and (ttl := self._ttls.get(key)) is not None:
+                self._expires[key] = time.time() + ttl
+            else:
+                self._expires.pop(key, None)
+            if value is not None:
+                self._stats.record("inserts", cache_key)
+            self._evict()
+
+    def set_many(self, items: list[tuple[str, str, Any]], persist: bool = True) -> None:
+        """
+        Insert many values, writing them behind to the backend in one round trip
+
+        :param items: (cache_key, params_key, value) items
+        :type items: list[tuple[str, str, Any]]
+        :param persist: Write the values behind to the backend (if any)
+        :type persist: bool
+        :return: None type
+        :rtype: None
+        """
+        if persist and self.store is not None:
+            persisted = [
+                item
+                for item in items
+                if item[2] is not None and not isinstance(item[2], NegativeResult)
+            ]
+            if persisted:
+                self.store.set_many(persisted)
+        with self._lock:
+            for cache_key, params_key, value in items:
+                self.set(cache_key, params_key, value, persist=False)
+
+    def set_error(
+        self, cache_key: str, params_key: str, error: Any, ttl: float
+    ) -> None:
+        """
+        Record a failed request so that it is not retried until ttl seconds have passed
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param error: Error payload returned by the API
+        :type error: Any
+        :param ttl: Seconds until the failure expires
+        :type ttl: float
+        :return: None type
+        :rtype: None
+        """
+        self.set(cache_key, params_key, NegativeResult(error, time.time() + ttl))
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """
+        Remove one variant, or every variant of a cache key if params_key is None
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: Optional[str]
+        :return: Number of variants removed
+        :rtype: int
+        """
+        with self._lock:
+            if params_key is not None:
+                return int(self._discard(cache_key, params_key))
+            params_keys = list(self._groups.get(cache_key, {}))
+            return sum(self._discard(cache_key, key) for key in params_keys)
+
+    def invalidate(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+        persistent: bool = True,
+    ) -> int:
+        """
+        Remove every variant matching all of the given fields (None matches anything)
+
+        :param security_id: Canonical security id
+        :type security_id: Optional[str]
+        :param as_of_date: Canonical as of date
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method
+        :type api_method: Optional[str]
+        :param persistent: Also delete matching values from the backend
+        :type persistent: bool
+        :return: Number of in-memory variants removed
+        :rtype: int
+        """
+        criteria = {
+            field: value
+            for field, value in zip(
+                _INDEXED_FIELDS, (security_id, as_of_date, api_method)
+            )
+            if value is not None
+        }
+        if not criteria:
+            raise ValueError("Specify security_id, as_of_date and/or api_method")
+        if persistent and self.store is not None:
+            self.store.delete_matching(security_id, as_of_date, api_method)
+        with self._lock:
+            matches = sorted(
+                (
+                    self._indexes[field].get(value, set())
+                    for field, value in criteria.items()
+                ),
+                key=len,
+            )
+            cache_keys = matches[0].intersection(*matches[1:])
+            return sum(self.delete(cache_key) for cache_key in cache_keys)
+
+    def _select(
+        self,
+        api_methods: Optional[Iterable[str]] = None,
+        as_of_dates: Optional[Iterable[str]] = None,
+    ) -> frozenset[str]:
+        """
+        Find the cache keys of any of the given api methods and as of dates (caller holds the
+        lock)
+
+        :param api_methods: Api methods to match (None for all)
+        :type api_methods: Optional[Iterable[str]]
+        :param as_of_dates: Canonical as of dates to match (None for all)
+        :type as_of_dates: Optional[Iterable[str]]
+        :return: Matching cache keys
+        :rtype: frozenset[str]
+        """
+        selected = set(self._groups)
+        for field, values in [("api_method", api_methods), ("as_of_date", as_of_dates)]:
+            if values is not None:
+                index = self._indexes[field]
+                selected &= set().union(*[index.get(value, set()) for value in values])
+        return frozenset(selected)
+
+    def snapshot(
+        self,
+        api_methods: Optional[Iterable[str]] = None,
+        as_of_dates: Optional[Iterable[str]] = None,
+    ) -> dict[tuple[str, str], list[SnapshotEntry]]:
+        """
+        Collect every unexpired result, grouped by (api_method, as_of_date), for export.
+        Pending placeholders and cached failures are skipped.
+
+        :param api_methods: Only export these api methods (None for all)
+        :type api_methods: Optional[Iterable[str]]
+        :param as_of_dates: Only export these canonical as of dates (None for all)
+        :type as_of_dates: Optional[Iterable[str]]
+        :return: Entries keyed by (api_method, as_of_date) ("" for no as_of_date)
+        :rtype: dict[tuple[str, str], list[SnapshotEntry]]
+        """
+        now = time.time()
+        sections: dict[tuple[str, str], list[SnapshotEntry]] = {}
+        expires, ttls = self._expires, self._ttls
+        with self._lock, _gc_paused():
+            for cache_key in self._select(api_methods, as_of_dates):
+                _, as_of_date, api_method = split_cache_key(cache_key)
+                section = sections.setdefault((api_method, as_of_date or ""), [])
+                for params_key, value in self._groups[cache_key].items():
+                    if value is None or isinstance(value, NegativeResult):
+                        continue
+                    key = (cache_key, params_key)
+                    expires_at = expires.get(key)
+                    if expires_at is None or expires_at > now:
+                        section.append(
+                            SnapshotEntry(*key, value, expires_at, ttls.get(key))
+                        )
+        return {key: entries for key, entries in sections.items() if entries}
+
+    # pylint: disable=too-many-locals
+    def restore(self, entries: Iterable[tuple]) -> int:
+        """
+        Bulk insert snapshot entries (SnapshotEntry fields) under a single lock, skipping
+        entries that expired since they were exported. Nothing is written to the backend.
+
+        :param entries: Snapshot entries
+        :type entries: Iterable[tuple]
+        :return: Number of entries restored
+        :rtype: int
+        """
+        now = time.time()
+        groups, lru, ttls, expires = self._groups, self._lru, self._ttls, self._expires
+        size_of = self._value_size if self.max_bytes is not None else None
+        new_keys = []
+        restored = Counter()
+        with self._lock, _gc_paused():
+            for cache_key, params_key, value, expires_at, ttl in entries:
+                if expires_at is not None and expires_at <= now:
+                    continue
+                if (group := groups.get(cache_key)) is None:
+                    group = groups[cache_key] = {}
+                    new_keys.append(cache_key)
+                restored[cache_key] += 1
+                group[params_key] = value
+                key = (cache_key, params_key)
+                self._pending.discard(key)
+                size = 0 if size_of is None else size_of(value)
+                self._n_bytes += size - lru.pop(key, 0)
+                lru[key] = size
+                if ttl is not None:
+                    ttls[key] = ttl
+                if expires_at is not None:
+                    expires[key] = expires_at
+                else:
+                    expires.pop(key, None)
+            self._index_groups(new_keys)
+            for cache_key, n in restored.items():
+                self._stats.record("inserts", cache_key, n)
+            self._evict()
+        return restored.total()
+
+    def _index_groups(self, cache_keys: list[str]) -> None:
+        """
+        Index new groups by security_id, as_of_date and api_method in one pass per field
+
+        :param cache_keys: Cache keys of the new groups
+        :type cache_keys: list[str]
+        :return: None type
+        :rtype: None
+        """
+        for field, values in zip(
+            _INDEXED_FIELDS, zip(*map(split_cache_key, cache_keys))
+        ):
+            index = self._indexes[field]
+            for value, cache_key in zip(values, cache_keys):
+                index.setdefault(value, set()).add(cache_key)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Snapshot of the cache counters and footprint of every api method: hits, misses,
+        inserts, evictions, entries (filled variants held) and bytes (approximate size of
+        the values held, compressed size for compressed values)
+
+        :return: Statistics keyed by api method, then by name
+        :rtype: dict[str, dict[str, int]]
+        """
+        with self._lock:
+            stats = self._stats.snapshot()
+            for api_method, cache_keys in self._indexes["api_method"].items():
+                entries = n_bytes = 0
+                for cache_key in cache_keys:
+                    for params_key, value in self._groups[cache_key].items():
+                        if value is None:
+                            continue
+                        entries += 1
+                        n_bytes += (
+                            self._lru[(cache_key, params_key)]
+                            if self.max_bytes is not None
+                            else approximate_size(value)
+                        )
+                counts = stats.setdefault(
+                    api_method, dict.fromkeys(CacheStats.FIELDS, 0)
+                )
+                counts.update(entries=entries, bytes=n_bytes)
+        for counts in stats.values():
+            counts.setdefault("entries", 0)
+            counts.setdefault("bytes", 0)
+        return stats
+
+    def reset_stats(self) -> None:
+        """
+        Reset the hit, miss, insert and eviction counters
+
+        :return: None type
+        :rtype: None
+        """
+        with self._lock:
+            self._stats.clear()
+
+    def clear(self, persistent: bool = False) -> None:
+        """
+        Remove every cached value
+
+        :param persistent: Also delete every value from the backend
+        :type persistent: bool
+        :return: None type
+        :rtype: None
+        """
+        if persistent and self.store is not None:
+            self.store.clear()
+        with self._lock:
+            self._groups.clear()
+            for index in self._indexes.values():
+                index.clear()
+            self._lru.clear()
+            self._pending.clear()
+            self._ttls.clear()
+            self._expires.clear()
+            self._n_bytes = 0
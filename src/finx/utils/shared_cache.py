@@ -0,0 +1,511 @@
+#! python
+"""
+author: dick mule
+purpose: mmap backed result table shared by every process (AsyncProcessManager workers) on a host
+"""
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from typing import Any, Iterable, Iterator, Optional
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+
+from finx.utils.cache_backends import CacheEntry, key_patterns
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+
+_MAGIC = b"FINXSHM1"
+_HEADER = struct.Struct("<8sQQQQ")  # magic, n_slots, size, data_end, n_used
+_SLOT = struct.Struct("<QQ")  # key hash, record offset
+_RECORD = struct.Struct("<IId")  # key length, value length, created
+_EMPTY, _DELETED = 0, 1
+_MAX_LOAD = 0.7
+
+
+def shared_cache_path(name: str) -> str:
+    """
+    Location of a named shared table (RAM backed /dev/shm where available)
+
+    :param name: Name of the shared table
+    :type name: str
+    :return: Path of the backing file
+    :rtype: str
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"finx-{name}.cache")
+
+
+def _hash_key(key: bytes) -> int:
+    """
+    64-bit hash of a key, avoiding the empty and deleted slot markers
+
+    :param key: Encoded key
+    :type key: bytes
+    :return: Hash
+    :rtype: int
+    """
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return value if value > _DELETED else value + 2
+
+
+# pylint: disable=too-many-instance-attributes
+class SharedMemoryBackend:
+    """
+    Fixed size open addressing hash table in a memory mapped file implementing the
+    CacheBackend protocol. Every process that opens the same name (including forked or
+    spawned AsyncProcessManager / TaskRunner workers) reads and writes the same table, so a
+    result fetched by one worker is a hit for all of the others.
+
+    Records are appended to a data region; once either the data region or the slot table is
+    full the oldest records are evicted until at most half of each is in use. Access is
+    serialized with an exclusive file lock, so the table needs fcntl (POSIX only).
+    """
+
+    def __init__(
+        self, name: str = "default", size: int = 256 * 2**20, n_slots: int = 2**18
+    ):
+        """
+        Attach to (or create) a named shared table
+
+        :param name: Name shared by every process using the table
+        :type name: str
+        :param size: Size of the backing file in bytes (used when the table is created)
+        :type size: int
+        :param n_slots: Number of hash slots (used when the table is created)
+        :type n_slots: int
+        """
+        if fcntl is None:
+            raise ImportError(
+                "fcntl file locks are required to share a cache between processes"
+            )
+        self.name: str = name
+        self.path: str = shared_cache_path(name)
+        self._size: int = size
+        self._n_slots: int = n_slots
+        self._pid: Optional[int] = None
+        self._open()
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickle by name so that spawned processes attach to the same table
+
+        :return: Constructor and arguments
+        :rtype: tuple
+        """
+        return self.__class__, (self.name, self._size, self._n_slots)
+
+    def _open(self) -> None:
+        """
+        Open the backing file and map it, initializing the table if it is new
+
+        :return: None type
+        :rtype: None
+        """
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._flock(True)
+        try:
+            if os.fstat(self._fd).st_size < _HEADER.size:
+                os.ftruncate(self._fd, self._size)
+                self._map = mmap.mmap(self._fd, self._size)
+                self._reset()
+            else:
+                self._map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+                magic, self._n_slots, self._size, *_ = _HEADER.unpack_from(self._map)
+                if magic != _MAGIC:
+                    raise ValueError(f"{self.path} is not a finx shared cache")
+        finally:
+            self._flock(False)
+        self._data_start = _HEADER.size + self._n_slots * _SLOT.size
+
+    def _flock(self, acquire: bool) -> None:
+        """
+        Take or release the cross process lock
+
+        :param acquire: Take (True) or release (False) the lock
+        :type acquire: bool
+        :return: None type
+        :rtype: None
+        """
+        fcntl.flock(self._fd, fcntl.LOCK_EX if acquire else fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Lock the table against other threads and processes (reattaching after a fork, since
+        forked processes would otherwise share the parent's file lock - the inherited map and
+        descriptor are closed first)
+
+        :return: Context manager holding both locks
+        :rtype: Iterator[None]
+        """
+        if self._pid != os.getpid():
+            self.close()
+            self._open()
+        with self._lock:
+            self._flock(True)
+            try:
+                yield
+            finally:
+                self._flock(False)
+
+    def _reset(self) -> None:
+        """
+        Empty the table (caller holds the lock)
+
+        :return: None type
+        :rtype: None
+        """
+        data_start = _HEADER.size + self._n_slots * _SLOT.size
+        self._map[_HEADER.size : data_start] = bytes(data_start - _HEADER.size)
+        _HEADER.pack_into(
+            self._map, 0, _MAGIC, self._n_slots, self._size, data_start, 0
+        )
+
+    def _find(self, key: bytes) -> tuple[int, int]:
+        """
+        Probe for a key (caller holds the lock)
+
+        :param key: Encoded key
+        :type key: bytes
+        :return: Slot holding the key (or the first free slot) and the record offset (0 if
+            missing)
+        :rtype: tuple[int, int]
+        """
+        key_hash = _hash_key(key)
+        free = None
+        slot = key_hash % self._n_slots
+        for _ in range(self._n_slots):
+            stored_hash, offset = _SLOT.unpack_from(
+                self._map, _HEADER.size + slot * _SLOT.size
+            )
+            if stored_hash == _EMPTY:
+                return (slot if free is None else free), 0
+            if stored_hash == _DELETED:
+                free = slot if free is None else free
+            elif stored_hash == key_hash and self._record_key(offset) == key:
+                return slot, offset
+            slot = (slot + 1) % self._n_slots
+        return (-1 if free is None else free), 0
+
+    def _record_key(self, offset: int) -> bytes:
+        """
+        Read the key of a record
+
+        :param offset: Record offset
+        :type offset: int
+        :return: Encoded key
+        :rtype: bytes
+        """
+        key_length = _RECORD.unpack_from(self._map, offset)[0]
+        start = offset + _RECORD.size
+        return bytes(self._map[start : start + key_length])
+
+    def _read(self, offset: int) -> Optional[CacheEntry]:
+        """
+        Decode a record
+
+        :param offset: Record offset
+        :type offset: int
+        :return: Stored entry or None if it cannot be read
+        :rtype: Optional[CacheEntry]
+        """
+        key_length, value_length, created = _RECORD.unpack_from(self._map, offset)
+        start = offset + _RECORD.size + key_length
+        try:
+            return CacheEntry(
+                pickle.loads(self._map[start : start + value_length]), created
+            )
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logging.warning("Discarding unreadable shared result: %s", e)
+            return None
+
+    def _write(self, key: bytes, blob: bytes, created: float) -> None:
+        """
+        Store a record, evicting the oldest records if the table is full (caller holds the
+        lock)
+
+        :param key: Encoded key
+        :type key: bytes
+        :param blob: Pickled value
+        :type blob: bytes
+        :param created: Time the value was written
+        :type created: float
+        :return: None type
+        :rtype: None
+        """
+        length = _RECORD.size + len(key) + len(blob)
+        if length > self._size - self._data_start:
+            logging.debug("Result of %i bytes does not fit the shared cache", length)
+            return
+        record = _RECORD.pack(len(key), len(blob), created) + key + blob
+        if self._append(key, record):
+            return
+        logging.debug(
+            "Shared cache %s is full - evicting its oldest records", self.name
+        )
+        self._compact()
+        if not self._append(key, record):
+            self._reset()
+            self._append(key, record)
+
+    def _append(self, key: bytes, record: bytes) -> bool:
+        """
+        Append a packed record and point its slot at it unless the table is full (caller
+        holds the lock)
+
+        :param key: Encoded key
+        :type key: bytes
+        :param record: Packed record (header, key and pickled value)
+        :type record: bytes
+        :return: True if the record was written
+        :rtype: bool
+        """
+        data_end, n_used = _HEADER.unpack_from(self._map)[3:]
+        slot, offset = self._find(key)
+        full = data_end + len(record) > self._size or n_used > _MAX_LOAD * self._n_slots
+        if slot < 0 or full:
+            return False
+        position = _HEADER.size + slot * _SLOT.size
+        if not offset and _SLOT.unpack_from(self._map, position)[0] == _EMPTY:
+            n_used += 1
+        self._map[data_end : data_end + len(record)] = record
+        _SLOT.pack_into(self._map, position, _hash_key(key), data_end)
+        _HEADER.pack_into(
+            self._map,
+            0,
+            _MAGIC,
+            self._n_slots,
+            self._size,
+            data_end + len(record),
+            n_used,
+        )
+        return True
+
+    def _compact(self) -> None:
+        """
+        Evict the oldest records until at most half of the data region and of the usable
+        slots are taken, moving the rest to the front of the data region (caller holds the
+        lock)
+
+        :return: None type
+        :rtype: None
+        """
+        offsets = sorted(
+            (
+                offset
+                for stored_hash, offset in _SLOT.iter_unpack(
+                    self._map[_HEADER.size : self._data_start]
+                )
+                if stored_hash > _DELETED
+            ),
+            reverse=True,
+        )
+        budget = (self._size - self._data_start) // 2
+        kept = []
+        for offset in offsets[: int(_MAX_LOAD * self._n_slots) // 2]:
+            key_length, value_length = _RECORD.unpack_from(self._map, offset)[:2]
+            length = _RECORD.size + key_length + value_length
+            if length > budget:
+                break
+            budget -= length
+            kept.append(bytes(self._map[offset : offset + length]))
+        self._reset()
+        for record in reversed(kept):
+            key_length = _RECORD.unpack_from(record)[0]
+            self._append(record[_RECORD.size : _RECORD.size + key_length], record)
+
+    @staticmethod
+    def _key(cache_key: str, params_key: str) -> bytes:
+        """
+        Encode a variant key
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Encoded key
+        :rtype: bytes
+        """
+        return f"{cache_key}|{params_key}".encode("utf-8")
+
+    def _slots(self) -> Iterable[tuple[int, bytes]]:
+        """
+        Iterate over every occupied slot (caller holds the lock)
+
+        :return: Slot numbers and their keys
+        :rtype: Iterable[tuple[int, bytes]]
+        """
+        for slot in range(self._n_slots):
+            stored_hash, offset = _SLOT.unpack_from(
+                self._map, _HEADER.size + slot * _SLOT.size
+            )
+            if stored_hash > _DELETED:
+                yield slot, self._record_key(offset)
+
+    def _delete_slots(self, slots: list[int]) -> int:
+        """
+        Mark slots as deleted (caller holds the lock)
+
+        :param slots: Slot numbers
+        :type slots: list[int]
+        :return: Number of slots deleted
+        :rtype: int
+        """
+        for slot in slots:
+            _SLOT.pack_into(self._map, _HEADER.size + slot * _SLOT.size, _DELETED, 0)
+        return len(slots)
+
+    def get(self, cache_key: str, params_key: str) -> Optional[CacheEntry]:
+        """
+        Read one entry
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :return: Stored entry or None if missing
+        :rtype: Optional[CacheEntry]
+        """
+        return self.get_many([(cache_key, params_key)])[0]
+
+    def get_many(self, keys: list[tuple[str, str]]) -> list[Optional[CacheEntry]]:
+        """
+        Read many entries under a single lock
+
+        :param keys: List of (cache_key, params_key) pairs
+        :type keys: list[tuple[str, str]]
+        :return: Stored entries (None if missing) in key order
+        :rtype: list[Optional[CacheEntry]]
+        """
+        with self._locked():
+            offsets = [self._find(self._key(*key))[1] for key in keys]
+            return [self._read(offset) if offset else None for offset in offsets]
+
+    def set(self, cache_key: str, params_key: str, value: Any) -> None:
+        """
+        Write one value
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: str
+        :param value: Value to store
+        :type value: Any
+        :return: None type
+        :rtype: None
+        """
+        self.set_many([(cache_key, params_key, value)])
+
+    def set_many(self, items: Iterable[tuple[str, str, Any]]) -> None:
+        """
+        Write many values under a single lock
+
+        :param items: (cache_key, params_key, value) items
+        :type items: Iterable[tuple[str, str, Any]]
+        :return: None type
+        :rtype: None
+        """
+        records = [
+            (
+                self._key(cache_key, params_key),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            )
+            for cache_key, params_key, value in items
+        ]
+        now = time.time()
+        with self._locked():
+            for key, blob in records:
+                self._write(key, blob, now)
+
+    def delete(self, cache_key: str, params_key: Optional[str] = None) -> int:
+        """
+        Delete one variant, or every variant of a cache key if params_key is None
+
+        :param cache_key: Cache key
+        :type cache_key: str
+        :param params_key: Parameter key
+        :type params_key: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        with self._locked():
+            if params_key is not None:
+                slot, offset = self._find(self._key(cache_key, params_key))
+                return self._delete_slots([slot] if offset else [])
+            prefix = self._key(cache_key, "")
+            return self._delete_slots(
+                [slot for slot, key in self._slots() if key.startswith(prefix)]
+            )
+
+    def delete_matching(
+        self,
+        security_id: Optional[str] = None,
+        as_of_date: Optional[str] = None,
+        api_method: Optional[str] = None,
+    ) -> int:
+        """
+        Delete every value of the given security, date and/or method
+
+        :param security_id: Canonical security id (None matches any)
+        :type security_id: Optional[str]
+        :param as_of_date: Canonical as of date (None matches any)
+        :type as_of_date: Optional[str]
+        :param api_method: Name of the API method (None matches any)
+        :type api_method: Optional[str]
+        :return: Number of values deleted
+        :rtype: int
+        """
+        patterns = [
+            f"{pattern}|*"
+            for pattern in key_patterns(security_id, as_of_date, api_method)
+        ]
+        with self._locked():
+            return self._delete_slots(
+                [
+                    slot
+                    for slot, key in self._slots()
+                    if any(fnmatchcase(key.decode("utf-8"), p) for p in patterns)
+                ]
+            )
+
+    def clear(self) -> None:
+        """
+        Delete every value
+
+        :return: None type
+        :rtype: None
+        """
+        with self._locked():
+            self._reset()
+
+    def close(self) -> None:
+        """
+        Unmap the table (the backing file is kept for other processes)
+
+        :return: None type
+        :rtype: None
+        """
+        self._map.close()
+        os.close(self._fd)
+
+    def unlink(self) -> None:
+        """
+        Close the table and remove the backing file
+
+        :return: None type
+        :rtype: None
+        """
+        self.close()
+        os.remove(self.path)
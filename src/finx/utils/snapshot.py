@@ -0,0 +1,90 @@
+#! python
+"""
+author: dick mule
+purpose: compact binary snapshots of the results cache for warm starts
+"""
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+import pickle
+import struct
+import zlib
+
+_MAGIC = b"FINXSNP1"
+_SECTION = struct.Struct("<HHQ")  # api_method length, as_of_date length, payload length
+_LEVEL = 1
+
+
+class SnapshotEntry(NamedTuple):
+    """One cached variant as written to a snapshot"""
+
+    cache_key: str
+    params_key: str
+    value: Any
+    expires_at: Optional[float]
+    ttl: Optional[float]
+
+
+def write_snapshot(
+    path: str, sections: dict[tuple[str, str], list[SnapshotEntry]]
+) -> int:
+    """
+    Write entries grouped by (api_method, as_of_date) so that readers can skip whole
+    sections they are not interested in without decoding them. Each section is stored
+    column by column (cache keys, params keys, values, ...), which pickles and compresses
+    far better than one tuple per entry.
+
+    :param path: Snapshot file path
+    :type path: str
+    :param sections: Entries keyed by (api_method, as_of_date) ("" for no as_of_date)
+    :type sections: dict[tuple[str, str], list[SnapshotEntry]]
+    :return: Number of entries written
+    :rtype: int
+    """
+    n_entries = 0
+    with open(path, "wb") as file:
+        file.write(_MAGIC)
+        for (api_method, as_of_date), entries in sections.items():
+            method, date = api_method.encode("utf-8"), as_of_date.encode("utf-8")
+            columns = tuple(map(list, zip(*entries)))
+            payload = zlib.compress(
+                pickle.dumps(columns, pickle.HIGHEST_PROTOCOL), _LEVEL
+            )
+            file.write(_SECTION.pack(len(method), len(date), len(payload)))
+            file.write(method + date + payload)
+            n_entries += len(entries)
+    return n_entries
+
+
+def read_snapshot(
+    path: str,
+    api_methods: Optional[Iterable[str]] = None,
+    as_of_dates: Optional[Iterable[str]] = None,
+) -> Iterator[Iterator[tuple]]:
+    """
+    Read the sections of a snapshot matching the filters
+
+    :param path: Snapshot file path
+    :type path: str
+    :param api_methods: Only read these api methods (None for all)
+    :type api_methods: Optional[Iterable[str]]
+    :param as_of_dates: Only read these canonical as of dates (None for all)
+    :type as_of_dates: Optional[Iterable[str]]
+    :return: Iterator of entries (plain tuples in SnapshotEntry field order), one per
+        matching section
+    :rtype: Iterator[Iterator[tuple]]
+    """
+    methods = None if api_methods is None else set(api_methods)
+    dates = None if as_of_dates is None else set(as_of_dates)
+    with open(path, "rb") as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a finx cache snapshot")
+        while header := file.read(_SECTION.size):
+            method_length, date_length, payload_length = _SECTION.unpack(header)
+            api_method = file.read(method_length).decode("utf-8")
+            as_of_date = file.read(date_length).decode("utf-8")
+            if (methods is not None and api_method not in methods) or (
+                dates is not None and as_of_date not in dates
+            ):
+                file.seek(payload_length, 1)
+                continue
+            yield zip(*pickle.loads(zlib.decompress(file.read(payload_length))))